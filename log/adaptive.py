@@ -0,0 +1,182 @@
+import random
+import sys
+import threading
+import time
+import weakref
+
+from . import forksafe
+from .levels import LogLevel
+
+
+clock = getattr(time, 'perf_counter', time.time)
+
+
+class OverheadController(object):
+    """
+    ``OverheadController`` keeps logging within a budget of wall time. Loggers it is given to time every entry they
+    write, including the handlers' writes when they are made on the calling thread, and every ``interval`` seconds
+    the controller compares the total against ``budget``. When logging took more, it raises the level of its
+    loggers one step, up to ``max_level``, and once there it halves the share of entries below ERROR that are
+    written, down to ``min_sample_rate``. After ``relax_after`` intervals within half the budget it takes those steps
+    back, one per interval, to the loggers' own level. Every step is logged as a warning, whatever the level.
+
+    >>> controller = OverheadController(budget=0.02)
+    >>> logger = Logger(level=LogLevel.DEBUG, controller=controller)
+    """
+
+    LEVELS = (LogLevel.DEBUG, LogLevel.INFO, LogLevel.WARNING, LogLevel.ERROR)
+
+    def __init__(self, budget=0.02, interval=1.0, max_level=LogLevel.WARNING, min_sample_rate=0.01, relax_after=5):
+        """
+        :param budget: the share of wall time logging may take
+        :type budget: float
+
+        :param interval: the number of seconds between adjustments
+        :type interval: float
+
+        :param max_level: the highest level the controller raises its loggers to
+        :type max_level: LogLevel
+
+        :param min_sample_rate: the smallest share of entries below ERROR the controller lets through
+        :type min_sample_rate: float
+
+        :param relax_after: the number of intervals within half the budget before a step is taken back
+        :type relax_after: int
+        """
+        self.budget = budget
+        self.interval = interval
+        self.max_level = max_level
+        self.min_sample_rate = min_sample_rate
+        self.relax_after = relax_after
+        self.level = None
+        self.sample_rate = 1.0
+        self.overhead = 0.0
+        self.adjustments = 0
+        self._loggers = weakref.WeakKeyDictionary()
+        self._logger = None
+        self._adjusting = threading.local()
+        self._closed = False
+        self._start()
+        forksafe.register(self)
+
+    def attach(self, logger, level=None):
+        """puts a logger under the controller, which then owns its ``level``
+
+        :param logger: the logger to control
+        :type logger: Logger
+
+        :param level: the logger's own level, to go back to when logging is cheap again; its current level if not given
+        :type level: LogLevel
+        """
+        base = self._loggers.get(logger, level or logger.level)
+        self._loggers[logger] = base
+        logger.controller = self
+        if self._logger is None or self._logger() is None:
+            self._logger = weakref.ref(logger)
+        if self.level is not None and self.level > base:
+            logger.level = self.level
+
+    def admit(self, level):
+        """decides whether an entry is sampled
+
+        :param level: the level of the entry
+        :type level: LogLevel
+
+        :returns: whether the entry should be written
+        """
+        return self.sample_rate >= 1.0 or level >= LogLevel.ERROR or getattr(self._adjusting, 'active', False) or \
+            random.random() < self.sample_rate
+
+    def spent(self, started):
+        """adds the time since ``started`` to the time spent logging in the current interval, unless the entry was
+        the controller's own
+
+        :param started: the ``clock()`` reading from when the entry was started
+        :type started: float
+        """
+        if not getattr(self._adjusting, 'active', False):
+            elapsed = clock() - started
+            with self._lock:
+                self._spent += elapsed
+
+    def close(self):
+        """stops adjusting and gives the loggers their own level back"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        for logger, base in list(self._loggers.items()):
+            logger.level = base
+
+    def before_fork(self):
+        pass
+
+    def after_fork(self):
+        """starts a new interval, with a thread of its own, in the child"""
+        if not self._closed:
+            self._start()
+
+    def _start(self):
+        self._lock = threading.Lock()
+        self._spent = 0.0
+        self._started = clock()
+        self._calm = 0
+        self._wakeup = threading.Event()
+        thread = threading.Thread(target=self._adjust_periodically, name='log-overhead-controller')
+        thread.daemon = True
+        thread.start()
+
+    def _adjust_periodically(self):
+        while not self._wakeup.wait(self.interval):
+            try:
+                self._adjust()
+            except Exception as e:
+                sys.stderr.write('{}: failed to adjust the loggers: {!r}\n'.format(type(self).__name__, e))
+
+    def _adjust(self):
+        with self._lock:
+            now = clock()
+            spent, self._spent = self._spent, 0.0
+        elapsed, self._started = now - self._started, now
+        self.overhead = spent / elapsed if elapsed > 0 else 0.0
+        base = min(self._loggers.values()) if self._loggers else None
+        if base is None:
+            return
+        level = max(self.level or base, base)
+        if self.overhead > self.budget:
+            self._calm = 0
+            if level < self.max_level:
+                self._step('over', self._next_level(level, 1), self.sample_rate)
+            elif self.sample_rate > self.min_sample_rate:
+                self._step('over', level, max(self.min_sample_rate, self.sample_rate / 2))
+        elif self.overhead <= self.budget / 2 and (level > base or self.sample_rate < 1.0):
+            self._calm += 1
+            if self._calm < self.relax_after:
+                return
+            self._calm = 0
+            if self.sample_rate < 1.0:
+                self._step('within', level, min(1.0, self.sample_rate * 2))
+            else:
+                self._step('within', self._next_level(level, -1), self.sample_rate)
+        else:
+            self._calm = 0
+
+    def _next_level(self, level, step):
+        return self.LEVELS[max(0, min(len(self.LEVELS) - 1, self.LEVELS.index(level) + step))]
+
+    def _step(self, over_or_within, level, sample_rate):
+        self.level, self.sample_rate = level, sample_rate
+        self.adjustments += 1
+        for logger, base in list(self._loggers.items()):
+            logger.level = max(level, base)
+        logger = self._logger() if self._logger is not None else None
+        if logger is None:
+            return
+        # written past the level check, since the level may just have been raised above WARNING
+        self._adjusting.active = True
+        try:
+            logger._log('logging took {:.1%} of the time, {} its {:.1%} budget; the level is now {} and {:.0%} '
+                        'of the entries below ERROR are written'.format(self.overhead, over_or_within, self.budget,
+                                                                        level, sample_rate), LogLevel.WARNING)
+        finally:
+            self._adjusting.active = False
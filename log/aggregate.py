@@ -0,0 +1,161 @@
+import atexit
+import numbers
+import sys
+import threading
+import time
+
+from .formatters import Formatter
+from .handlers import _HandlerInterface
+from .records import LogRecord
+
+
+class _Group(object):
+
+    __slots__ = ('count', 'stats')
+
+    def __init__(self):
+        self.count = 0
+        self.stats = {}
+
+
+class AggregatingHandler(_HandlerInterface):
+    """
+    ``AggregatingHandler`` writes a summary of chatty entries instead of every one of them. Entries are grouped by
+    logger name, level and message, which holds no values since those go in the context, and every ``interval``
+    seconds one entry per group is written to ``handler`` with the message of the group and, in its context, the
+    ``count`` of entries, their ``rate`` per second and a ``summary`` line of it all. With ``stats``, the ``_min``,
+    ``_max`` and ``_mean`` of numeric context values are added as well, e.g. ``latency_mean``.
+
+    Handlers that accept records are given the summary records, other handlers get them formatted by ``formatter``.
+
+    >>> handler = AggregatingHandler(FileHandler('/var/log/app.log'), interval=60, stats=['latency'])
+    >>> logger = Logger(handlers=[handler])
+    >>> logger.info('served request', latency=0.012)
+    """
+
+    accepts_records = True
+
+    DEFAULT_TEMPLATE = '[{timestamp}] [{level}] : {message} ({summary})'
+
+    def __init__(self, handler, interval=10.0, stats=None, formatter=None, name=None):
+        """
+        :param handler: the handler to write the summaries to
+        :type handler: _HandlerInterface
+
+        :param interval: the number of seconds summarized by one summary
+        :type interval: float
+
+        :param stats: the context keys to keep the minimum, maximum and mean of; every numeric value if ``True``
+        :type stats: list or bool
+
+        :param formatter: formats the summaries for handlers that want strings
+        :type formatter: Formatter
+
+        :param name: the name of the handler
+        :type name: str
+        """
+        super(AggregatingHandler, self).__init__(name)
+        self.handler = handler
+        self.interval = interval
+        self.stats = stats if stats is True else frozenset(stats or ())
+        self.formatter = formatter or Formatter(template=self.DEFAULT_TEMPLATE)
+        self._closed = False
+        self._start()
+        atexit.register(self.close)
+
+    def write(self, message):
+        """counts a message that didn't come with a record
+
+        :param message: what you want logged
+        :type message: str
+        """
+        self.write_record(LogRecord(None, None, message.rstrip('\n')))
+
+    def write_record(self, record):
+        """counts the record in its group
+
+        :param record: the record of the entry
+        :type record: LogRecord
+        """
+        key = (record.name, record.level, record.message)
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _Group()
+            group.count += 1
+            if self.stats:
+                self._add_stats(group.stats, record.context)
+
+    def flush(self):
+        """writes the summaries of the current interval and starts the next one"""
+        now = time.time()
+        with self._lock:
+            groups, self._groups = self._groups, {}
+            started, self._started = self._started, now
+        if not groups:
+            return
+        elapsed = max(now - started, 1e-9)
+        records = [self._summarize(key, group, elapsed) for key, group in groups.items()]
+        if self.handler.accepts_records:
+            for record in records:
+                self.handler.write_record(record)
+        else:
+            self.handler.write(''.join(self.formatter.format_record(record) for record in records))
+        self.handler.flush()
+
+    def close(self):
+        """writes the last summaries and closes the wrapped handler"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+        self.handler.close()
+
+    def after_fork(self):
+        """starts counting afresh, with a thread of its own, in the child"""
+        if not self._closed:
+            self._start()
+
+    def _start(self):
+        self._lock = threading.Lock()
+        self._groups = {}
+        self._started = time.time()
+        self._wakeup = threading.Event()
+        thread = threading.Thread(target=self._flush_periodically, name='log-aggregating-handler')
+        thread.daemon = True
+        thread.start()
+
+    def _add_stats(self, stats, context):
+        for key, value in context.items():
+            if not isinstance(value, numbers.Real) or isinstance(value, bool):
+                continue
+            if self.stats is not True and key not in self.stats:
+                continue
+            values = stats.get(key)
+            if values is None:
+                stats[key] = [1, value, value, value]
+            else:
+                values[0] += 1
+                values[1] = min(values[1], value)
+                values[2] = max(values[2], value)
+                values[3] += value
+
+    def _summarize(self, key, group, elapsed):
+        name, level, message = key
+        context = {'count': group.count, 'rate': round(group.count / elapsed, 3)}
+        summary = ['count={}'.format(group.count), 'rate={}/s'.format(context['rate'])]
+        for stat in sorted(group.stats):
+            count, minimum, maximum, total = group.stats[stat]
+            context[stat + '_min'], context[stat + '_max'] = minimum, maximum
+            context[stat + '_mean'] = float(total) / count
+            summary.append('{}={}/{}/{:g}'.format(stat, minimum, maximum, context[stat + '_mean']))
+        context['summary'] = ' '.join(summary)
+        return LogRecord(name, level, message, context=context)
+
+    def _flush_periodically(self):
+        while not self._wakeup.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                sys.stderr.write('{}: failed to write log entries: {!r}\n'.format(type(self).__name__, e))
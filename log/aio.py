@@ -0,0 +1,355 @@
+import asyncio
+import codecs
+import collections
+import concurrent.futures
+import functools
+import sys
+
+from . import limits
+from .dispatchers import _DispatcherInterface
+from .handlers import _HandlerInterface
+from .loggers import Logger
+from .tail import TailScope
+
+
+def _tail_coroutine(function, capacity):
+    """wraps a coroutine function in a ``TailScope`` of its own for every call, entered when the call is awaited"""
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        with TailScope(capacity):
+            return await function(*args, **kwargs)
+    return wrapper
+
+
+class _AsyncHandlerInterface(_HandlerInterface):
+    """
+    the common interface of handlers that write from the event loop
+
+    ``awrite`` is given the formatted lines of a whole batch at once and must not block the loop.
+    """
+
+    def write(self, message):
+        raise NotImplementedError('{} can only be used through an AsyncLogger.'.format(type(self).__name__))
+
+    async def awrite(self, message):
+        raise NotImplementedError
+
+    async def aclose(self):
+        """flushes the handler and releases its resources"""
+        self.close()
+
+
+class AsyncFileHandler(_AsyncHandlerInterface):
+    """
+    ``AsyncFileHandler`` writes batches of entries to a file from a worker thread, so the event loop never waits on
+    the disk.
+
+    >>> handler = AsyncFileHandler('/var/log/app.log')
+    """
+
+    def __init__(self, filename, mode='a', encoding='utf8', errors='strict', executor=None, name=None):
+        """
+        :param filename: the name of the file to write to
+        :type filename: str
+
+        :param mode: the write mode
+        :type mode: str
+
+        :param encoding: the encoding of the file
+        :type encoding: str
+
+        :param errors: the error mode for writing
+        :type errors: str
+
+        :param executor: the executor to write from; a single thread of the handler's own if not given
+        :type executor: concurrent.futures.Executor
+
+        :param name: the name of the handler
+        :type name: str
+        """
+        super(AsyncFileHandler, self).__init__(name)
+        self.filename = filename
+        self.fh = codecs.open(filename, mode=mode, encoding=encoding, errors=errors)
+        self._own_executor = executor is None
+        self.executor = executor or concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix='log-file')
+
+    async def awrite(self, message):
+        """writes the message to the file from the executor
+
+        :param message: what you want logged
+        :type message: str
+        """
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._write, message)
+
+    def close(self):
+        """closes the file"""
+        if not self.fh.closed:
+            self.fh.close()
+        if self._own_executor:
+            self.executor.shutdown()
+
+    async def aclose(self):
+        """closes the file from the executor"""
+        if not self.fh.closed:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.fh.close)
+        if self._own_executor:
+            self.executor.shutdown()
+
+    def _write(self, message):
+        self.fh.write(message)
+        self.fh.flush()
+
+
+class AsyncSocketHandler(_AsyncHandlerInterface):
+    """
+    ``AsyncSocketHandler`` writes batches of entries to a TCP or UNIX socket through ``asyncio`` streams. It connects
+    on the first batch and reconnects after a failure; batches that can't be delivered are counted in ``dropped``.
+
+    >>> handler = AsyncSocketHandler(('collector.example.com', 5170))
+    """
+
+    def __init__(self, address, encoding='utf8', name=None):
+        """
+        :param address: a UNIX socket path or a ``(host, port)`` tuple
+        :type address: str or tuple
+
+        :param encoding: the encoding of the entries
+        :type encoding: str
+
+        :param name: the name of the handler
+        :type name: str
+        """
+        super(AsyncSocketHandler, self).__init__(name)
+        self.address = address
+        self.encoding = encoding
+        self.dropped = 0
+        self._writer = None
+
+    async def awrite(self, message):
+        """writes the message to the socket, waiting for its buffer to drain
+
+        :param message: what you want logged
+        :type message: str
+        """
+        try:
+            if self._writer is None:
+                if isinstance(self.address, str):
+                    _, self._writer = await asyncio.open_unix_connection(self.address)
+                else:
+                    _, self._writer = await asyncio.open_connection(*self.address)
+            self._writer.write(message.encode(self.encoding))
+            await self._writer.drain()
+        except (OSError, ConnectionError):
+            self.dropped += message.count('\n') or 1
+            self.close()
+
+    def close(self):
+        """closes the connection"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def aclose(self):
+        """closes the connection and waits until it is closed"""
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (OSError, ConnectionError):
+                pass
+
+
+class AsyncDispatcher(_DispatcherInterface):
+    """
+    ``AsyncDispatcher`` queues records and writes them from a task on the event loop, in batches. Handlers derived
+    from ``_AsyncHandlerInterface`` are awaited on the loop; any other handler is written from an executor so its
+    blocking writes stay off the loop. ``AsyncLogger`` sets one up for you.
+
+    Records logged before the loop runs, or from other threads, are queued as well and written by the loop.
+    """
+
+    def __init__(self, max_queue_size=0, max_batch=1000):
+        """
+        :param max_queue_size: the number of records that may wait to be written; unbounded if 0
+        :type max_queue_size: int
+
+        :param max_batch: the number of records written in one batch
+        :type max_batch: int
+        """
+        self.max_queue_size = max_queue_size
+        self.max_batch = max_batch
+        self.dropped = 0
+        self._pending = collections.deque()
+        self._loop = None
+        self._task = None
+        self._wakeup = None
+        self._idle = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix='log-async-dispatcher')
+
+    def dispatch(self, record, formatter, handlers):
+        """queues the record for the writer task
+
+        :param record: the record to write
+        :type record: LogRecord
+
+        :param formatter: the formatter for handlers that want strings
+        :type formatter: Formatter
+
+        :param handlers: the handlers to write to
+        :type handlers: set of _HandlerInterface
+        """
+        if self.max_queue_size and len(self._pending) >= self.max_queue_size:
+            self.dropped += 1
+            return
+        self._pending.append((record, formatter, handlers))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None and loop is self._loop:
+            self._wakeup.set()
+        elif loop is not None and (self._loop is None or self._loop.is_closed()):
+            self._start(loop)
+        elif self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def flush(self):
+        """does nothing; await ``aflush`` from the event loop instead"""
+        pass
+
+    def close(self):
+        """stops writing; await ``aclose`` from the event loop to write out the queued records first"""
+        if self._task is not None:
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def aflush(self):
+        """waits until every queued record has been written"""
+        if self._loop is None or self._loop.is_closed():
+            self._start(asyncio.get_running_loop())
+        while self._pending or not self._idle.is_set():
+            self._wakeup.set()
+            await asyncio.sleep(0)
+            await self._idle.wait()
+
+    async def aclose(self):
+        """writes out the queued records and stops the writer task"""
+        await self.aflush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._executor.shutdown()
+
+    def _start(self, loop):
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._wakeup.set()
+        self._task = loop.create_task(self._work())
+
+    async def _work(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            self._idle.clear()
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+                await self._write(batch)
+            self._idle.set()
+
+    async def _write(self, batch):
+        start = 0
+        for end in range(1, len(batch) + 1):
+            if end < len(batch) and batch[end][1] is batch[start][1] and batch[end][2] is batch[start][2]:
+                continue
+            records = [record for record, _, _ in batch[start:end]]
+            formatter, handlers = batch[start][1], batch[start][2]
+            start = end
+            lines = [None]
+            await asyncio.gather(*[self._write_handler(records, formatter, handler, lines) for handler in handlers])
+
+    async def _write_handler(self, records, formatter, handler, lines):
+        try:
+            if isinstance(handler, _AsyncHandlerInterface):
+                if lines[0] is None:
+                    lines[0] = [formatter.format_record(record) for record in records]
+                if handler.max_size is None:
+                    await handler.awrite(''.join(lines[0]))
+                else:
+                    await handler.awrite(''.join(limits.fit(line, handler.max_size) for line in lines[0]))
+            else:
+                await self._loop.run_in_executor(self._executor, self.emit_batch, records, formatter, [handler])
+        except Exception as e:
+            sys.stderr.write('{}: failed to write log records: {!r}\n'.format(type(self).__name__, e))
+
+
+class AsyncLogger(Logger):
+    """
+    ``AsyncLogger`` is a ``Logger`` for asyncio applications. Logging an entry only puts its record on a queue and
+    never blocks the event loop; a task on the loop formats and writes the queued records in batches. Use
+    ``AsyncFileHandler`` and ``AsyncSocketHandler`` to write without threads, other handlers are written from an
+    executor. Await ``aclose`` before the loop stops to write out what is still queued.
+
+    >>> logger = AsyncLogger(handlers=[AsyncFileHandler('/var/log/app.log')])
+    >>> logger.info('never blocks the loop')
+    >>> await logger.aclose()
+    """
+
+    def __init__(self, name=None, level=None, template=None, formatters=None, handlers=None, timezone=None,
+                 additional_context=None, max_queue_size=0, max_batch=1000, dispatcher=None, **kwargs):
+        """
+        :param name: the name of the logger
+        :type name: str
+        :param level: the minimum logging level
+        :type level: LogLevel
+        :param template: the template to format the log entries
+        :type template: str
+        :param formatters: a list of formatters to use for formatting message
+        :type formatters: Formatter
+        :param handlers: a list of handlers to write the messages
+        :type handlers: _HandlerInterface
+        :param timezone: the name of the timezone to convert the timestamp to
+        :type timezone: str
+        :param additional_context: values to inject for additional formatting context
+        :type additional_context: dict
+        :param max_queue_size: the number of entries that may wait to be written; unbounded if 0
+        :type max_queue_size: int
+        :param max_batch: the number of entries written in one batch
+        :type max_batch: int
+        :param dispatcher: the dispatcher queueing the entries; an ``AsyncDispatcher`` of ``max_queue_size`` and
+            ``max_batch`` if not given
+        :type dispatcher: AsyncDispatcher
+        :param kwargs: the other arguments of ``Logger``, e.g. ``controller`` or ``max_message_size``
+        :type kwargs: dict
+        """
+        super(AsyncLogger, self).__init__(name=name, level=level, template=template, formatters=formatters,
+                                          handlers=handlers, timezone=timezone, additional_context=additional_context,
+                                          dispatcher=dispatcher or AsyncDispatcher(max_queue_size=max_queue_size,
+                                                                                   max_batch=max_batch),
+                                          **kwargs)
+
+    async def aflush(self):
+        """waits until every queued entry has been written"""
+        await self.dispatcher.aflush()
+
+    async def aclose(self):
+        """writes out the queued entries and closes the handlers; handlers shared through a ``HandlerPool`` are
+        released to it instead, as ``close`` does"""
+        if self._closed:
+            return
+        self._closed = True
+        if self.controller is not None:
+            self.controller.close()
+        await self.dispatcher.aclose()
+        for handler in self._handlers:
+            if handler.pool is not None or handler in self._pooled:
+                continue
+            if isinstance(handler, _AsyncHandlerInterface):
+                await handler.aclose()
+            else:
+                handler.close()
+        self._release_pooled()
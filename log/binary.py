@@ -0,0 +1,448 @@
+import argparse
+import atexit
+import glob
+import os
+import struct
+import sys
+import zlib
+
+from .errors import CorruptSegmentError
+from .formatters import Formatter
+from .handlers import _HandlerInterface
+from .levels import LogLevel
+from .loggers import Logger
+from .records import LogRecord
+
+
+MAGIC = b'LOGBIN01'
+EXTENSION = '.logb'
+
+STRING, ENTRY = 1, 2
+NONE, FALSE, TRUE, INT, FLOAT, STR, BYTES = range(7)
+NO_LEVEL = 0xff
+FLAG_EXCEPTION, FLAG_CALL_SITE, FLAG_TIMEZONE = 1, 2, 4
+
+_DOUBLE = struct.Struct('<d')
+_CRC = struct.Struct('<I')
+_LEVELS = dict((level.value, level) for level in LogLevel)
+
+
+def _write_varint(buf, value):
+    while value > 0x7f:
+        buf.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+class _SegmentEncoder(object):
+    """
+    turns records into frames, interning strings per segment
+    """
+
+    def __init__(self, max_interned):
+        self.max_interned = max_interned
+        self.strings = {}
+        self.last_created = 0
+
+    def encode(self, record, out):
+        payload = bytearray((ENTRY,))
+        _write_varint(payload, _zigzag(record.created - self.last_created))
+        self.last_created = record.created
+        payload.append(NO_LEVEL if record.level is None else record.level.value)
+        exc_text = record.exc_text
+        flags = (FLAG_EXCEPTION if exc_text is not None else 0) | \
+            (FLAG_CALL_SITE if record.proc is not None else 0) | \
+            (FLAG_TIMEZONE if record.timezone else 0)
+        payload.append(flags)
+        self._ref(payload, out, record.name or '', True)
+        self._ref(payload, out, record.message, False)
+        if flags & FLAG_TIMEZONE:
+            self._ref(payload, out, record.timezone, True)
+        if flags & FLAG_CALL_SITE:
+            self._ref(payload, out, record.src or '', True)
+            _write_varint(payload, record.line or 0)
+            self._ref(payload, out, record.func or '', True)
+            _write_varint(payload, record.proc)
+        if flags & FLAG_EXCEPTION:
+            self._value(payload, exc_text)
+        _write_varint(payload, len(record.context))
+        for key, value in record.context.items():
+            self._ref(payload, out, key, True)
+            self._value(payload, value)
+        self._frame(payload, out)
+
+    def _ref(self, payload, out, value, always):
+        string_id = self.strings.get(value)
+        if string_id is None:
+            if not always and len(self.strings) >= self.max_interned:
+                payload.append(0)
+                self._value(payload, value)
+                return
+            string_id = self.strings[value] = len(self.strings)
+            definition = bytearray((STRING,))
+            _write_varint(definition, string_id)
+            definition += value.encode('utf8')
+            self._frame(definition, out)
+        _write_varint(payload, string_id + 1)
+
+    def _value(self, payload, value):
+        kind = type(value)
+        if value is None:
+            payload.append(NONE)
+        elif kind is bool:
+            payload.append(TRUE if value else FALSE)
+        elif kind is int:
+            payload.append(INT)
+            _write_varint(payload, _zigzag(value))
+        elif kind is float:
+            payload.append(FLOAT)
+            payload += _DOUBLE.pack(value)
+        elif kind is bytes:
+            payload.append(BYTES)
+            _write_varint(payload, len(value))
+            payload += value
+        else:
+            encoded = (value if kind is str else str(value)).encode('utf8')
+            payload.append(STR)
+            _write_varint(payload, len(encoded))
+            payload += encoded
+
+    def _frame(self, payload, out):
+        _write_varint(out, len(payload))
+        out += payload
+        out += _CRC.pack(zlib.crc32(payload) & 0xffffffff)
+
+
+class _SegmentDecoder(object):
+    """
+    turns the frames of one segment back into records, stopping at the first truncated or corrupt frame
+    """
+
+    def __init__(self, data):
+        if data[:len(MAGIC)] != MAGIC:
+            raise CorruptSegmentError('Not a binary log segment')
+        self.data = data
+        self.valid_size = len(MAGIC)
+        self.strings = []
+        self.last_created = 0
+
+    def __iter__(self):
+        data, size = self.data, len(self.data)
+        pos = self.valid_size
+        while pos < size:
+            try:
+                length, start = _read_varint(data, pos)
+            except IndexError:
+                return
+            end = start + length
+            if length == 0 or end + _CRC.size > size:
+                return
+            payload = data[start:end]
+            if _CRC.unpack_from(data, end)[0] != zlib.crc32(payload) & 0xffffffff:
+                return
+            pos = self.valid_size = end + _CRC.size
+            if payload[0] == STRING:
+                string_id, offset = _read_varint(payload, 1)
+                if string_id == len(self.strings):
+                    self.strings.append(payload[offset:].decode('utf8'))
+            elif payload[0] == ENTRY:
+                yield self._entry(payload)
+
+    def _entry(self, payload):
+        delta, pos = _read_varint(payload, 1)
+        self.last_created += _unzigzag(delta)
+        level, flags = payload[pos], payload[pos + 1]
+        name, pos = self._ref(payload, pos + 2)
+        message, pos = self._ref(payload, pos)
+        record = LogRecord(name, _LEVELS.get(level), message, created=self.last_created)
+        if flags & FLAG_TIMEZONE:
+            record.timezone, pos = self._ref(payload, pos)
+        if flags & FLAG_CALL_SITE:
+            src, pos = self._ref(payload, pos)
+            line, pos = _read_varint(payload, pos)
+            func, pos = self._ref(payload, pos)
+            proc, pos = _read_varint(payload, pos)
+            record.set_call_site(src, line, func, proc)
+        if flags & FLAG_EXCEPTION:
+            record.exc_text, pos = self._value(payload, pos)
+        count, pos = _read_varint(payload, pos)
+        for _ in range(count):
+            key, pos = self._ref(payload, pos)
+            record.context[key], pos = self._value(payload, pos)
+        return record
+
+    def _ref(self, payload, pos):
+        string_id, pos = _read_varint(payload, pos)
+        if string_id == 0:
+            return self._value(payload, pos)
+        return self.strings[string_id - 1], pos
+
+    def _value(self, payload, pos):
+        kind = payload[pos]
+        pos += 1
+        if kind == NONE:
+            return None, pos
+        if kind in (TRUE, FALSE):
+            return kind == TRUE, pos
+        if kind == INT:
+            value, pos = _read_varint(payload, pos)
+            return _unzigzag(value), pos
+        if kind == FLOAT:
+            return _DOUBLE.unpack_from(payload, pos)[0], pos + _DOUBLE.size
+        length, pos = _read_varint(payload, pos)
+        value = bytes(payload[pos:pos + length])
+        return (value if kind == BYTES else value.decode('utf8')), pos + length
+
+
+def list_segments(paths):
+    """expands directories into the segments they contain, in the order they were written
+
+    :param paths: segment files and directories holding segments
+    :type paths: list of str
+
+    :returns: a list of segment file names
+    """
+    segments = []
+    for path in paths:
+        if os.path.isdir(path):
+            segments.extend(sorted(glob.glob(os.path.join(path, '*{}'.format(EXTENSION)))))
+        else:
+            segments.append(path)
+    return segments
+
+
+def read_records(paths):
+    """reads the records back out of binary log segments
+
+    a truncated or corrupt tail ends its segment; reading continues with the next one.
+
+    :param paths: segment files and directories holding segments
+    :type paths: list of str
+
+    :returns: a generator of ``LogRecord`` objects
+    """
+    for segment in list_segments(paths):
+        with open(segment, 'rb') as fh:
+            data = fh.read()
+        for record in _SegmentDecoder(data):
+            yield record
+
+
+def decode(paths, formatter=None):
+    """renders binary log segments as text
+
+    :param paths: segment files and directories holding segments
+    :type paths: list of str
+
+    :param formatter: the formatter to render the records with; ``Logger.DEFAULT_TEMPLATE`` if not given
+    :type formatter: Formatter
+
+    :returns: a generator of formatted entries
+
+    >>> for line in decode(['/var/log/app'], Formatter(template='{timestamp} {level} {message}')):
+    ...     sys.stdout.write(line)
+    """
+    if formatter is None:
+        formatter = Formatter(template=Logger.DEFAULT_TEMPLATE)
+    for record in read_records(paths):
+        yield formatter.format_record(record)
+
+
+def repair(filename):
+    """truncates a segment after its last intact frame
+
+    :param filename: the segment to repair
+    :type filename: str
+
+    :returns: the number of bytes dropped
+    """
+    with open(filename, 'rb') as fh:
+        data = fh.read()
+    try:
+        decoder = _SegmentDecoder(data)
+    except CorruptSegmentError:
+        decoder = None
+    if decoder is None:
+        valid_size = 0
+    else:
+        for _ in decoder:
+            pass
+        valid_size = decoder.valid_size
+    if valid_size < len(data):
+        with open(filename, 'r+b') as fh:
+            fh.truncate(valid_size)
+    return len(data) - valid_size
+
+
+class BinaryHandler(_HandlerInterface):
+    """
+    ``BinaryHandler`` writes records in a compact binary format instead of formatting them: length-prefixed,
+    CRC-checked frames holding a varint timestamp delta, a level byte, ids of interned logger names and messages,
+    and the context values as they are. The records are written to numbered segment files in ``directory`` and
+    rendered to text afterwards with ``decode`` or ``python -m log.binary``, using any template.
+
+    Frames are buffered and flushed every ``buffer_size`` bytes, on ``flush`` and at exit. A tail torn by a crash is
+    cut off when the handler starts up again; readers simply stop at it.
+
+    >>> logger = Logger(handlers=[BinaryHandler('/var/log/app')])
+    >>> logger.info('cheap to write')
+    """
+
+    accepts_records = True
+
+    def __init__(self, directory, prefix='log', segment_size=16 * 1024 * 1024, buffer_size=64 * 1024,
+                 max_interned=65536, name=None):
+        """
+        :param directory: the directory to write segments to
+        :type directory: str
+
+        :param prefix: the file name prefix of the segments
+        :type prefix: str
+
+        :param segment_size: the size in bytes after which a new segment is started
+        :type segment_size: int
+
+        :param buffer_size: the number of bytes buffered before they are written out
+        :type buffer_size: int
+
+        :param max_interned: the number of distinct strings interned per segment; logger names and context keys are
+            always interned, messages only while there is room
+        :type max_interned: int
+
+        :param name: the name of the handler
+        :type name: str
+        """
+        super(BinaryHandler, self).__init__(name)
+        self.directory = directory
+        self.prefix = prefix
+        self.segment_size = segment_size
+        self.buffer_size = buffer_size
+        self.max_interned = max_interned
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        segments = sorted(glob.glob(os.path.join(directory, '{}.*{}'.format(prefix, EXTENSION))))
+        if segments:
+            repair(segments[-1])
+            self._sequence = int(segments[-1][:-len(EXTENSION)].rsplit('.', 1)[1])
+        else:
+            self._sequence = 0
+        self._buffer = bytearray()
+        self._fh = None
+        self._open_segment()
+        atexit.register(self.close)
+
+    @property
+    def filename(self):
+        """the segment currently being written"""
+        return os.path.join(self.directory, '{}.{:06d}{}'.format(self.prefix, self._sequence, EXTENSION))
+
+    def write(self, message):
+        """writes a message that didn't come with a record
+
+        :param message: what you want logged
+        :type message: str
+        """
+        self.write_record(LogRecord(None, None, message))
+
+    def write_record(self, record):
+        """encodes the record into the current segment
+
+        :param record: the record of the entry
+        :type record: LogRecord
+        """
+        self._encoder.encode(record, self._buffer)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """writes the buffered frames to the segment, starting a new one once it is full"""
+        if self._fh is None or not self._buffer:
+            return
+        self._fh.write(self._buffer)
+        self._fh.flush()
+        self._segment_bytes += len(self._buffer)
+        del self._buffer[:]
+        if self._segment_bytes >= self.segment_size:
+            self._fh.close()
+            self._open_segment()
+
+    def close(self):
+        """flushes the buffered frames and closes the segment"""
+        if self._fh is None:
+            return
+        self.flush()
+        self._fh.close()
+        self._fh = None
+
+    def after_fork(self):
+        """starts a segment of its own in the child, leaving the parent's segment to the parent"""
+        if self._fh is None:
+            return
+        self._fh.close()
+        del self._buffer[:]
+        self._open_segment()
+
+    def _open_segment(self):
+        # segments are created exclusively, so processes forked from one handler never share one
+        while True:
+            self._sequence += 1
+            try:
+                self._fh = open(self.filename, 'xb')
+                break
+            except FileExistsError:
+                continue
+        self._fh.write(MAGIC)
+        self._segment_bytes = len(MAGIC)
+        self._encoder = _SegmentEncoder(self.max_interned)
+
+
+def main(argv=None):
+    """command line entry point: ``python -m log.binary [options] path [path ...]``
+
+    renders binary log segments, or directories of them, as text on stdout.
+    """
+    parser = argparse.ArgumentParser(prog='python -m log.binary', description='render binary log segments as text')
+    parser.add_argument('paths', nargs='+', help='segment files or directories holding segments')
+    parser.add_argument('--template', help='the template to render entries with')
+    parser.add_argument('--timezone', help='render timestamps in this timezone instead of the recorded one')
+    parser.add_argument('--repair', action='store_true', help='truncate corrupt tails instead of rendering')
+    args = parser.parse_args(argv)
+
+    if args.repair:
+        for segment in list_segments(args.paths):
+            dropped = repair(segment)
+            if dropped:
+                sys.stderr.write('{}: dropped {} bytes\n'.format(segment, dropped))
+        return 0
+
+    formatter = Formatter(template=args.template or Logger.DEFAULT_TEMPLATE)
+    for record in read_records(args.paths):
+        if args.timezone:
+            record.timezone = args.timezone
+        sys.stdout.write(formatter.format_record(record))
+    sys.stdout.flush()
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
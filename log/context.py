@@ -0,0 +1,128 @@
+import threading
+
+try:
+    import contextvars
+    _contextvars_available = True
+except ImportError:                 # pragma: no cover
+    _contextvars_available = False  # pragma: no cover
+
+
+class _Node(object):
+    """
+    one frame of bound values; frames are never changed once created, so a scope only has to link a new one in front
+    of the current one and tasks and threads can share the chain without locks
+    """
+
+    __slots__ = ('parent', 'values', '_flat')
+
+    def __init__(self, parent, values):
+        self.parent = parent
+        self.values = values
+        self._flat = None
+
+    @property
+    def flat(self):
+        """all the values bound by this frame and its parents, computed once on first use"""
+        flat = self._flat
+        if flat is None:
+            flat = dict(self.parent.flat) if self.parent is not None else {}
+            flat.update(self.values)
+            self._flat = flat
+        return flat
+
+
+_variables = []
+
+
+class _Variable(object):
+    """
+    a ``contextvars.ContextVar``, or a thread-local value where ``contextvars`` isn't available
+    """
+
+    def __init__(self, name):
+        self._local = threading.local()
+        if _contextvars_available:
+            self._var = contextvars.ContextVar(name, default=None)
+        _variables.append(self)
+
+    def get(self):
+        if _contextvars_available:
+            return self._var.get()
+        return getattr(self._local, 'value', None)
+
+    def set(self, value):
+        if _contextvars_available:
+            return self._var.set(value)
+        previous, self._local.value = getattr(self._local, 'value', None), value
+        return previous
+
+    def reset(self, token):
+        if _contextvars_available:
+            self._var.reset(token)
+        else:
+            self._local.value = token
+
+
+_current = _Variable('log_context')
+
+
+class ContextScope(object):
+    """
+    ``ContextScope`` binds values to every entry logged while it is entered, by any logger, on the current thread or
+    asyncio task. Scopes nest; inner values override outer ones. Entering a scope doesn't copy what is already bound,
+    and values bound in one task or thread are never seen by another, except by tasks created inside the scope, which
+    start with a copy of it as ``contextvars`` do. Without ``contextvars`` the values are bound per thread.
+
+    >>> with ContextScope(request_id='8f3a'):
+    ...     logger.info('handling request')  # the entry's context includes request_id
+    """
+
+    __slots__ = ('values', '_token')
+
+    def __init__(self, **values):
+        """
+        :param values: the key/value pairs to bind
+        :type values: dict
+        """
+        self.values = values
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current.set(_Node(_current.get(), self.values))
+        return self
+
+    def __exit__(self, *args):
+        _current.reset(self._token)
+        self._token = None
+
+
+def current():
+    """returns the values bound by the scopes entered in the current thread or task
+
+    :returns: a new dict of the bound values
+    """
+    node = _current.get()
+    return dict(node.flat) if node is not None else {}
+
+
+def wrap(function):
+    """binds the current scopes to a function that will run on another thread
+
+    Threads don't inherit ``contextvars``, so wrap the target of a thread or a function given to an executor to have
+    its entries carry the context, and go to the tail buffer, of the code that started it.
+
+    :param function: the function to wrap
+    :type function: callable
+
+    :returns: a function that calls ``function`` with the current scopes entered
+    """
+    values = [(variable, variable.get()) for variable in _variables]
+
+    def wrapper(*args, **kwargs):
+        tokens = [(variable, variable.set(value)) for variable, value in values]
+        try:
+            return function(*args, **kwargs)
+        finally:
+            for variable, token in reversed(tokens):
+                variable.reset(token)
+    return wrapper
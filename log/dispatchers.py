@@ -0,0 +1,626 @@
+import atexit
+import collections
+import sys
+import threading
+import time
+
+import six
+from six.moves import queue
+
+from . import forksafe, limits
+from .levels import LogLevel
+from .records import LogRecord
+
+
+class _DispatcherInterface(object):
+    """
+    the common interface that all dispatchers must subclass
+
+    a dispatcher decides where and when the records of a ``Logger`` are formatted and written. ``emit`` does the
+    actual work; subclasses choose the thread it runs on.
+    """
+
+    def dispatch(self, record, formatter, handlers):
+        raise NotImplementedError
+
+    def flush(self):
+        """waits until every dispatched record has been written"""
+        pass
+
+    def close(self):
+        """writes out the pending records and stops dispatching"""
+        self.flush()
+
+    def before_fork(self):
+        """writes out the pending records in the parent before a fork, so the child doesn't write them again"""
+        self.flush()
+
+    def after_fork(self):
+        """replaces the locks, queues and threads that didn't survive a fork in the child"""
+        pass
+
+    @staticmethod
+    def emit(record, formatter, handlers):
+        """writes a record to handlers, formatting it at most once and only if a handler wants a string
+
+        :param record: the record to write
+        :type record: LogRecord
+
+        :param formatter: the formatter for handlers that want strings
+        :type formatter: Formatter
+
+        :param handlers: the handlers to write to
+        :type handlers: set of _HandlerInterface
+        """
+        log_line = None
+        for handler in handlers:
+            if handler.accepts_records:
+                handler.write_record(record if handler.max_size is None else
+                                     limits.fit_record(record, handler.max_size))
+                continue
+            if log_line is None:
+                log_line = formatter.format_record(record)
+            handler.write(log_line if handler.max_size is None else limits.fit(log_line, handler.max_size))
+
+    @staticmethod
+    def emit_batch(records, formatter, handlers):
+        """writes several records to handlers; handlers that want strings get them joined into a single write
+
+        :param records: the records to write
+        :type records: list of LogRecord
+
+        :param formatter: the formatter for handlers that want strings
+        :type formatter: Formatter
+
+        :param handlers: the handlers to write to
+        :type handlers: set of _HandlerInterface
+        """
+        log_lines = None
+        for handler in handlers:
+            if handler.accepts_records:
+                for record in records:
+                    handler.write_record(record if handler.max_size is None else
+                                         limits.fit_record(record, handler.max_size))
+                continue
+            if log_lines is None:
+                log_lines = [formatter.format_record(record) for record in records]
+            if handler.max_size is None:
+                handler.write(''.join(log_lines))
+            else:
+                handler.write(''.join(limits.fit(line, handler.max_size) for line in log_lines))
+
+
+class SynchronousDispatcher(_DispatcherInterface):
+    """
+    ``SynchronousDispatcher`` formats and writes records on the calling thread. It is what a ``Logger`` uses unless
+    told otherwise.
+    """
+
+    def dispatch(self, record, formatter, handlers):
+        """formats and writes the record right away
+
+        :param record: the record to write
+        :type record: LogRecord
+
+        :param formatter: the formatter for handlers that want strings
+        :type formatter: Formatter
+
+        :param handlers: the handlers to write to
+        :type handlers: set of _HandlerInterface
+        """
+        self.emit(record, formatter, handlers)
+
+
+class DeferredDispatcher(_DispatcherInterface):
+    """
+    ``DeferredDispatcher`` moves formatting and writing onto a background thread. The calling thread only builds the
+    ``LogRecord`` -- an integer clock reading, the level, message, context snapshot and exception info -- and puts it
+    on a queue. Rendering the template, the ISO timestamp and the traceback as well as the handler writes all happen
+    on the worker.
+
+    Values in the context are rendered when the record is written, so mutable objects should be logged as the
+    values they hold at the time.
+
+    >>> dispatcher = DeferredDispatcher()
+    >>> logger = Logger(dispatcher=dispatcher)
+    >>> logger.info('formatted on another thread')
+    >>> dispatcher.flush()
+    """
+
+    _STOP = object()
+
+    def __init__(self, max_queue_size=0, block=True):
+        """
+        :param max_queue_size: the number of records that may wait to be written; unbounded if 0
+        :type max_queue_size: int
+
+        :param block: should the caller wait for room when the queue is full, rather than drop the record
+        :type block: bool
+        """
+        self.max_queue_size = max_queue_size
+        self.block = block
+        self.dropped = 0
+        self._closed = False
+        self._start()
+        forksafe.register(self, early=True)
+        atexit.register(self.close)
+
+    def dispatch(self, record, formatter, handlers):
+        """queues the record for the worker thread
+
+        :param record: the record to write
+        :type record: LogRecord
+
+        :param formatter: the formatter for handlers that want strings
+        :type formatter: Formatter
+
+        :param handlers: the handlers to write to
+        :type handlers: set of _HandlerInterface
+        """
+        try:
+            self._queue.put((record, formatter, handlers), self.block)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """waits until every queued record has been written"""
+        if not self._closed:
+            self._queue.join()
+
+    def close(self):
+        """writes out the queued records and stops the worker thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def after_fork(self):
+        """starts a new queue and worker thread in the child"""
+        if not self._closed:
+            self._start()
+
+    def _start(self):
+        self._queue = queue.Queue(self.max_queue_size)
+        self._thread = threading.Thread(target=self._work, name='log-deferred-dispatcher')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is self._STOP:
+                    return
+                self.emit(*item)
+            except Exception as e:
+                sys.stderr.write('{}: failed to write log record: {!r}\n'.format(type(self).__name__, e))
+            finally:
+                self._queue.task_done()
+
+
+class PriorityDispatcher(_DispatcherInterface):
+    """
+    ``PriorityDispatcher`` writes records on a background thread from one lane per ``LogLevel``, always serving the
+    most severe lane first, so errors go out ahead of a DEBUG backlog.
+
+    When more than ``max_pending`` records, or roughly ``max_bytes`` of them, are waiting, the oldest records of the
+    least severe lane below the incoming record's level are shed to make room; if there is no such lane the incoming
+    record is shed itself. Records at a ``protected_levels`` level are never shed, the caller waits for room instead.
+    Shed counts are written into the log stream as a WARNING every ``report_interval`` seconds, and kept in
+    ``shed_totals``.
+
+    >>> logger = Logger(dispatcher=PriorityDispatcher(max_pending=1000))
+    """
+
+    RECORD_OVERHEAD = 256
+
+    def __init__(self, max_pending=10000, max_bytes=None, protected_levels=(LogLevel.ERROR, LogLevel.EXCEPTION),
+                 report_interval=1.0):
+        """
+        :param max_pending: the number of records that may wait to be written
+        :type max_pending: int
+
+        :param max_bytes: the approximate memory, in bytes, that waiting records may take up; unbounded if not given
+        :type max_bytes: int
+
+        :param protected_levels: levels that are never shed
+        :type protected_levels: list of LogLevel
+
+        :param report_interval: the minimum number of seconds between reports of shed records
+        :type report_interval: float
+        """
+        self.max_pending = max_pending
+        self.max_bytes = max_bytes
+        self.protected_levels = frozenset(protected_levels)
+        self.report_interval = report_interval
+        self.shed_totals = dict((level, 0) for level in LogLevel)
+
+        self._levels = sorted(LogLevel, reverse=True)
+        self._closed = False
+        self._start()
+        forksafe.register(self, early=True)
+        atexit.register(self.close)
+
+    def dispatch(self, record, formatter, handlers):
+        """queues the record in the lane of its level, shedding less severe records if there is no room
+
+        :param record: the record to write
+        :type record: LogRecord
+
+        :param formatter: the formatter for handlers that want strings
+        :type formatter: Formatter
+
+        :param handlers: the handlers to write to
+        :type handlers: set of _HandlerInterface
+        """
+        level = record.level
+        size = self._size(record)
+        with self._condition:
+            while self._is_full(size):
+                if self._shed_below(level):
+                    continue
+                if level not in self.protected_levels:
+                    self._shed[level] += 1
+                    self.shed_totals[level] += 1
+                    return
+                self._condition.wait()
+            self._lanes[level].append((record, formatter, handlers, size))
+            self._pending += 1
+            self._pending_bytes += size
+            self._condition.notify_all()
+
+    def flush(self):
+        """waits until every queued record has been written"""
+        with self._condition:
+            while self._pending or self._in_flight:
+                self._condition.wait()
+
+    def close(self):
+        """writes out the queued records and stops the worker thread"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def after_fork(self):
+        """starts with empty lanes and a new worker thread in the child"""
+        if not self._closed:
+            self._start()
+
+    def _start(self):
+        self._lanes = dict((level, collections.deque()) for level in LogLevel)
+        self._pending = 0
+        self._pending_bytes = 0
+        self._in_flight = 0
+        self._shed = dict((level, 0) for level in LogLevel)
+        self._last_report = time.time()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._work, name='log-priority-dispatcher')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _size(self, record):
+        if self.max_bytes is None:
+            return 0
+        message = record.message
+        if not isinstance(message, six.string_types):
+            # sized by the text it will be formatted to; a message without one only costs the overhead
+            try:
+                message = six.text_type(message)
+            except Exception:
+                return self.RECORD_OVERHEAD
+        return self.RECORD_OVERHEAD + len(message)
+
+    def _is_full(self, size):
+        if self._pending >= self.max_pending:
+            return True
+        return self.max_bytes is not None and self._pending and self._pending_bytes + size > self.max_bytes
+
+    def _shed_below(self, level):
+        for lane_level in reversed(self._levels):
+            if lane_level >= level:
+                return False
+            lane = self._lanes[lane_level]
+            if lane and lane_level not in self.protected_levels:
+                size = lane.popleft()[3]
+                self._pending -= 1
+                self._pending_bytes -= size
+                self._shed[lane_level] += 1
+                self.shed_totals[lane_level] += 1
+                return True
+        return False
+
+    def _next(self):
+        for level in self._levels:
+            lane = self._lanes[level]
+            if lane:
+                record, formatter, handlers, size = lane.popleft()
+                self._pending -= 1
+                self._pending_bytes -= size
+                return record, formatter, handlers
+        return None
+
+    def _take_report(self, force):
+        if not any(self._shed.values()):
+            return None
+        now = time.time()
+        if not force and now - self._last_report < self.report_interval:
+            return None
+        counts = ', '.join('{} {}'.format(count, level) for level, count in sorted(self._shed.items()) if count)
+        self._shed = dict((level, 0) for level in LogLevel)
+        self._last_report = now
+        return 'shed {} log entries under load'.format(counts)
+
+    def _work(self):
+        last = None
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                item = self._next()
+                report = self._take_report(force=not self._pending)
+                if item is None and (report is None or last is None):
+                    return
+                last = item or last
+                self._in_flight += 1
+            try:
+                if item is not None:
+                    self.emit(*item)
+                if report is not None:
+                    record, formatter, handlers = last
+                    self.emit(LogRecord(record.name, LogLevel.WARNING, report, timezone=record.timezone), formatter,
+                              handlers)
+            except Exception as e:
+                sys.stderr.write('{}: failed to write log record: {!r}\n'.format(type(self).__name__, e))
+            finally:
+                with self._condition:
+                    self._in_flight -= 1
+                    self._condition.notify_all()
+
+
+class _Lane(object):
+    """the queue, and circuit breaker, of one handler of a ``ConcurrentDispatcher``"""
+
+    __slots__ = ('handler', 'timeout', 'items', 'scheduled', 'busy_since', 'stalled', 'failures', 'opened_at',
+                 'dropped')
+
+    def __init__(self, handler, timeout):
+        self.handler = handler
+        self.timeout = timeout
+        self.items = collections.deque()
+        self.scheduled = False
+        self.busy_since = None
+        self.stalled = False
+        self.failures = 0
+        self.opened_at = None
+        self.dropped = 0
+
+
+class ConcurrentDispatcher(_DispatcherInterface):
+    """
+    ``ConcurrentDispatcher`` writes to each handler from a small pool of worker threads, so a slow or failing handler
+    doesn't hold up the others. Every handler has a queue of its own, written in order by one worker at a time, and
+    a string is formatted at most once per record however many handlers want it.
+
+    Each handler also has a circuit breaker. It opens when a write has been running longer than the handler's
+    timeout, ``timeouts`` gives one per handler and ``timeout`` the others', or after ``max_failures`` writes in a row
+    raised. A watchdog thread looks for stalled writes, so a hung handler is isolated even when nothing more is
+    logged. While the breaker is open the handler's records are dropped and counted in ``dropped``, and a stalled
+    worker is replaced so the pool keeps its size. After ``reset_after`` seconds records are let through again; a
+    single failure opens the breaker anew, a success closes it.
+
+    >>> socket_handler = SocketHandler(sock, address)
+    >>> logger = Logger(handlers=[StreamHandler(sys.stdout), socket_handler],
+    ...                 dispatcher=ConcurrentDispatcher(timeout=0.5, timeouts={socket_handler: 2.0}))
+    """
+
+    def __init__(self, max_workers=4, timeout=1.0, max_failures=3, reset_after=30.0, max_queue_size=10000,
+                 timeouts=None):
+        """
+        :param max_workers: the number of worker threads
+        :type max_workers: int
+
+        :param timeout: the number of seconds a single write may take before the handler is isolated
+        :type timeout: float
+
+        :param max_failures: the number of writes in a row that may raise before the handler is isolated
+        :type max_failures: int
+
+        :param reset_after: the number of seconds a handler stays isolated
+        :type reset_after: float
+
+        :param max_queue_size: the number of records that may wait for one handler; more are dropped
+        :type max_queue_size: int
+
+        :param timeouts: the ``timeout`` of particular handlers, keyed by the handler or its name
+        :type timeouts: dict
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.max_failures = max_failures
+        self.reset_after = reset_after
+        self.max_queue_size = max_queue_size
+        self._closed = False
+        self._start()
+        forksafe.register(self, early=True)
+        atexit.register(self.close)
+
+    @property
+    def dropped(self):
+        """the number of records dropped for each handler, while it was isolated or its queue was full"""
+        with self._condition:
+            return dict((lane.handler, lane.dropped) for lane in self._lanes.values() if lane.dropped)
+
+    @property
+    def isolated(self):
+        """the handlers whose circuit breaker is open"""
+        with self._condition:
+            return [lane.handler for lane in self._lanes.values() if lane.opened_at is not None]
+
+    def dispatch(self, record, formatter, handlers):
+        """queues the record for each handler that isn't isolated
+
+        :param record: the record to write
+        :type record: LogRecord
+
+        :param formatter: the formatter for handlers that want strings
+        :type formatter: Formatter
+
+        :param handlers: the handlers to write to
+        :type handlers: set of _HandlerInterface
+        """
+        now = time.time()
+        line = [None]
+        with self._condition:
+            for handler in handlers:
+                lane = self._lanes.get(handler)
+                if lane is None:
+                    lane = self._lanes[handler] = _Lane(handler, self._timeout_of(handler))
+                if not self._admit(lane, now):
+                    lane.dropped += 1
+                    continue
+                lane.items.append((record, formatter, line))
+                if not lane.scheduled:
+                    lane.scheduled = True
+                    self._ready.append(lane)
+                    self._condition.notify()
+
+    def flush(self):
+        """waits until every queued record has been written, or its handler isolated"""
+        with self._condition:
+            while True:
+                now = time.time()
+                for lane in list(self._lanes.values()):
+                    self._check_stall(lane, now)
+                if not any(lane.items or (lane.busy_since is not None and not lane.stalled)
+                           for lane in self._lanes.values()):
+                    return
+                self._condition.wait(self.timeout)
+
+    def close(self):
+        """writes out the queued records and stops the worker threads"""
+        if self._closed:
+            return
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(self.timeout)
+        self._watchdog.join(self.timeout)
+
+    def after_fork(self):
+        """starts with empty queues and new worker threads in the child"""
+        if not self._closed:
+            self._start()
+
+    def _start(self):
+        self._lanes = {}
+        self._ready = collections.deque()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._workers = 0
+        for _ in range(self.max_workers):
+            self._spawn()
+        self._watchdog = threading.Thread(target=self._watch, name='log-concurrent-dispatcher-watchdog')
+        self._watchdog.daemon = True
+        self._watchdog.start()
+
+    def _spawn(self):
+        self._workers += 1
+        thread = threading.Thread(target=self._work, name='log-concurrent-dispatcher')
+        thread.daemon = True
+        thread.start()
+        self._threads.append(thread)
+
+    def _admit(self, lane, now):
+        self._check_stall(lane, now)
+        if lane.opened_at is not None:
+            if now - lane.opened_at < self.reset_after or lane.busy_since is not None:
+                return False
+            lane.opened_at = None
+            lane.failures = self.max_failures - 1
+        return len(lane.items) < self.max_queue_size
+
+    def _timeout_of(self, handler):
+        timeout = self.timeouts.get(handler)
+        if timeout is None and handler.name is not None:
+            timeout = self.timeouts.get(handler.name)
+        return self.timeout if timeout is None else timeout
+
+    def _watch(self):
+        interval = min([self.timeout] + list(self.timeouts.values())) / 2.0
+        with self._condition:
+            while not self._closed:
+                self._condition.wait(interval)
+                now = time.time()
+                for lane in list(self._lanes.values()):
+                    self._check_stall(lane, now)
+
+    def _check_stall(self, lane, now):
+        if lane.busy_since is None or lane.stalled or now - lane.busy_since <= lane.timeout:
+            return
+        lane.stalled = True
+        self._trip(lane, 'stalled for more than {} seconds'.format(lane.timeout))
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        self._spawn()
+
+    def _trip(self, lane, reason):
+        lane.opened_at = time.time()
+        lane.dropped += len(lane.items)
+        lane.items.clear()
+        sys.stderr.write('{}: isolated {} for {} seconds, it {}\n'.format(
+            type(self).__name__, lane.handler.name or type(lane.handler).__name__, self.reset_after, reason))
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._ready and not self._closed:
+                    self._condition.wait()
+                if not self._ready:
+                    return
+                lane = self._ready.popleft()
+                items = list(lane.items)
+                lane.items.clear()
+            for i, (record, formatter, line) in enumerate(items):
+                if lane.opened_at is not None:
+                    with self._condition:
+                        lane.dropped += len(items) - i
+                    break
+                lane.busy_since = time.time()
+                self._write(lane, record, formatter, line)
+            with self._condition:
+                lane.busy_since = None
+                stalled, lane.stalled = lane.stalled, False
+                if lane.items and lane.opened_at is None:
+                    self._ready.append(lane)
+                else:
+                    lane.scheduled = False
+                self._condition.notify_all()
+                if stalled:
+                    # a replacement was started when this worker stalled
+                    self._workers -= 1
+                    return
+
+    def _write(self, lane, record, formatter, line):
+        handler = lane.handler
+        try:
+            if handler.accepts_records:
+                handler.write_record(record if handler.max_size is None else
+                                     limits.fit_record(record, handler.max_size))
+            else:
+                if line[0] is None:
+                    line[0] = formatter.format_record(record)
+                handler.write(line[0] if handler.max_size is None else limits.fit(line[0], handler.max_size))
+        except Exception as e:
+            with self._condition:
+                lane.failures += 1
+                if lane.failures >= self.max_failures and lane.opened_at is None:
+                    self._trip(lane, 'failed {} times in a row, last with {!r}'.format(lane.failures, e))
+            return
+        if lane.failures:
+            lane.failures = 0
@@ -24,3 +24,10 @@ class FormatterNotFoundError(Exception):
     raised when trying to use a specific formatter that isn't registered to the logger
     """
     pass
+
+
+class CorruptSegmentError(Exception):
+    """
+    raised when a binary log segment doesn't start with the expected header
+    """
+    pass
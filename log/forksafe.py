@@ -0,0 +1,53 @@
+import os
+import sys
+import weakref
+
+
+_early = weakref.WeakSet()
+_late = weakref.WeakSet()
+_pid = os.getpid()
+
+
+def register(obj, early=False):
+    """adds an object whose ``before_fork`` and ``after_fork`` should run around ``os.fork``
+
+    ``before_fork`` runs in the parent and should write out anything buffered, so the child doesn't inherit and
+    repeat it. ``after_fork`` runs in the child and should replace whatever it would otherwise share with its parent:
+    open files, connections, locks, queues and background threads, which don't survive a fork.
+
+    :param obj: the handler, dispatcher or other object to register; only a weak reference is kept
+    :type obj: object
+
+    :param early: should the object's hooks run before those of ordinary handlers, e.g. because it writes to them
+    :type early: bool
+    """
+    (_early if early else _late).add(obj)
+
+
+def _run(hook):
+    for registry in (_early, _late):
+        for obj in list(registry):
+            try:
+                getattr(obj, hook)()
+            except Exception as e:
+                sys.stderr.write('{}: {} failed: {!r}\n'.format(type(obj).__name__, hook, e))
+
+
+def _before_fork():
+    _run('before_fork')
+
+
+def _after_fork_in_child():
+    global _pid
+    _pid = os.getpid()
+    _run('after_fork')
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=_before_fork, after_in_child=_after_fork_in_child)
+
+    def getpid():
+        """returns the id of the current process, cached and refreshed after every fork"""
+        return _pid
+else:  # pragma: no cover
+    getpid = os.getpid
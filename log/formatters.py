@@ -1,6 +1,10 @@
+import json
+import math
 import re
 
 from .errors import BadTemplateError, ConfigurationError
+from .levels import LogLevel
+from .records import LogRecord
 
 
 class TemplateStyle(object):
@@ -107,6 +111,11 @@ class Formatter(object):
     def template(self):
         return self._template
 
+    @property
+    def template_keys(self):
+        """the interpolation keys of the template, extracted once when the template is set"""
+        return self._template_keys
+
     @template.setter
     def template(self, template):
         self._setup_template(template)
@@ -131,6 +140,16 @@ class Formatter(object):
             message = "{}\n".format(message)
         return message
 
+    def format_record(self, record):
+        """formats a log record, rendering only the lazy values the template uses
+
+        :param record: the record to format
+        :type record: LogRecord
+
+        :returns: the template formatted with the record's values
+        """
+        return self.format(**record.to_params(self._template_keys))
+
     def extract_template_keys(self):
         """searches the template for iterpolation keys
 
@@ -158,6 +177,7 @@ class Formatter(object):
         else:
             self._template_format_fnc, self._template_style = None, None
         self._template = template
+        self._template_keys = frozenset(self.extract_template_keys()) if template else frozenset()
 
     def __str__(self):
         """String representation of a Formatter.
@@ -166,3 +186,187 @@ class Formatter(object):
         for att in sorted('append_new_line name _template _template_style'.split()):
             rv += "{} = {}; ".format( att, getattr(self, att) )
         return rv
+
+
+class JSONFormatter(Formatter):
+    """
+    ``JSONFormatter`` writes every entry as one JSON object per line. ``fields`` come first, in order, followed by
+    the additional context. The key prefixes are precompiled once, strings are escaped with the json module's C
+    encoder, and values of other types are converted with ``default`` (``str`` unless given) so a stray object never
+    breaks an entry. Templates are ignored.
+
+    >>> formatter = JSONFormatter()
+    >>> formatter.format(timestamp='now', level=LogLevel.INFO, name='app', message='say "hi"\\n', user='bond')
+    {"timestamp":"now","level":"INFO","name":"app","message":"say \\"hi\\"\\n","user":"bond"}
+    """
+
+    DEFAULT_FIELDS = ('timestamp', 'level', 'name', 'message')
+    IGNORED_CONTEXT_KEYS = LogRecord.BASE_KEYS | {'local_call_depth'}
+
+    def __init__(self, name=None, fields=None, include_context=True, default=None, ensure_ascii=False,
+                 append_new_line=True, template=None):
+        """
+        :param name: the name of the formatter
+        :type name: str
+
+        :param fields: the keys to write first and in order; missing values are written as ``null``
+        :type fields: list of str
+
+        :param include_context: should the additional context be written after the fields
+        :type include_context: bool
+
+        :param default: converts values json can't represent into ones it can; ``str`` if not given
+        :type default: callable
+
+        :param ensure_ascii: should non-ASCII characters be escaped
+        :type ensure_ascii: bool
+
+        :param append_new_line: should a new line character be appended to the end of the log entry
+        :type append_new_line: bool
+
+        :param template: accepted for compatibility with ``Formatter`` and ignored
+        :type template: str
+        """
+        self.fields = tuple(self.DEFAULT_FIELDS if fields is None else fields)
+        self.include_context = include_context
+        self.default = default or str
+        self.ensure_ascii = ensure_ascii
+        self._encode_str = json.encoder.encode_basestring_ascii if ensure_ascii else json.encoder.encode_basestring
+        self._encoders = {
+            str: self._encode_str,
+            int: int.__repr__,
+            bool: lambda value: 'true' if value else 'false',
+            float: self._encode_float,
+            type(None): lambda value: 'null',
+            LogLevel: dict((level, '"{}"'.format(level)) for level in LogLevel).__getitem__,
+        }
+        self._layout = tuple(
+            (key, '{}{}:'.format('{' if i == 0 else ',', self._encode_str(key))) for i, key in enumerate(self.fields))
+        self._skipped_context_keys = self.IGNORED_CONTEXT_KEYS | frozenset(self.fields)
+        self._record_layout = tuple((self._record_getter(key), prefix) for key, prefix in self._layout)
+        self._context_prefixes = {}
+        self._json_encoder = json.JSONEncoder(ensure_ascii=ensure_ascii, separators=(',', ':'), default=self.default,
+                                              allow_nan=False)
+        super(JSONFormatter, self).__init__(name=name, template=template, append_new_line=append_new_line)
+
+    def format(self, **params):
+        """serializes the parameters as a JSON object
+
+        :param params: the fields and context of the entry
+        :type params: dict
+
+        :returns: the JSON object
+
+        >>> formatter = JSONFormatter(fields=['level', 'message'], include_context=False)
+        >>> formatter.format(level='INFO', message='hey there', user='bond')
+        {"level":"INFO","message":"hey there"}
+        """
+        encode = self._encode
+        parts = []
+        for key, prefix in self._layout:
+            parts.append(prefix)
+            parts.append(encode(params.pop(key, None)))
+        if self.include_context:
+            ignored, prefixes = self.IGNORED_CONTEXT_KEYS, self._context_prefixes
+            for key, value in params.items():
+                if key in ignored:
+                    continue
+                prefix = prefixes.get(key)
+                if prefix is None:
+                    prefix = prefixes[key] = ',{}:'.format(self._encode_str(key))
+                parts.append(prefix)
+                parts.append(encode(value))
+        body = ''.join(parts)
+        if not self._layout:
+            body = '{' + body[1:]
+        return body + '}\n' if self.append_new_line else body + '}'
+
+    def format_record(self, record):
+        """serializes a log record as a JSON object, reading the fields straight off the record
+
+        :param record: the record to format
+        :type record: LogRecord
+
+        :returns: the JSON object
+        """
+        encode = self._encode
+        parts = []
+        for getter, prefix in self._record_layout:
+            parts.append(prefix)
+            parts.append(encode(getter(record)))
+        if self.include_context:
+            skipped, prefixes = self._skipped_context_keys, self._context_prefixes
+            for key, value in record.context.items():
+                if key in skipped:
+                    continue
+                prefix = prefixes.get(key)
+                if prefix is None:
+                    prefix = prefixes[key] = ',{}:'.format(self._encode_str(key))
+                parts.append(prefix)
+                parts.append(encode(value))
+        body = ''.join(parts)
+        if not self._layout:
+            body = '{' + body[1:]
+        return body + '}\n' if self.append_new_line else body + '}'
+
+    def extract_template_keys(self):
+        """returns the keys written as fields
+
+        :returns: a list of keys
+        """
+        return list(self.fields)
+
+    def _setup_template(self, template):
+        self._template_format_fnc, self._template_style = None, None
+        self._template = template
+        self._template_keys = frozenset(self.fields)
+
+    def _encode(self, value):
+        encoder = self._encoders.get(type(value))
+        if encoder is not None:
+            return encoder(value)
+        try:
+            return self._json_encoder.encode(value)
+        except ValueError as e:
+            if 'Circular reference' in str(e):
+                return self._encode_repr(value)
+            # NaN and infinity nested in the value, which JSON can't represent, are written as strings
+            try:
+                return self._json_encoder.encode(self._finite(value, set()))
+            except (TypeError, ValueError, RuntimeError):
+                return self._encode_repr(value)
+        except (TypeError, RuntimeError):
+            return self._encode_repr(value)
+
+    def _encode_repr(self, value):
+        try:
+            return self._encode_str(repr(value))
+        except RuntimeError:
+            return self._encode_str(object.__repr__(value))
+
+    def _finite(self, value, seen):
+        if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+            return repr(value)
+        if not isinstance(value, (dict, list, tuple)):
+            return value
+        if id(value) in seen:
+            raise ValueError('circular reference')
+        seen.add(id(value))
+        try:
+            if isinstance(value, dict):
+                return dict((key, self._finite(item, seen)) for key, item in value.items())
+            return [self._finite(item, seen) for item in value]
+        finally:
+            seen.discard(id(value))
+
+    def _record_getter(self, key):
+        if key == 'message':
+            return lambda record: record.context.get(key, record.text)
+        if key in LogRecord.BASE_KEYS:
+            return lambda record: record.context.get(key, getattr(record, key))
+        return lambda record: record.context.get(key)
+
+    def _encode_float(self, value):
+        if math.isnan(value) or math.isinf(value):
+            return self._encode_str(repr(value))
+        return float.__repr__(value)
@@ -1,14 +1,58 @@
+import atexit
 import codecs
+import collections
+import heapq
+import itertools
+import operator
+import socket
+import sys
+import threading
+import time
+import weakref
+import zlib
+
 import six
 
+from . import forksafe
+from .levels import LogLevel
+from .records import LogRecord
+
+
+def _socket_family(address):
+    return socket.AF_UNIX if isinstance(address, six.string_types) else socket.AF_INET
+
+
+def _header_field(value, length):
+    # header fields are printable US-ASCII without spaces, or "-" when empty
+    value = ''.join(c if '!' <= c <= '~' else '_' for c in (value or ''))[:length]
+    return value or '-'
+
 
 class _HandlerInterface(object):
     """
     the common interface that all handlers must subclass
+
+    handlers are given formatted strings through ``write``. a handler that would rather have the raw values sets
+    ``accepts_records`` and implements ``write_record``, which is then called instead with the entry's
+    ``LogRecord``.
+
+    handlers are fork aware: ``before_fork`` and ``after_fork`` run around every ``os.fork``.
+
+    handlers shared through a ``HandlerPool`` have it as their ``pool``; loggers release them to it instead of
+    closing them.
+
+    set ``max_size`` to have dispatchers truncate, with a marker, the formatted entries longer than that many
+    characters before they are written to the handler; handlers that accept records are given a copy of the record
+    whose message, traceback included, is truncated instead.
     """
 
+    accepts_records = False
+    pool = None
+    max_size = None
+
     def __init__(self, name):
         self.name = name
+        forksafe.register(self)
 
     def __lt__(self, other):
         return self.name < other.name
@@ -31,6 +75,25 @@ class _HandlerInterface(object):
     def write(self, message):
         raise NotImplementedError
 
+    def write_record(self, record):
+        raise NotImplementedError
+
+    def flush(self):
+        """writes out anything the handler has buffered"""
+        pass
+
+    def close(self):
+        """flushes the handler and releases its resources"""
+        self.flush()
+
+    def before_fork(self):
+        """flushes the handler in the parent before a fork, so the child doesn't inherit buffered entries"""
+        self.flush()
+
+    def after_fork(self):
+        """gives the handler in the child its own files and connections after a fork"""
+        pass
+
 
 class StreamHandler(_HandlerInterface):
     """
@@ -60,6 +123,10 @@ class StreamHandler(_HandlerInterface):
         self.stream.write(message)
         self.stream.flush()
 
+    def flush(self):
+        """flushes the stream"""
+        self.stream.flush()
+
 
 class FileHandler(_HandlerInterface):
     """
@@ -90,7 +157,9 @@ class FileHandler(_HandlerInterface):
         :type name: str
         """
         super(FileHandler, self).__init__(name)
+        self.filename = filename
         self.fh = codecs.open(filename, mode=mode, encoding=encoding, errors=errors, buffering=buffering)
+        self._open_args = dict(encoding=encoding, errors=errors, buffering=buffering)
 
     def write(self, message):
         """writes the message to the configured file
@@ -102,6 +171,22 @@ class FileHandler(_HandlerInterface):
         self.fh.write(message)
         self.fh.flush()
 
+    def flush(self):
+        """flushes the file"""
+        if not self.fh.closed:
+            self.fh.flush()
+
+    def close(self):
+        """closes the file"""
+        self.fh.close()
+
+    def after_fork(self):
+        """reopens the file, for appending, so the child has a file object of its own"""
+        if self.fh.closed:
+            return
+        self.fh.close()
+        self.fh = codecs.open(self.filename, mode='a', **self._open_args)
+
 
 class SocketHandler(_HandlerInterface):
     """
@@ -133,6 +218,7 @@ class SocketHandler(_HandlerInterface):
         """
         super(SocketHandler, self).__init__(name)
         self.socket = socket
+        self.address = address
         self.socket.connect(address)
         self.encoding = encoding
 
@@ -148,3 +234,621 @@ class SocketHandler(_HandlerInterface):
             self.socket.sendall(bytes(message, self.encoding))
         else:
             self.socket.sendall(message)
+
+    def close(self):
+        """closes the socket"""
+        self.socket.close()
+
+    def after_fork(self):
+        """connects a new socket, so the child's entries don't interleave with its parent's on one stream"""
+        if self.socket.fileno() < 0:
+            return
+        inherited = self.socket
+        self.socket = socket.socket(inherited.family, inherited.type, inherited.proto)
+        inherited.close()
+        self.socket.connect(self.address)
+
+
+class ThreadBufferedHandler(_HandlerInterface):
+    """
+    ``ThreadBufferedHandler`` lets many threads write to another handler without a lock on the write path. Each
+    thread appends its entries, stamped from a global sequence, to a buffer of its own; a single flusher thread
+    takes the buffers every ``flush_interval`` seconds, merges them by sequence and hands the result to the wrapped
+    handler in one write. Entries are never split, each thread's entries keep their order, and the wrapped handler
+    is only ever called from one thread at a time.
+
+    >>> handler = ThreadBufferedHandler(FileHandler('/var/log/app.log'))
+    """
+
+    def __init__(self, handler, flush_interval=0.05, batch_size=1000, name=None):
+        """
+        :param handler: the handler to write to
+        :type handler: _HandlerInterface
+
+        :param flush_interval: the longest time in seconds an entry waits in a buffer
+        :type flush_interval: float
+
+        :param batch_size: the number of entries in one thread's buffer that wakes the flusher early
+        :type batch_size: int
+
+        :param name: the name of the handler
+        :type name: str
+        """
+        super(ThreadBufferedHandler, self).__init__(name)
+        self.handler = handler
+        self.accepts_records = handler.accepts_records
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._closed = False
+        self._start()
+        atexit.register(self.close)
+
+    def write(self, message):
+        """appends the message to the calling thread's buffer
+
+        :param message: what you want logged
+        :type message: str
+        """
+        self._buffer().append((next(self._sequence), message))
+
+    def write_record(self, record):
+        """appends the record to the calling thread's buffer
+
+        :param record: the record of the entry
+        :type record: LogRecord
+        """
+        self._buffer().append((next(self._sequence), record))
+
+    def flush(self):
+        """merges every thread's buffer into the wrapped handler"""
+        with self._flush_lock:
+            batches = []
+            for thread, buffer in list(self._buffers):
+                batch = []
+                while buffer:
+                    batch.append(buffer.popleft())
+                if batch:
+                    batches.append(batch)
+                elif thread() is None or not thread().is_alive():
+                    self._buffers.remove((thread, buffer))
+            if not batches:
+                return
+            entries = [entry for _, entry in heapq.merge(*batches, key=operator.itemgetter(0))]
+            if self.accepts_records:
+                for record in entries:
+                    self.handler.write_record(record)
+            else:
+                self.handler.write(''.join(entries))
+            self.handler.flush()
+
+    def close(self):
+        """stops the flusher, writes out the buffers and closes the wrapped handler"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+        self.handler.close()
+
+    def after_fork(self):
+        """starts with empty buffers and a new flusher thread in the child"""
+        if not self._closed:
+            self._start()
+
+    def _start(self):
+        self._sequence = itertools.count()
+        self._local = threading.local()
+        self._buffers = []
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._flush_periodically, name='log-thread-buffered-handler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _buffer(self):
+        try:
+            buffer = self._local.buffer
+        except AttributeError:
+            buffer = self._local.buffer = collections.deque()
+            with self._flush_lock:
+                self._buffers.append((weakref.ref(threading.current_thread()), buffer))
+        if len(buffer) >= self.batch_size:
+            self._wakeup.set()
+        return buffer
+
+    def _flush_periodically(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                sys.stderr.write('{}: failed to write log entries: {!r}\n'.format(type(self).__name__, e))
+
+
+class _DatagramHandlerInterface(_HandlerInterface):
+    """
+    the common machinery of handlers that send datagrams from one reused socket
+
+    subclasses build packets and hand them to ``_add``; packets are sent once ``batch_size`` of them are waiting, or
+    every ``flush_interval`` seconds from a background thread. the entries of the packets that were sent are counted
+    in ``sent`` and those of packets that couldn't be in ``dropped``, which never raise into the application;
+    ``packets`` counts the datagrams sent.
+    """
+
+    def __init__(self, address, batch_size, flush_interval, name):
+        super(_DatagramHandlerInterface, self).__init__(name)
+        self.address = address
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sent = 0
+        self.dropped = 0
+        self.packets = 0
+        self._closed = False
+        self._start()
+        atexit.register(self.close)
+
+    def flush(self):
+        """sends the waiting packets"""
+        with self._lock:
+            self._seal()
+            packets, self._packets = self._packets, []
+        if not packets:
+            return
+        with self._send_lock:
+            for packet, entries in packets:
+                try:
+                    self._socket.sendto(packet, self.address)
+                    self.packets += 1
+                    self.sent += entries
+                except (OSError, socket.error):
+                    self.dropped += entries
+
+    def close(self):
+        """sends the waiting packets and closes the socket"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+        with self._send_lock:
+            self._socket.close()
+
+    def after_fork(self):
+        """opens a socket and starts a flusher thread of the child's own"""
+        if self._closed:
+            return
+        self._socket.close()
+        self._start()
+
+    def _start(self):
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._packets = []
+        self._socket = socket.socket(_socket_family(self.address), socket.SOCK_DGRAM)
+        self._wakeup = threading.Event()
+        thread = threading.Thread(target=self._flush_periodically, name='log-{}'.format(type(self).__name__))
+        thread.daemon = True
+        thread.start()
+
+    def _add(self, packet, entries=1):
+        with self._lock:
+            self._packets.append((packet, entries))
+            full = len(self._packets) >= self.batch_size
+        if full:
+            self.flush()
+
+    def _seal(self):
+        pass
+
+    def _flush_periodically(self):
+        while not self._wakeup.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                sys.stderr.write('{}: failed to write log entries: {!r}\n'.format(type(self).__name__, e))
+
+
+class SyslogHandler(_DatagramHandlerInterface):
+    """
+    ``SyslogHandler`` sends entries to a syslog daemon as RFC 5424 messages, one per datagram, over a local UNIX
+    socket or UDP. The level of an entry sets its severity and the logger's name is the APP-NAME unless ``app_name``
+    is given; the header of each level and logger is built once and reused. Messages are sent in batches from one
+    socket, see ``_DatagramHandlerInterface``.
+
+    >>> handler = SyslogHandler()  # /dev/log
+    >>> handler = SyslogHandler(('syslog.example.com', 514), facility=16)
+    """
+
+    accepts_records = True
+
+    SEVERITIES = {
+        LogLevel.DEBUG: 7,
+        LogLevel.INFO: 6,
+        LogLevel.WARNING: 4,
+        LogLevel.ERROR: 3,
+        LogLevel.EXCEPTION: 2,
+        None: 5,
+    }
+
+    def __init__(self, address='/dev/log', facility=1, app_name=None, hostname=None, encoding='utf8', batch_size=32,
+                 flush_interval=0.1, name=None):
+        """
+        :param address: a UNIX socket path or a ``(host, port)`` tuple of the syslog daemon
+        :type address: str or tuple
+
+        :param facility: the syslog facility code, ``1`` (user-level) by default
+        :type facility: int
+
+        :param app_name: the APP-NAME of the messages; the logger's name if not given
+        :type app_name: str
+
+        :param hostname: the HOSTNAME of the messages; this host's name if not given
+        :type hostname: str
+
+        :param encoding: the encoding of the messages
+        :type encoding: str
+
+        :param batch_size: the number of messages sent at once
+        :type batch_size: int
+
+        :param flush_interval: the longest time in seconds a message waits before it is sent
+        :type flush_interval: float
+
+        :param name: the name of the handler
+        :type name: str
+        """
+        self.facility = facility
+        self.app_name = app_name
+        self.hostname = _header_field(hostname or socket.gethostname(), 255)
+        self.encoding = encoding
+        self._headers = {}
+        self._second = (None, None)
+        super(SyslogHandler, self).__init__(address, batch_size, flush_interval, name)
+
+    def write(self, message):
+        """sends a message that didn't come with a record, at the notice severity
+
+        :param message: what you want logged
+        :type message: str
+        """
+        self.write_record(LogRecord(None, None, message.rstrip('\n')))
+
+    def write_record(self, record):
+        """frames the record as a syslog message and adds it to the batch
+
+        :param record: the record of the entry
+        :type record: LogRecord
+        """
+        header = self._headers.get((record.level, record.name))
+        if header is None:
+            header = self._build_header(record.level, record.name)
+        prefix, suffix = header
+        self._add(prefix + self._timestamp(record.created) + suffix + record.text.encode(self.encoding))
+
+    def after_fork(self):
+        """rebuilds the headers with the child's process id"""
+        self._headers = {}
+        super(SyslogHandler, self).after_fork()
+
+    def _build_header(self, level, name):
+        priority = self.facility * 8 + self.SEVERITIES.get(level, 5)
+        app_name = _header_field(self.app_name or name, 48)
+        prefix = '<{}>1 '.format(priority).encode('ascii')
+        suffix = ' {} {} {} - - '.format(self.hostname, app_name, forksafe.getpid()).encode('ascii')
+        self._headers[(level, name)] = prefix, suffix
+        return prefix, suffix
+
+    def _timestamp(self, created):
+        seconds, nanoseconds = divmod(created, 1000000000)
+        second, text = self._second
+        if second != seconds:
+            text = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))
+            self._second = seconds, text
+        return '{}.{:06d}Z'.format(text, nanoseconds // 1000).encode('ascii')
+
+
+class DatagramHandler(_DatagramHandlerInterface):
+    """
+    ``DatagramHandler`` sends entries over UDP, fire and forget, packing as many whole lines into each datagram as
+    fit in ``mtu`` bytes. A datagram is sealed once the next line doesn't fit and sent as soon as ``batch_size`` of
+    them are waiting, or after at most ``flush_interval`` seconds. A line longer than ``mtu`` is truncated to fit, or
+    split into lines that fit, at a character boundary, and counted in ``overflows``. Lines that can't be sent are
+    counted in ``dropped``; neither ever raises into the application.
+
+    >>> handler = DatagramHandler(('metrics.example.com', 8125))
+    """
+
+    def __init__(self, address, mtu=1472, oversized='truncate', encoding='utf8', batch_size=1, flush_interval=0.1,
+                 name=None):
+        """
+        :param address: a ``(host, port)`` tuple, or a UNIX socket path, to send to
+        :type address: tuple or str
+
+        :param mtu: the largest datagram in bytes; 1472 fits an IPv4 UDP packet in an Ethernet frame
+        :type mtu: int
+
+        :param oversized: ``'truncate'`` or ``'split'`` lines longer than ``mtu``
+        :type oversized: str
+
+        :param encoding: the encoding of the entries
+        :type encoding: str
+
+        :param batch_size: the number of full datagrams sent at once
+        :type batch_size: int
+
+        :param flush_interval: the longest time in seconds an entry waits before it is sent
+        :type flush_interval: float
+
+        :param name: the name of the handler
+        :type name: str
+        """
+        if oversized not in ('truncate', 'split'):
+            raise ValueError("oversized must be 'truncate' or 'split', not {!r}".format(oversized))
+        self.mtu = mtu
+        self.oversized = oversized
+        self.encoding = encoding
+        self.overflows = 0
+        super(DatagramHandler, self).__init__(address, batch_size, flush_interval, name)
+
+    def write(self, message):
+        """packs the message into the current datagram
+
+        :param message: what you want logged
+        :type message: str
+        """
+        data = message.encode(self.encoding)
+        if not data.endswith(b'\n'):
+            data += b'\n'
+        lines = [data] if len(data) <= self.mtu else self._cut(data)
+        with self._lock:
+            if len(lines) > 1 or lines[0] is not data:
+                self.overflows += 1
+            for i, line in enumerate(lines):
+                if len(self._buffer) + len(line) > self.mtu:
+                    self._seal()
+                self._buffer += line
+                if i == 0:
+                    # an entry split over several lines counts once, with the packet holding its start
+                    self._buffered += 1
+            full = len(self._packets) >= self.batch_size
+        if full:
+            self.flush()
+
+    def _start(self):
+        self._buffer = bytearray()
+        self._buffered = 0
+        super(DatagramHandler, self)._start()
+
+    def _seal(self):
+        if self._buffer:
+            self._packets.append((bytes(self._buffer), self._buffered))
+            self._buffer = bytearray()
+            self._buffered = 0
+
+    def _cut(self, data):
+        lines = []
+        body = data[:-1]
+        while body:
+            piece = body[:self.mtu - 1]
+            if len(piece) < len(body):
+                # drop a character cut in half, unless nothing would be left of the piece
+                piece = piece.decode(self.encoding, 'ignore').encode(self.encoding) or piece
+            lines.append(piece + b'\n')
+            if self.oversized == 'truncate':
+                break
+            body = body[len(piece):]
+        return lines
+
+
+class HTTPHandler(_HandlerInterface):
+    """
+    ``HTTPHandler`` ships entries to a collector in batched POST requests from background threads, so the
+    application never waits on the network. A batch is sent once it holds ``batch_size`` entries or ``batch_bytes``
+    bytes, or after ``flush_interval`` seconds. Batches are sent over a pool of ``pool_size`` kept-alive connections,
+    each with a sender thread of its own; batches only keep their order with a single connection. Bodies may be
+    compressed with gzip.
+
+    A batch answered with a 5xx status, or whose connection failed, is retried up to ``max_retries`` times, waiting
+    ``backoff`` seconds and twice as long after every attempt. Batches that are rejected, run out of retries or don't
+    fit in the ``max_pending`` waiting batches are counted in ``dropped``; they never raise into the application.
+
+    >>> handler = HTTPHandler('https://collector.example.com/v1/logs', gzip=True)
+    """
+
+    def __init__(self, url, batch_size=500, batch_bytes=1024 * 1024, flush_interval=1.0, gzip=False, pool_size=1,
+                 timeout=5.0, max_retries=3, backoff=0.5, max_pending=100, headers=None, encoding='utf8', name=None):
+        """
+        :param url: the ``http`` or ``https`` URL to POST the batches to
+        :type url: str
+
+        :param batch_size: the number of entries sent in one request
+        :type batch_size: int
+
+        :param batch_bytes: the number of bytes, before compression, sent in one request
+        :type batch_bytes: int
+
+        :param flush_interval: the longest time in seconds an entry waits before it is sent
+        :type flush_interval: float
+
+        :param gzip: should the bodies be compressed with gzip
+        :type gzip: bool
+
+        :param pool_size: the number of connections, and threads sending on them
+        :type pool_size: int
+
+        :param timeout: the number of seconds connecting or waiting for a response may take
+        :type timeout: float
+
+        :param max_retries: the number of times a batch is sent again after a 5xx status or a failed connection
+        :type max_retries: int
+
+        :param backoff: the number of seconds before the first retry, doubled for every next one
+        :type backoff: float
+
+        :param max_pending: the number of sealed batches that may wait for a connection
+        :type max_pending: int
+
+        :param headers: additional headers of the requests
+        :type headers: dict
+
+        :param encoding: the encoding of the entries
+        :type encoding: str
+
+        :param name: the name of the handler
+        :type name: str
+        """
+        super(HTTPHandler, self).__init__(name)
+        parts = six.moves.urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError('{} is not an http or https URL'.format(url))
+        self.url = url
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.flush_interval = flush_interval
+        self.gzip = gzip
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_pending = max_pending
+        self.encoding = encoding
+        self.headers = {'Content-Type': 'text/plain; charset={}'.format(encoding)}
+        if gzip:
+            self.headers['Content-Encoding'] = 'gzip'
+        self.headers.update(headers or {})
+        self._connection_class = (six.moves.http_client.HTTPSConnection if parts.scheme == 'https'
+                                  else six.moves.http_client.HTTPConnection)
+        self._netloc = parts.netloc
+        self._path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        self.sent = 0
+        self.dropped = 0
+        self.retries = 0
+        self._closed = False
+        self._start()
+        atexit.register(self.close)
+
+    def write(self, message):
+        """adds the message to the current batch
+
+        :param message: what you want logged
+        :type message: str
+        """
+        with self._condition:
+            if not self._batch:
+                self._batch_created = time.time()
+            self._batch.append(message)
+            self._batch_size += len(message)
+            if len(self._batch) >= self.batch_size or self._batch_size >= self.batch_bytes:
+                self._seal()
+
+    def flush(self):
+        """sends the current batch and waits until every batch has been sent or dropped"""
+        with self._condition:
+            self._seal()
+            while (self._pending or self._in_flight) and not self._closed:
+                self._condition.wait(self.timeout)
+
+    def close(self):
+        """sends what is left and closes the connections"""
+        self.flush()
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def before_fork(self):
+        """hands the current batch to the parent's sender threads without waiting for the network, which may be
+        slow or down; the child starts without the parent's batches, which the parent still sends"""
+        with self._condition:
+            self._seal()
+
+    def after_fork(self):
+        """starts with an empty backlog, connections and threads of the child's own"""
+        if not self._closed:
+            self._start()
+
+    def _start(self):
+        self._batch = []
+        self._batch_size = 0
+        self._batch_created = None
+        self._pending = collections.deque()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._threads = [threading.Thread(target=self._send_periodically, name='log-http-handler')
+                         for _ in range(self.pool_size)]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def _seal(self):
+        if not self._batch:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += len(self._batch)
+        else:
+            self._pending.append(self._batch)
+            self._condition.notify()
+        self._batch = []
+        self._batch_size = 0
+
+    def _send_periodically(self):
+        connection = None
+        while True:
+            with self._condition:
+                while not self._pending:
+                    if self._batch and time.time() - self._batch_created >= self.flush_interval:
+                        self._seal()
+                        continue
+                    if self._closed:
+                        if connection is not None:
+                            connection.close()
+                        return
+                    self._condition.wait(self.flush_interval)
+                batch = self._pending.popleft()
+                self._in_flight += 1
+            try:
+                connection, delivered = self._post(connection, batch)
+            except Exception as e:
+                sys.stderr.write('{}: failed to write log entries: {!r}\n'.format(type(self).__name__, e))
+                delivered = False
+            with self._condition:
+                if delivered:
+                    self.sent += len(batch)
+                else:
+                    self.dropped += len(batch)
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def _post(self, connection, batch):
+        body = ''.join(batch).encode(self.encoding)
+        if self.gzip:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            body = compressor.compress(body) + compressor.flush()
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self._condition:
+                    self.retries += 1
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                if connection is None:
+                    connection = self._connection_class(self._netloc, timeout=self.timeout)
+                connection.request('POST', self._path, body, self.headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, socket.error, six.moves.http_client.HTTPException):
+                if connection is not None:
+                    connection.close()
+                connection = None
+                continue
+            if response.status < 300:
+                return connection, True
+            if response.status < 500:
+                sys.stderr.write('{}: {} rejected {} log entries with status {}\n'.format(
+                    type(self).__name__, self.url, len(batch), response.status))
+                return connection, False
+        return connection, False
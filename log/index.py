@@ -0,0 +1,251 @@
+import argparse
+import bisect
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+from .errors import ConfigurationError
+from .levels import LogLevel
+from .parsers import EntryParser, to_nanoseconds
+
+
+class LogIndex(object):
+    """
+    ``LogIndex`` is a sparse index over a plain log file. Every ``block_size`` bytes it records the offset of the
+    next entry together with that entry's timestamp, and for each block it keeps a bitmap of the levels found in
+    it. Queries bisect the timestamps and skip blocks without a wanted level, so only the blocks that can hold
+    matching entries are read, through ``mmap``.
+
+    The index is kept next to the log (``<filename>.idx`` by default) and is extended incrementally by ``update``;
+    only the last block is rescanned, plus whatever was written since.
+
+    >>> index = LogIndex('/var/log/app.log')
+    >>> index.update()
+    >>> for entry in index.query(start='2016-05-21T14:00:00-05:00', end='2016-05-21T14:10:00-05:00',
+    ...                          levels=[LogLevel.ERROR]):
+    ...     sys.stdout.write(entry.decode('utf8'))
+    """
+
+    MAGIC = b'LOGIDX01'
+    HEADER = struct.Struct('<8sQQQI')
+    BLOCK = struct.Struct('<QqB')
+    HEAD_SIZE = 4096
+    UNKNOWN_TIMESTAMP = -(1 << 63)
+
+    def __init__(self, filename, index_filename=None, block_size=65536, parser=None):
+        """
+        :param filename: the name of the log file to index
+        :type filename: str
+
+        :param index_filename: where to keep the index; defaults to the log's name with ``.idx`` appended
+        :type index_filename: str
+
+        :param block_size: the approximate number of bytes of log covered by one index block
+        :type block_size: int
+
+        :param parser: the parser that recognizes the start of an entry
+        :type parser: EntryParser
+        """
+        if block_size <= 0:
+            raise ConfigurationError('block_size must be a positive number of bytes')
+        self.filename = filename
+        self.index_filename = index_filename or '{}.idx'.format(filename)
+        self.block_size = block_size
+        self.parser = parser or EntryParser()
+
+        self.offsets = []
+        self.timestamps = []
+        self.bitmaps = []
+        self.indexed_size = 0
+        self._head_crc = 0
+        self._load()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def update(self):
+        """brings the index up to date with the log file and saves it
+
+        the last block is rescanned since entries may have been appended to it. if the log shrank or its head
+        changed, e.g. after rotation, the index is rebuilt from scratch.
+        """
+        size = os.path.getsize(self.filename)
+        if size < self.indexed_size or self._read_head_crc() != self._head_crc:
+            self._reset()
+        if size == self.indexed_size and self.offsets:
+            return
+        if self.offsets:
+            start = self.offsets.pop()
+            self.timestamps.pop()
+            self.bitmaps.pop()
+        else:
+            start = 0
+        self._scan(start)
+        self._head_crc = self._read_head_crc()
+        self._save()
+
+    def query(self, start=None, end=None, levels=None):
+        """finds the entries within a time range and with given levels
+
+        :param start: the earliest timestamp to include
+        :type start: int or str or datetime
+
+        :param end: the latest timestamp to include
+        :type end: int or str or datetime
+
+        :param levels: the levels to include; all of them if not given
+        :type levels: list of LogLevel
+
+        :returns: a generator of raw entries, continuation lines included
+        """
+        start = to_nanoseconds(start, naive_utcoffset=self.parser.naive_utcoffset)
+        end = to_nanoseconds(end, naive_utcoffset=self.parser.naive_utcoffset)
+        wanted = self._levels_mask(levels)
+        first = 0 if start is None else max(bisect.bisect_left(self.timestamps, start) - 1, 0)
+        last = len(self.offsets) if end is None else bisect.bisect_right(self.timestamps, end)
+        if first >= last:
+            return
+        with open(self.filename, 'rb') as fh:
+            if os.fstat(fh.fileno()).st_size == 0:
+                return
+            buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for block in range(first, last):
+                    if levels is not None and not self.bitmaps[block] & wanted:
+                        continue
+                    block_end = self.offsets[block + 1] if block + 1 < len(self.offsets) else self.indexed_size
+                    for prefix, entry in self._iter_block(buf, self.offsets[block], block_end):
+                        if start is not None and prefix.timestamp < start:
+                            continue
+                        if end is not None and prefix.timestamp > end:
+                            return
+                        if levels is not None and (prefix.level is None or not (1 << prefix.level.value) & wanted):
+                            continue
+                        yield entry
+            finally:
+                buf.close()
+
+    def _scan(self, start):
+        block_size = self.block_size
+        parse = self.parser.parse
+        offsets, timestamps, bitmaps = self.offsets, self.timestamps, self.bitmaps
+        pos = start
+        block_start = None
+        with open(self.filename, 'rb') as fh:
+            fh.seek(start)
+            for line in fh:
+                if not line.endswith(b'\n'):
+                    break
+                prefix = parse(line)
+                if prefix is not None:
+                    if block_start is None or pos - block_start >= block_size:
+                        block_start = pos
+                        offsets.append(pos)
+                        timestamps.append(prefix.timestamp)
+                        bitmaps.append(0)
+                    elif timestamps[-1] == self.UNKNOWN_TIMESTAMP:
+                        timestamps[-1] = prefix.timestamp
+                    if prefix.level is not None:
+                        bitmaps[-1] |= 1 << prefix.level.value
+                elif block_start is None:
+                    block_start = pos
+                    offsets.append(pos)
+                    timestamps.append(self.UNKNOWN_TIMESTAMP)
+                    bitmaps.append(0)
+                pos += len(line)
+        self.indexed_size = pos
+
+    def _iter_block(self, buf, start, end):
+        parse = self.parser.parse
+        prefix, entry_start = None, start
+        pos = start
+        while pos < end:
+            newline = buf.find(b'\n', pos, end)
+            line_end = end if newline < 0 else newline + 1
+            parsed = parse(buf[pos:line_end])
+            if parsed is not None:
+                if prefix is not None:
+                    yield prefix, buf[entry_start:pos]
+                prefix, entry_start = parsed, pos
+            pos = line_end
+        if prefix is not None:
+            yield prefix, buf[entry_start:end]
+
+    def _levels_mask(self, levels):
+        if levels is None:
+            return 0xff
+        mask = 0
+        for level in levels:
+            mask |= 1 << level.value
+        return mask
+
+    def _read_head_crc(self):
+        with open(self.filename, 'rb') as fh:
+            return zlib.crc32(fh.read(min(self.indexed_size, self.HEAD_SIZE))) & 0xffffffff
+
+    def _reset(self):
+        del self.offsets[:], self.timestamps[:], self.bitmaps[:]
+        self.indexed_size = 0
+        self._head_crc = 0
+
+    def _load(self):
+        if not os.path.exists(self.index_filename):
+            return
+        with open(self.index_filename, 'rb') as fh:
+            header = fh.read(self.HEADER.size)
+            if len(header) < self.HEADER.size:
+                return
+            magic, block_size, indexed_size, count, head_crc = self.HEADER.unpack(header)
+            if magic != self.MAGIC or block_size != self.block_size:
+                return
+            data = fh.read(count * self.BLOCK.size)
+        if len(data) < count * self.BLOCK.size:
+            return
+        for offset, timestamp, bitmap in (self.BLOCK.unpack_from(data, i * self.BLOCK.size) for i in range(count)):
+            self.offsets.append(offset)
+            self.timestamps.append(timestamp)
+            self.bitmaps.append(bitmap)
+        self.indexed_size = indexed_size
+        self._head_crc = head_crc
+
+    def _save(self):
+        tmp_filename = '{}.tmp'.format(self.index_filename)
+        with open(tmp_filename, 'wb') as fh:
+            fh.write(self.HEADER.pack(
+                self.MAGIC, self.block_size, self.indexed_size, len(self.offsets), self._head_crc))
+            fh.write(b''.join(self.BLOCK.pack(*block) for block in zip(self.offsets, self.timestamps, self.bitmaps)))
+        os.replace(tmp_filename, self.index_filename)
+
+
+def main(argv=None):
+    """command line entry point: ``python -m log.index [options] filename``
+
+    builds or updates the index of a log file, then writes the matching entries to stdout.
+    """
+    parser = argparse.ArgumentParser(prog='python -m log.index', description='seek through large log files')
+    parser.add_argument('filename', help='the log file to index and query')
+    parser.add_argument('--index', dest='index_filename', help='the index file (default: <filename>.idx)')
+    parser.add_argument('--block-size', type=int, default=65536, help='bytes of log per index block')
+    parser.add_argument('--start', help='earliest timestamp to include, ISO 8601')
+    parser.add_argument('--end', help='latest timestamp to include, ISO 8601')
+    parser.add_argument('--level', action='append', choices=[str(level) for level in LogLevel],
+                        help='a level to include; may be repeated')
+    parser.add_argument('--update-only', action='store_true', help='only bring the index up to date')
+    args = parser.parse_args(argv)
+
+    index = LogIndex(args.filename, index_filename=args.index_filename, block_size=args.block_size)
+    index.update()
+    if args.update_only:
+        return 0
+    levels = [LogLevel[level] for level in args.level] if args.level else None
+    out = getattr(sys.stdout, 'buffer', sys.stdout)
+    for entry in index.query(start=args.start, end=args.end, levels=levels):
+        out.write(entry)
+    out.flush()
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -31,3 +31,6 @@ class LogLevel(Enum):
 
     def __lt__(self, other):
         return self.value < other.value
+
+    def __hash__(self):
+        return hash(self.value)
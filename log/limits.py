@@ -0,0 +1,219 @@
+import collections
+import copy
+import io
+import os
+import tempfile
+import traceback
+
+import six
+from six.moves import reprlib
+
+
+CHUNK_SIZE = 64 * 1024
+
+CONTAINERS = (list, tuple, dict, set, frozenset, collections.deque, bytes, bytearray)
+
+SCALARS = (bool, float, type(None))
+
+_reprs = {}
+
+
+def truncate(text, limit, spilled_to=None, partial=False):
+    """shortens text to ``limit`` characters, marker included, if it is longer; to the marker alone if even that
+    doesn't fit
+
+    :param text: the text to shorten
+    :type text: str
+
+    :param limit: the largest number of characters to keep
+    :type limit: int
+
+    :param spilled_to: the file the whole text was written to, mentioned in the marker
+    :type spilled_to: str
+
+    :param partial: is the text only the start of a longer one, which the marker then says
+    :type partial: bool
+
+    :returns: the text, or its start followed by a marker like ``... [truncated from 5000000 characters]``
+    """
+    if len(text) <= limit:
+        return text
+    marker = '... [truncated from {}{} characters{}]'.format('more than ' if partial else '', len(text),
+                                                             ', see ' + spilled_to if spilled_to else '')
+    return text[:max(0, limit - len(marker))] + marker
+
+
+def fit(line, limit):
+    """shortens a formatted line to ``limit`` characters, keeping its line break
+
+    :param line: the formatted log entry
+    :type line: str
+
+    :param limit: the largest number of characters to write; no limit if ``None``
+    :type limit: int
+
+    :returns: the line as it may be written
+    """
+    if limit is None or len(line) <= limit:
+        return line
+    if line.endswith('\n'):
+        return truncate(line[:-1], limit - 1) + '\n'
+    return truncate(line, limit)
+
+
+def fit_record(record, limit):
+    """shortens the text of a record for a handler that takes records, see ``fit``
+
+    :param record: the record of the entry
+    :type record: LogRecord
+
+    :param limit: the largest number of characters of the message and traceback together
+    :type limit: int
+
+    :returns: the record, or a copy of it whose message is its truncated text and which has no traceback
+    """
+    text = record.text
+    if not isinstance(text, six.string_types) or len(text) <= limit:
+        return record
+    fitted = copy.copy(record)
+    fitted.message = truncate(text, limit)
+    fitted.exc_info = None
+    fitted.exc_text = None
+    fitted._text = None
+    return fitted
+
+
+def cap(value, limit):
+    """bounds the text a context value formats to
+
+    strings are truncated and containers and bytes are replaced by a ``reprlib`` representation of at most
+    ``limit`` characters. other objects are kept, with their attributes reachable from the template, as long as
+    their text fits, and are replaced by their truncated text otherwise.
+
+    :param value: the context value
+    :type value: object
+
+    :param limit: the largest number of characters
+    :type limit: int
+
+    :returns: the value, or a string standing in for it
+    """
+    if isinstance(value, six.string_types):
+        return truncate(value, limit)
+    if isinstance(value, SCALARS):
+        return value
+    if not isinstance(value, CONTAINERS):
+        try:
+            text = six.text_type(value)
+        except Exception:
+            text = None
+        if text is not None:
+            return value if len(text) <= limit else truncate(text, limit)
+    return truncate(_shortener(limit).repr(value), limit)
+
+
+def _shortener(limit):
+    shortener = _reprs.get(limit)
+    if shortener is None:
+        shortener = _reprs[limit] = reprlib.Repr()
+        shortener.maxstring = shortener.maxother = shortener.maxlong = max(limit, 8)
+        shortener.maxlist = shortener.maxtuple = shortener.maxdict = shortener.maxset = max(1, limit // 8)
+        shortener.maxfrozenset = shortener.maxdeque = shortener.maxarray = max(1, limit // 8)
+    return shortener
+
+
+def format_exception(exc_info, limit):
+    """renders a traceback as ``LogRecord.exc_text`` does, but stops once it is longer than ``limit`` characters,
+    so a huge traceback isn't rendered in full just to be truncated
+
+    :param exc_info: the ``sys.exc_info()`` triple of the exception
+    :type exc_info: tuple
+
+    :param limit: the number of characters after which rendering stops
+    :type limit: int
+
+    :returns: the text, and whether it is the whole traceback
+    """
+    if not hasattr(traceback, 'TracebackException'):  # pragma: no cover
+        return '\n'.join(''.join(traceback.format_exception(*exc_info)).splitlines()), True
+    lines = traceback.TracebackException(*exc_info).format()
+    parts, size = [], 0
+    for part in lines:
+        parts.append(part)
+        size += len(part)
+        if size > limit + 1:
+            break
+    complete = next(lines, None) is None
+    return '\n'.join(''.join(parts).splitlines()), complete
+
+
+def spill(text, directory):
+    """writes a text that is too large to log to a file of its own, a chunk at a time
+
+    :param text: the text to write
+    :type text: str
+
+    :param directory: the directory to write to
+    :type directory: str
+
+    :returns: the path of the file, or ``None`` if it couldn't be written
+    """
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fd, path = tempfile.mkstemp(prefix='oversized-', suffix='.log', dir=directory)
+        with io.open(fd, 'w', encoding='utf8', errors='replace') as fh:
+            for start in range(0, len(text), CHUNK_SIZE):
+                fh.write(text[start:start + CHUNK_SIZE])
+        return path
+    except OSError:
+        return None
+
+
+def limit_record(record, max_message_size=None, max_context_size=None, spill_directory=None):
+    """bounds the message, traceback and context values of a record in place
+
+    :param record: the record to bound
+    :type record: LogRecord
+
+    :param max_message_size: the largest number of characters of the message and of the traceback
+    :type max_message_size: int
+
+    :param max_context_size: the largest number of characters of a context value
+    :type max_context_size: int
+
+    :param spill_directory: where oversized messages and tracebacks are written in full
+    :type spill_directory: str
+    """
+    if max_message_size is not None:
+        message = record.message
+        if not isinstance(message, six.string_types):
+            if spill_directory:
+                # the whole text is written to the side file, so it is rendered in full
+                try:
+                    message = six.text_type(message)
+                except Exception:
+                    message = cap(message, max_message_size)
+            else:
+                message = cap(message, max_message_size)
+            record.message = message
+        if isinstance(message, six.string_types) and len(message) > max_message_size:
+            spilled_to = spill(message, spill_directory) if spill_directory else None
+            record.message = truncate(message, max_message_size, spilled_to)
+        if record.exc_info is not None:
+            if spill_directory:
+                # the whole traceback is written to the side file, so it is rendered in full
+                exc_text, complete = record.exc_text, True
+            else:
+                exc_text, complete = format_exception(record.exc_info, max_message_size)
+            if len(exc_text) > max_message_size:
+                spilled_to = spill(exc_text, spill_directory) if spill_directory else None
+                record.exc_text = truncate(exc_text, max_message_size, spilled_to, partial=not complete)
+            else:
+                record.exc_text = exc_text
+    if max_context_size is not None:
+        context = record.context
+        for key, value in list(context.items()):
+            capped = cap(value, max_context_size)
+            if capped is not value:
+                context[key] = capped
@@ -1,21 +1,26 @@
+import collections
+import copy
 import inspect
-import os
 import sys
-import traceback
-from datetime import datetime
 
+from . import adaptive as _adaptive, context as _context, forksafe, limits as _limits, tail as _tail
+from .dispatchers import SynchronousDispatcher
 from .errors import ConfigurationError, FormatterNotFoundError
 from .formatters import Formatter
 from .handlers import _HandlerInterface, StreamHandler
 from .levels import LogLevel
+from .records import LogRecord
 
 try:
-    import arrow
+    import arrow  # noqa: F401
     _arrow_available = True
 except ImportError:           # pragma: no cover
     _arrow_available = False  # pragma: no cover
 
 
+_synchronous_dispatcher = SynchronousDispatcher()
+
+
 class Logger(object):
     """
     ``Logger`` writes log entries.
@@ -29,7 +34,8 @@ class Logger(object):
     BASE_LOG_PARAMS = ['timestamp', 'level', 'name', 'message', 'src', 'line', 'func', 'proc']
 
     def __init__(self, name=None, level=None, template=None, formatters=None, handlers=None, timezone=None,
-                 additional_context=None):
+                 additional_context=None, dispatcher=None, controller=None, max_message_size=None,
+                 max_context_size=None, spill_directory=None):
         """
         :param name: the name of the logger
         :type name: str
@@ -45,12 +51,31 @@ class Logger(object):
         :type timezone: str
         :param additional_context: values to inject for additional formatting context
         :type additional_context: dict
+        :param dispatcher: decides on which thread entries are formatted and written; the calling one by default
+        :type dispatcher: _DispatcherInterface
+        :param controller: adjusts the level and sampling of the logger to keep its overhead within a budget
+        :type controller: OverheadController
+        :param max_message_size: the largest number of characters of a message, and of a traceback, beyond which
+            it is truncated with a marker
+        :type max_message_size: int
+        :param max_context_size: the largest number of characters of a context value; strings are truncated,
+            containers replaced by a shortened ``repr`` and other values by their truncated text
+        :type max_context_size: int
+        :param spill_directory: where truncated messages and tracebacks are written in full, a file each
+        :type spill_directory: str
         """
         self.name = name or __name__
         self.level = level or LogLevel.INFO
         self.additional_context = additional_context or dict()
+        self.dispatcher = dispatcher or _synchronous_dispatcher
+        self.controller = None
+        self.max_message_size = max_message_size
+        self.max_context_size = max_context_size
+        self.spill_directory = spill_directory
 
         self._handlers = set()
+        self._pooled = collections.Counter()
+        self._closed = False
         self._formatters = set()
         self._default_formatter = None
         self._template = None
@@ -82,6 +107,9 @@ class Logger(object):
         else:
             self._timezone = None
 
+        if controller is not None:
+            controller.attach(self)
+
     def __enter__(self):
         return self
 
@@ -125,6 +153,21 @@ class Logger(object):
     def timezone(self, timezone):
         self._set_timezone(timezone)
 
+    def is_enabled_for(self, level):
+        """checks whether an entry at a level would be written, to skip building it when it wouldn't
+
+        :param level: the level of the entry, or its name
+        :type level: LogLevel or str
+
+        :returns: whether the entry would be written, or held back by a tail buffer
+
+        >>> if logger.is_enabled_for(LogLevel.DEBUG):
+        ...     logger.debug(describe(expensive_object))
+        """
+        if not isinstance(level, LogLevel):
+            level = LogLevel[level]
+        return self.level <= level or level >= LogLevel.ERROR or _tail._current.get() is not None
+
     def debug(self, message, **kwargs):
         """writes a debug log entry
 
@@ -136,7 +179,7 @@ class Logger(object):
             call depth prior to calling debug() to obtain proper log call location
         :type kwargs: dict
         """
-        if self.level <= LogLevel.DEBUG:
+        if self.level <= LogLevel.DEBUG or _tail._current.get() is not None:
             self._log(message, LogLevel.DEBUG, **kwargs)
 
     def info(self, message, **kwargs):
@@ -150,7 +193,7 @@ class Logger(object):
             call depth prior to calling info() to obtain proper log call location
         :type kwargs: dict
         """
-        if self.level <= LogLevel.INFO:
+        if self.level <= LogLevel.INFO or _tail._current.get() is not None:
             self._log(message, LogLevel.INFO, **kwargs)
 
     def warning(self, message, **kwargs):
@@ -164,7 +207,7 @@ class Logger(object):
             call depth prior to calling warning() to obtain proper log call location
         :type kwargs: dict
         """
-        if self.level <= LogLevel.WARNING:
+        if self.level <= LogLevel.WARNING or _tail._current.get() is not None:
             self._log(message, LogLevel.WARNING, **kwargs)
 
     def error(self, message, **kwargs):
@@ -196,19 +239,23 @@ class Logger(object):
         """
         self._name_handler(handler)
         self._handlers |= {handler}
+        if handler.pool is not None:
+            self._pooled[handler] += 1
 
     def remove_handler(self, handler):
-        """removes a handler from the logger
+        """removes a handler from the logger; a handler shared through a ``HandlerPool`` is released to it
 
         :param handler: the handler to be removed
         :type handler: _HandlerInterface
         """
         self._handlers.remove(handler)
+        self._release(handler, self._pooled.pop(handler, 0))
         remaining_handlers = [h for h in self._handlers]
         self._handlers.clear()
-        for handler in remaining_handlers:
-            handler.name = None
-            self.add_handler(handler)
+        for remaining_handler in remaining_handlers:
+            remaining_handler.name = None
+            self._name_handler(remaining_handler)
+            self._handlers |= {remaining_handler}
 
     def add_formatter(self, formatter):
         """adds a formatter to the logger
@@ -233,20 +280,77 @@ class Logger(object):
             self._formatters |= {last_formatter}
             self._default_formatter = last_formatter
 
+    def flush(self):
+        """waits for the dispatcher to write pending entries, then flushes the handlers"""
+        self.dispatcher.flush()
+        for handler in self._handlers:
+            handler.flush()
+
+    def close(self):
+        """writes out pending entries and closes the controller, the dispatcher and the handlers; handlers shared
+        through a ``HandlerPool`` are released to it instead, once for every reference this logger was given, and
+        the pool closes them once no logger uses them. Closing a logger again does nothing."""
+        if self._closed:
+            return
+        self._closed = True
+        if self.controller is not None:
+            self.controller.close()
+        self.dispatcher.close()
+        for handler in self._handlers:
+            if handler.pool is None and handler not in self._pooled:
+                handler.close()
+        self._release_pooled()
+
+    def contextualize(self, **values):
+        """binds values to every entry logged within a ``with`` block on the current thread or asyncio task
+
+        :param values: key/value pairs to be used as additional interpolation context
+        :type values: dict
+
+        :returns: a context manager that binds the values while it is entered
+
+        >>> with logger.contextualize(request_id=request.id):
+        ...     logger.info('handling request')  # any logger used in the block includes the request_id
+        """
+        return _context.ContextScope(**values)
+
+    def tail_buffer(self, capacity=1000):
+        """holds back the entries of a request or task, including those below the logger's level, and writes the
+        detail only if it fails
+
+        :param capacity: the number of entries held back
+        :type capacity: int
+
+        :returns: a context manager, or decorator, that buffers the entries while it is entered
+
+        >>> @logger.tail_buffer()
+        ... def handle(request):
+        ...     logger.debug('parsed {body}', body=request.body)  # only written if handle fails
+        ...     logger.info('handled')
+        """
+        return _tail.TailScope(capacity)
+
     def clone(self):
-        """creates a shallow copy of the logger instance
+        """creates a shallow copy of the logger instance, of the same class, sharing its dispatcher and with it the
+        queue of a dispatcher that has one
 
         :returns: a shallow copy of the current logger
         """
-        logger = Logger()
+        logger = type(self)()
         logger.name = self.name
         logger.level = self.level
         logger.additional_context = self.additional_context
+        logger.dispatcher = self.dispatcher
         logger._handlers = self._handlers
         logger._formatters = self._formatters
         logger._default_formatter = self._default_formatter
         logger._template = self._template
         logger._timezone = self._timezone
+        logger.max_message_size = self.max_message_size
+        logger.max_context_size = self.max_context_size
+        logger.spill_directory = self.spill_directory
+        if self.controller is not None:
+            self.controller.attach(logger, self.controller._loggers.get(self))
         return logger
 
     def using(self, formatter):
@@ -279,9 +383,8 @@ class Logger(object):
         try:
             existing_formatter = list(filter(lambda f: f.name == formatter_name, self._formatters))[0]
             # if it isn't the default formatter here, we don't want to override it with side effects from the clone
-            new_formatter = Formatter(
-                name='default', template=existing_formatter.template,
-                append_new_line=existing_formatter.append_new_line)
+            new_formatter = copy.copy(existing_formatter)
+            new_formatter.name = 'default'
         except IndexError:
             raise FormatterNotFoundError("Couldn't find formatter {}".format(formatter_name))
         clone = self.clone()
@@ -317,56 +420,65 @@ class Logger(object):
         return clone
 
     def _log(self, message, level, exception=None, formatter=None, handlers=None, **context):
-        params = {'message': message, 'level': level, 'name': self.name}
-
+        controller = self.controller
+        if controller is not None:
+            if not controller.admit(level):
+                return
+            started = _adaptive.clock()
         if formatter is None:
             formatter = self._default_formatter
-        template_keys = formatter.extract_template_keys()
+        record = LogRecord(self.name, level, message, timezone=self._timezone)
 
-        if 'timestamp' in template_keys:
-            params['timestamp'] = self._get_timestamp()
-
-        if {'src', 'line', 'func', 'proc'}.intersection(set(template_keys)):
+        if LogRecord.CALL_SITE_KEYS.intersection(formatter.template_keys):
             if 'local_call_depth' in context:
                 exec_info = self._get_execution_info( additional_call_depth=context['local_call_depth'] )
             else:
                 exec_info = self._get_execution_info()
-            params.update(exec_info)
+            record.set_call_site(**exec_info)
 
         if exception:
-            params['message'] = '{}\n'.format(message) + '\n'.join(traceback.format_exc().splitlines())
+            record.exc_info = sys.exc_info()
 
         for key, value in self.additional_context.items():
             if inspect.isfunction(value):
-                params[key] = value()
+                record.context[key] = value()
             else:
-                params[key] = value
+                record.context[key] = value
+
+        bound = _context._current.get()
+        if bound is not None:
+            record.context.update(bound.flat)
+
+        record.context.update(context)
+        if self.max_message_size is not None or self.max_context_size is not None:
+            _limits.limit_record(record, self.max_message_size, self.max_context_size, self.spill_directory)
+        handlers = self._handlers if handlers is None else handlers
+        scope = _tail._current.get()
+        if scope is not None:
+            scope.add(record, level >= self.level, self.dispatcher, formatter, handlers)
+        else:
+            self.dispatcher.dispatch(record, formatter, handlers)
+        if controller is not None:
+            controller.spent(started)
 
-        for key, value in context.items():
-            params[key] = value
+    def _release_pooled(self):
+        pooled, self._pooled = self._pooled, collections.Counter()
+        for handler, references in pooled.items():
+            self._release(handler, references)
 
-        log_line = formatter.format(**params)
-        if handlers is None:
-            handlers = self._handlers
-        for handler in handlers:
-            handler.write(log_line)
-
-    def _get_timestamp(self):
-        if self._timezone:
-            ts = arrow.utcnow().to(self._timezone)
-        else:
-            ts = datetime.now()
-        ts = ts.isoformat()
-        return ts
+    def _release(self, handler, references):
+        for _ in range(references):
+            if handler.pool is None:
+                return
+            handler.pool.release(handler)
 
     def _get_execution_info(self,additional_call_depth=0):
         frame = sys._getframe(3+additional_call_depth)
-        fname, line, funcname, _, __ = inspect.getframeinfo(frame)
         return {
-            'src': fname,
-            'func': funcname,
-            'line': line,
-            'proc': os.getpid(),
+            'src': frame.f_code.co_filename,
+            'func': frame.f_code.co_name,
+            'line': frame.f_lineno,
+            'proc': forksafe.getpid(),
         }
 
     def _name_handler(self, handler):
@@ -0,0 +1,96 @@
+import argparse
+import heapq
+import sys
+
+from .parsers import EntryParser, iter_entries, open_log
+
+
+def merge_entries(sources, parser=None):
+    """merges the entries of several log files into one timeline, ordered by their timestamps
+
+    the files are streamed: only one entry per file is held in memory at any time. timestamps are compared in UTC,
+    so files written with different timezones interleave correctly. entries keep their continuation lines and
+    entries with equal timestamps keep the order of ``sources``.
+
+    :param sources: file names, plain or compressed, or files opened for binary reading
+    :type sources: list of str or file
+
+    :param parser: the parser that recognizes the start of an entry
+    :type parser: EntryParser
+
+    :returns: a generator of raw entries
+
+    >>> for entry in merge_entries(['worker0.log', 'worker1.log.gz']):
+    ...     sys.stdout.buffer.write(entry)
+    """
+    parser = parser or EntryParser()
+    opened = []
+    heap = []
+    try:
+        for position, source in enumerate(sources):
+            if isinstance(source, str):
+                source = open_log(source)
+                opened.append(source)
+            entries = iter_entries(source, parser)
+            for prefix, entry in entries:
+                heap.append((prefix.timestamp, position, entry, entries))
+                break
+        heapq.heapify(heap)
+
+        while heap:
+            timestamp, position, entry, entries = heap[0]
+            yield entry
+            for prefix, entry in entries:
+                heapq.heapreplace(heap, (prefix.timestamp, position, entry, entries))
+                break
+            else:
+                heapq.heappop(heap)
+    finally:
+        for fh in opened:
+            fh.close()
+
+
+def merge_files(sources, out, parser=None):
+    """writes the merged timeline of several log files to a binary stream
+
+    :param sources: file names, plain or compressed, or files opened for binary reading
+    :type sources: list of str or file
+
+    :param out: a stream opened for binary writing
+    :type out: file
+
+    :param parser: the parser that recognizes the start of an entry
+    :type parser: EntryParser
+
+    :returns: the number of entries written
+    """
+    count = 0
+    for entry in merge_entries(sources, parser=parser):
+        out.write(entry)
+        count += 1
+    return count
+
+
+def main(argv=None):
+    """command line entry point: ``python -m log.merge [options] filename [filename ...]``"""
+    parser = argparse.ArgumentParser(prog='python -m log.merge', description='merge log files by timestamp')
+    parser.add_argument('filenames', nargs='+', help='log files to merge; .gz, .bz2 and .xz are decompressed')
+    parser.add_argument('-o', '--output', help='where to write the merged log (default: stdout)')
+    parser.add_argument('--pattern', help='regex matching the start of an entry, with a timestamp group')
+    parser.add_argument('--naive-utcoffset', type=int,
+                        help='UTC offset in seconds of timestamps without one (default: local time)')
+    args = parser.parse_args(argv)
+
+    entry_parser = EntryParser(pattern=args.pattern, naive_utcoffset=args.naive_utcoffset)
+    if args.output:
+        with open(args.output, 'wb') as out:
+            merge_files(args.filenames, out, parser=entry_parser)
+    else:
+        out = getattr(sys.stdout, 'buffer', sys.stdout)
+        merge_files(args.filenames, out, parser=entry_parser)
+        out.flush()
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,296 @@
+import atexit
+import marshal
+import multiprocessing.util
+import os
+import selectors
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import threading
+
+from . import forksafe
+from .dispatchers import _DispatcherInterface
+from .handlers import _HandlerInterface, _socket_family
+from .records import LogRecord
+
+
+_LENGTH = struct.Struct('<I')
+
+
+class LogCollector(object):
+    """
+    ``LogCollector`` runs in a parent process and writes the records its worker processes send it through the
+    handlers of ``logger``, so a single process owns every file and socket. Workers log through a
+    ``CollectorHandler`` pointed at ``address``.
+
+    Records arrive in batches; each batch is formatted with the logger's default formatter and handed to every string
+    handler as one write. A worker that exits simply closes its connection, and a respawned worker opens a new one.
+    Frames that can't be decoded, e.g. from a worker running another version, are skipped and counted in
+    ``malformed``.
+
+    >>> logger = Logger(handlers=[FileHandler('/var/log/app.log')])
+    >>> collector = LogCollector(logger)
+    >>> def work():
+    ...     worker_logger = Logger(handlers=[CollectorHandler(collector.address)])
+    ...     worker_logger.info('from a worker')
+    >>> multiprocessing.Process(target=work).start()
+    """
+
+    def __init__(self, logger, address=None):
+        """
+        :param logger: the logger whose formatter and handlers write the collected records
+        :type logger: Logger
+
+        :param address: a UNIX socket path or a ``(host, port)`` tuple to listen on; a socket in a private
+            temporary directory if not given
+        :type address: str or tuple
+        """
+        self.logger = logger
+        self.received = 0
+        self.malformed = 0
+        self._tmpdir = None
+        if address is None:
+            self._tmpdir = tempfile.mkdtemp(prefix='log-collector-')
+            address = os.path.join(self._tmpdir, 'collector.sock')
+        self._listener = socket.socket(_socket_family(address), socket.SOCK_STREAM)
+        if isinstance(address, tuple):
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(address)
+        self._listener.listen(128)
+        self._listener.setblocking(False)
+        self.address = self._listener.getsockname() if isinstance(address, tuple) else address
+
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._listener, selectors.EVENT_READ)
+        self._selector.register(self._wakeup_recv, selectors.EVENT_READ)
+        self._buffers = {}
+        self._closed = False
+        self._thread = threading.Thread(target=self._serve, name='log-collector')
+        self._thread.daemon = True
+        self._thread.start()
+        forksafe.register(self, early=True)
+        atexit.register(self.close)
+
+    @property
+    def connections(self):
+        """the number of workers currently connected"""
+        return len(self._buffers)
+
+    def close(self):
+        """stops accepting records, writes out whatever was already received and removes the socket"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup_send.send(b'\0')
+        self._thread.join()
+        for connection in list(self._buffers):
+            self._read(connection, drain=True)
+        self._selector.close()
+        self._listener.close()
+        self._wakeup_recv.close()
+        self._wakeup_send.close()
+        if not isinstance(self.address, tuple) and os.path.exists(self.address):
+            os.unlink(self.address)
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def before_fork(self):
+        pass
+
+    def after_fork(self):
+        """lets go of the child's copies of the sockets, leaving the parent collecting"""
+        if self._closed:
+            return
+        self._closed = True
+        for connection in self._buffers:
+            connection.close()
+        self._selector.close()
+        self._listener.close()
+        self._wakeup_recv.close()
+        self._wakeup_send.close()
+
+    def _serve(self):
+        while not self._closed:
+            for key, _ in self._selector.select():
+                if key.fileobj is self._listener:
+                    self._accept()
+                elif key.fileobj is not self._wakeup_recv:
+                    self._read(key.fileobj)
+
+    def _accept(self):
+        try:
+            connection, _ = self._listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        connection.setblocking(False)
+        self._buffers[connection] = bytearray()
+        self._selector.register(connection, selectors.EVENT_READ)
+
+    def _read(self, connection, drain=False):
+        buf = self._buffers[connection]
+        while True:
+            try:
+                data = connection.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                data = None
+            except OSError:
+                data = b''
+            if data:
+                buf += data
+                if drain:
+                    continue
+            self._write_frames(buf)
+            if data == b'' or drain:
+                self._disconnect(connection)
+            return
+
+    def _write_frames(self, buf):
+        pos = 0
+        while len(buf) - pos >= _LENGTH.size:
+            length = _LENGTH.unpack_from(buf, pos)[0]
+            end = pos + _LENGTH.size + length
+            if end > len(buf):
+                break
+            frame = bytes(buf[pos + _LENGTH.size:end])
+            pos = end
+            try:
+                records = [LogRecord.from_tuple(values) for values in marshal.loads(frame)]
+            except Exception as e:
+                self.malformed += 1
+                sys.stderr.write('{}: skipped a malformed frame of {} bytes: {!r}\n'.format(type(self).__name__,
+                                                                                            length, e))
+                continue
+            self.received += len(records)
+            try:
+                _DispatcherInterface.emit_batch(records, self.logger.default_formatter, self.logger.handlers)
+            except Exception as e:
+                sys.stderr.write('{}: failed to write log records: {!r}\n'.format(type(self).__name__, e))
+        del buf[:pos]
+
+    def _disconnect(self, connection):
+        self._selector.unregister(connection)
+        del self._buffers[connection]
+        connection.close()
+
+
+class CollectorHandler(_HandlerInterface):
+    """
+    ``CollectorHandler`` sends records from a worker process to a ``LogCollector`` in its parent instead of writing
+    them itself. Records are flattened with ``LogRecord.to_tuple`` and sent in batches of ``batch_size``, or every
+    ``flush_interval`` seconds, whichever comes first.
+
+    The handler notices when it is used from a new process, e.g. a freshly forked or respawned worker, and opens its
+    own connection there, dropping anything the parent had batched. Batches that can't be delivered are counted in
+    ``dropped``; they never raise into the application.
+
+    >>> logger = Logger(handlers=[CollectorHandler('/tmp/log-collector-x/collector.sock')])
+    """
+
+    accepts_records = True
+
+    def __init__(self, address, batch_size=64, flush_interval=0.1, name=None):
+        """
+        :param address: the address the collector listens on
+        :type address: str or tuple
+
+        :param batch_size: the number of records sent at once
+        :type batch_size: int
+
+        :param flush_interval: the longest time in seconds a record waits before it is sent
+        :type flush_interval: float
+
+        :param name: the name of the handler
+        :type name: str
+        """
+        super(CollectorHandler, self).__init__(name)
+        self.address = address
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._pid = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def write(self, message):
+        """sends a message that didn't come with a record
+
+        :param message: what you want logged
+        :type message: str
+        """
+        self.write_record(LogRecord(None, None, message.rstrip('\n')))
+
+    def write_record(self, record):
+        """adds the record to the batch, sending it once full
+
+        :param record: the record of the entry
+        :type record: LogRecord
+        """
+        if self._pid != forksafe.getpid():
+            self._start()
+        values = record.to_tuple()
+        with self._lock:
+            self._batch.append(values)
+            full = len(self._batch) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """sends the batched records to the collector"""
+        if self._pid != forksafe.getpid():
+            return
+        with self._lock:
+            batch, self._batch = self._batch, []
+            if not batch:
+                return
+            try:
+                payload = marshal.dumps(batch)
+            except ValueError as e:
+                self.dropped += len(batch)
+                sys.stderr.write('{}: failed to write log entries: {!r}\n'.format(type(self).__name__, e))
+                return
+            try:
+                if self._socket is None:
+                    self._socket = socket.socket(_socket_family(self.address), socket.SOCK_STREAM)
+                    self._socket.connect(self.address)
+                self._socket.sendall(_LENGTH.pack(len(payload)) + payload)
+            except (OSError, socket.error):
+                self.dropped += len(batch)
+                self._disconnect()
+
+    def close(self):
+        """sends the batched records and closes the connection"""
+        if self._closed:
+            return
+        self._closed = True
+        self.flush()
+        if self._pid == forksafe.getpid():
+            self._wakeup.set()
+            with self._lock:
+                self._disconnect()
+
+    def _start(self):
+        self._pid = forksafe.getpid()
+        self._lock = threading.Lock()
+        self._batch = []
+        self._socket = None
+        self._wakeup = threading.Event()
+        thread = threading.Thread(target=self._flush_periodically, name='log-collector-handler')
+        thread.daemon = True
+        thread.start()
+        # processes started by multiprocessing leave through os._exit, which skips atexit
+        multiprocessing.util.Finalize(self, self.close, exitpriority=10)
+
+    def _flush_periodically(self):
+        while not self._wakeup.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                sys.stderr.write('{}: failed to write log entries: {!r}\n'.format(type(self).__name__, e))
+
+    def _disconnect(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
@@ -0,0 +1,197 @@
+import bz2
+import calendar
+import gzip
+import re
+import time
+from datetime import datetime
+
+from .levels import LogLevel
+
+try:
+    import lzma
+    _lzma_available = True
+except ImportError:          # pragma: no cover
+    _lzma_available = False  # pragma: no cover
+
+
+TIMESTAMP_REGEX = re.compile(
+    r'(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})[T ](?P<hour>\d{2}):(?P<minute>\d{2}):(?P<second>\d{2})'
+    r'(?:\.(?P<fraction>\d{1,9}))?(?P<offset>Z|[+-]\d{2}:?\d{2})?$')
+
+_LEVELS_BY_NAME = dict((str(level), level) for level in LogLevel)
+_LEVELS_BY_NAME.update((str(level).encode('ascii'), level) for level in LogLevel)
+
+
+def parse_timestamp(timestamp, naive_utcoffset=None):
+    """converts an ISO 8601 timestamp, as written by ``Logger``, into nanoseconds since the epoch
+
+    :param timestamp: the timestamp to convert, with or without a UTC offset
+    :type timestamp: str or bytes
+
+    :param naive_utcoffset: offset in seconds to assume for timestamps without one; local time if not given
+    :type naive_utcoffset: int
+
+    :returns: nanoseconds since the epoch or ``None`` if the timestamp couldn't be parsed
+
+    >>> parse_timestamp('2016-05-21T14:44:31.408652-05:00')
+    1463859871408652000
+    """
+    if isinstance(timestamp, bytes):
+        timestamp = timestamp.decode('ascii', 'replace')
+    match = TIMESTAMP_REGEX.match(timestamp.strip())
+    if match is None:
+        return None
+    parts = match.groupdict()
+    fields = tuple(int(parts[key]) for key in ('year', 'month', 'day', 'hour', 'minute', 'second'))
+    fraction = parts['fraction'] or '0'
+    nanoseconds = int(fraction.ljust(9, '0'))
+    offset = parts['offset']
+    if offset is None:
+        if naive_utcoffset is None:
+            seconds = int(time.mktime(fields + (0, 0, -1)))
+        else:
+            seconds = calendar.timegm(fields) - naive_utcoffset
+    elif offset == 'Z':
+        seconds = calendar.timegm(fields)
+    else:
+        sign = -1 if offset[0] == '-' else 1
+        digits = offset[1:].replace(':', '')
+        seconds = calendar.timegm(fields) - sign * (int(digits[:2]) * 3600 + int(digits[2:]) * 60)
+    return seconds * 1000000000 + nanoseconds
+
+
+def to_nanoseconds(value, naive_utcoffset=None):
+    """normalizes a point in time into nanoseconds since the epoch
+
+    :param value: an integer number of nanoseconds, an ISO 8601 string or a datetime
+    :type value: int or str or datetime
+
+    :param naive_utcoffset: offset in seconds to assume for naive values; local time if not given
+    :type naive_utcoffset: int
+
+    :returns: nanoseconds since the epoch
+
+    :raises: ValueError
+    """
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    nanoseconds = parse_timestamp(value, naive_utcoffset=naive_utcoffset)
+    if nanoseconds is None:
+        raise ValueError("Couldn't parse timestamp '{}'.".format(value))
+    return nanoseconds
+
+
+def open_log(filename):
+    """opens a log file for binary reading, transparently decompressing gzip, bz2 and xz files
+
+    :param filename: the name of the file to open
+    :type filename: str
+
+    :returns: a binary file object
+    """
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'rb')
+    if filename.endswith('.bz2'):
+        return bz2.BZ2File(filename, 'rb')
+    if filename.endswith('.xz') and _lzma_available:
+        return lzma.open(filename, 'rb')
+    return open(filename, 'rb')
+
+
+class ParsedPrefix(object):
+    """
+    the values recovered from the prefix of a log entry's first line
+    """
+
+    __slots__ = ('timestamp', 'level', 'name', 'end')
+
+    def __init__(self, timestamp, level, name, end):
+        self.timestamp = timestamp
+        self.level = level
+        self.name = name
+        self.end = end
+
+
+class EntryParser(object):
+    """
+    ``EntryParser`` recognizes the first line of a log entry and pulls the timestamp, level and, if the pattern
+    captures it, the logger name out of it. Lines it doesn't recognize are continuations of the previous entry,
+    e.g. a traceback.
+
+    >>> parser = EntryParser()
+    >>> prefix = parser.parse(b'[2016-05-21T14:44:31.408652-05:00] [INFO] : really simple logging\\n')
+    >>> prefix.timestamp, prefix.level
+    (1463859871408652000, <LogLevel.INFO: 1>)
+    """
+
+    DEFAULT_PATTERN = r'\[(?P<timestamp>[^\]]+)\] \[(?P<level>[A-Z]+)\] : '
+
+    def __init__(self, pattern=None, naive_utcoffset=None):
+        """
+        :param pattern: a regex with a ``timestamp`` group and optional ``level`` and ``name`` groups that matches
+            the start of an entry; the default matches ``Logger.DEFAULT_TEMPLATE``
+        :type pattern: str
+
+        :param naive_utcoffset: offset in seconds to assume for timestamps without one; local time if not given
+        :type naive_utcoffset: int
+        """
+        self.pattern = pattern or self.DEFAULT_PATTERN
+        self.naive_utcoffset = naive_utcoffset
+        self._regex = re.compile(self.pattern.encode('utf8'))
+        self._text_regex = re.compile(self.pattern)
+        self._groups = self._regex.groupindex
+
+    def parse(self, line):
+        """parses the prefix of a line
+
+        :param line: a raw line from a log file or a formatted entry
+        :type line: bytes or str
+
+        :returns: the parsed prefix or ``None`` if the line doesn't start an entry
+        """
+        if isinstance(line, bytes):
+            match = self._regex.match(line)
+        else:
+            match = self._text_regex.match(line)
+        if match is None:
+            return None
+        timestamp = parse_timestamp(match.group('timestamp'), naive_utcoffset=self.naive_utcoffset)
+        if timestamp is None:
+            return None
+        level = _LEVELS_BY_NAME.get(match.group('level')) if 'level' in self._groups else None
+        name = match.group('name') if 'name' in self._groups else None
+        if isinstance(name, bytes):
+            name = name.decode('utf8', 'replace')
+        return ParsedPrefix(timestamp, level, name, match.end())
+
+
+def iter_entries(fileobj, parser=None):
+    """groups the lines of a log file into entries, keeping continuation lines with the entry they belong to
+
+    lines that precede the first recognizable entry are kept with that entry.
+
+    :param fileobj: a file opened for binary reading
+    :type fileobj: file
+
+    :param parser: the parser that recognizes the start of an entry
+    :type parser: EntryParser
+
+    :returns: a generator of ``(prefix, raw_entry)`` tuples, where ``prefix.end`` is the offset of the message
+        within ``raw_entry``
+    """
+    parser = parser or EntryParser()
+    prefix, lines = None, []
+    for line in fileobj:
+        parsed = parser.parse(line)
+        if parsed is not None:
+            if prefix is not None:
+                yield prefix, b''.join(lines)
+                lines = []
+            elif lines:
+                parsed.end += sum(len(orphan) for orphan in lines)
+            prefix = parsed
+        lines.append(line)
+    if prefix is not None:
+        yield prefix, b''.join(lines)
@@ -0,0 +1,131 @@
+import os
+import socket
+import threading
+
+from .handlers import FileHandler, SocketHandler, StreamHandler, _socket_family
+
+
+class HandlerPool(object):
+    """
+    ``HandlerPool`` hands out one shared handler per sink, so the loggers of a large application write through a
+    single file object, buffer and descriptor instead of one each, and their entries reach the sink in the order
+    they were written. Handlers are reference counted: every ``file``, ``socket``, ``stream`` or ``acquire`` call
+    takes a reference, ``Logger.close`` or ``release`` gives it back, and the handler is closed with the last one.
+
+    A handler is created on first use with the arguments of that call; later calls for the same sink get it as it
+    is. Wrap it with ``acquire`` to share a ``ThreadBufferedHandler`` and with it a single flush schedule.
+
+    >>> pool = HandlerPool()
+    >>> api = Logger(name='api', handlers=[pool.file('/var/log/app.log')])
+    >>> db = Logger(name='db', handlers=[pool.file('/var/log/app.log')])  # the same FileHandler
+    >>> api.close()
+    >>> db.close()  # closes the file
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers = {}
+        self._references = {}
+
+    def __len__(self):
+        return len(self._handlers)
+
+    def acquire(self, key, factory):
+        """returns the handler of a sink, created with ``factory`` if the pool doesn't have one yet
+
+        :param key: identifies the sink
+        :type key: hashable
+
+        :param factory: creates the handler
+        :type factory: callable
+
+        :returns: the shared handler
+        :rtype: _HandlerInterface
+        """
+        with self._lock:
+            handler = self._handlers.get(key)
+            if handler is None:
+                handler = self._handlers[key] = factory()
+                handler.pool = self
+                self._references[id(handler)] = [key, 0]
+            self._references[id(handler)][1] += 1
+            return handler
+
+    def release(self, handler):
+        """gives back a reference to a handler, closing it if it was the last one
+
+        :param handler: a handler of the pool
+        :type handler: _HandlerInterface
+        """
+        with self._lock:
+            reference = self._references.get(id(handler))
+            if reference is None or self._handlers.get(reference[0]) is not handler:
+                return
+            reference[1] -= 1
+            if reference[1] > 0:
+                return
+            del self._handlers[reference[0]]
+            del self._references[id(handler)]
+            handler.pool = None
+        handler.close()
+
+    def references(self, handler):
+        """counts the references to a handler
+
+        :param handler: a handler of the pool
+        :type handler: _HandlerInterface
+
+        :returns: the number of references, 0 if the pool doesn't have the handler
+        """
+        with self._lock:
+            reference = self._references.get(id(handler))
+            return reference[1] if reference is not None else 0
+
+    def file(self, filename, **kwargs):
+        """returns the ``FileHandler`` of a file
+
+        :param filename: the name of the file to write to; names of the same file share a handler
+        :type filename: str
+
+        :param kwargs: the arguments of the ``FileHandler`` if one is created
+        :type kwargs: dict
+
+        :returns: the shared handler
+        :rtype: FileHandler
+        """
+        key = ('file', os.path.realpath(filename))
+        return self.acquire(key, lambda: FileHandler(filename, **kwargs))
+
+    def socket(self, address, **kwargs):
+        """returns the ``SocketHandler`` of a stream socket
+
+        :param address: a UNIX socket path or a ``(host, port)`` tuple
+        :type address: str or tuple
+
+        :param kwargs: the arguments of the ``SocketHandler`` if one is created
+        :type kwargs: dict
+
+        :returns: the shared handler
+        :rtype: SocketHandler
+        """
+        key = ('socket', address)
+        return self.acquire(key, lambda: SocketHandler(socket.socket(_socket_family(address), socket.SOCK_STREAM),
+                                                       address, **kwargs))
+
+    def stream(self, stream, **kwargs):
+        """returns the ``StreamHandler`` of a stream
+
+        :param stream: an open stream to write to
+        :type stream: object
+
+        :param kwargs: the arguments of the ``StreamHandler`` if one is created
+        :type kwargs: dict
+
+        :returns: the shared handler
+        :rtype: StreamHandler
+        """
+        key = ('stream', id(stream))
+        return self.acquire(key, lambda: StreamHandler(stream, **kwargs))
+
+
+default_pool = HandlerPool()
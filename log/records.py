@@ -0,0 +1,182 @@
+import time
+import traceback
+from datetime import datetime
+
+from .levels import LogLevel
+
+try:
+    import arrow
+    _arrow_available = True
+except ImportError:           # pragma: no cover
+    _arrow_available = False  # pragma: no cover
+
+
+if hasattr(time, 'time_ns'):
+    now_ns = time.time_ns
+else:  # pragma: no cover
+    def now_ns():
+        return int(time.time() * 1000000000)
+
+
+def _portable(value, portable):
+    if type(value) in portable:
+        return value
+    try:
+        return str(value)
+    except Exception:
+        return object.__repr__(value)
+
+
+class LogRecord(object):
+    """
+    ``LogRecord`` holds the raw values of one log entry. ``Logger`` creates exactly one per entry and hands it to
+    the handlers that accept records, or to ``Formatter.format_record`` for the ones that want strings. The
+    timestamp string and the traceback text are only rendered when someone asks for them.
+
+    >>> record = LogRecord('app', LogLevel.INFO, 'ohaiii')
+    >>> record.timestamp
+    '2016-05-21T14:44:31.408652'
+    >>> record.to_params()
+    {'message': 'ohaiii', 'level': <LogLevel.INFO: 1>, 'name': 'app', 'timestamp': '2016-05-21T14:44:31.408652'}
+    """
+
+    __slots__ = ('name', 'level', 'message', 'created', 'timezone', 'src', 'line', 'func', 'proc', 'exc_info',
+                 'context', '_timestamp', '_exc_text', '_text')
+
+    PORTABLE_TYPES = frozenset([str, int, float, bool, bytes, type(None)])
+    CALL_SITE_KEYS = frozenset(['src', 'line', 'func', 'proc'])
+    BASE_KEYS = frozenset(['timestamp', 'level', 'name', 'message']) | CALL_SITE_KEYS
+
+    def __init__(self, name, level, message, created=None, timezone=None, exc_info=None, context=None):
+        """
+        :param name: the name of the logger
+        :type name: str
+
+        :param level: the level of the entry
+        :type level: LogLevel
+
+        :param message: the message of the entry
+        :type message: str
+
+        :param created: when the entry was made, in nanoseconds since the epoch; now if not given
+        :type created: int
+
+        :param timezone: the name of the timezone to render the timestamp in; local time if not given
+        :type timezone: str
+
+        :param exc_info: the ``sys.exc_info()`` triple of the exception to render after the message
+        :type exc_info: tuple
+
+        :param context: additional values for interpolation
+        :type context: dict
+        """
+        self.name = name
+        self.level = level
+        self.message = message
+        self.created = now_ns() if created is None else created
+        self.timezone = timezone
+        self.src = self.line = self.func = self.proc = None
+        self.exc_info = exc_info
+        self.context = context if context is not None else {}
+        self._timestamp = None
+        self._exc_text = None
+        self._text = None
+
+    @property
+    def timestamp(self):
+        """the ISO 8601 representation of ``created``"""
+        if self._timestamp is None:
+            seconds, nanoseconds = divmod(self.created, 1000000000)
+            if self.timezone:
+                ts = arrow.Arrow.utcfromtimestamp(seconds).replace(microsecond=nanoseconds // 1000).to(self.timezone)
+            else:
+                ts = datetime.fromtimestamp(seconds).replace(microsecond=nanoseconds // 1000)
+            self._timestamp = ts.isoformat()
+        return self._timestamp
+
+    @property
+    def exc_text(self):
+        """the rendered traceback of the exception, if there is one"""
+        if self._exc_text is None and self.exc_info is not None:
+            self._exc_text = '\n'.join(''.join(traceback.format_exception(*self.exc_info)).splitlines())
+        return self._exc_text
+
+    @exc_text.setter
+    def exc_text(self, exc_text):
+        self._exc_text = exc_text
+        self._text = None
+
+    @property
+    def text(self):
+        """the message, followed by the traceback if there is an exception"""
+        if self._text is None:
+            exc_text = self.exc_text
+            if exc_text is None:
+                self._text = self.message
+            else:
+                self._text = '{}\n'.format(self.message) + exc_text
+        return self._text
+
+    def set_call_site(self, src, line, func, proc):
+        """records where the entry was made
+
+        :param src: the source file
+        :type src: str
+
+        :param line: the line number
+        :type line: int
+
+        :param func: the name of the function
+        :type func: str
+
+        :param proc: the process id
+        :type proc: int
+        """
+        self.src, self.line, self.func, self.proc = src, line, func, proc
+
+    def to_params(self, keys=None):
+        """builds the interpolation parameters for a formatter
+
+        :param keys: the keys the template uses; rendering of the timestamp is skipped if it isn't among them
+        :type keys: set
+
+        :returns: a dict of parameters
+        """
+        params = {'message': self.text, 'level': self.level, 'name': self.name}
+        if keys is None or 'timestamp' in keys:
+            params['timestamp'] = self.timestamp
+        if self.proc is not None:
+            params['src'], params['line'], params['func'], params['proc'] = self.src, self.line, self.func, self.proc
+        params.update(self.context)
+        return params
+
+    def to_tuple(self):
+        """flattens the record into a tuple of plain values that can be sent to another process
+
+        the traceback is rendered, and the name, message and context values other than strings, numbers, booleans,
+        bytes and ``None`` are converted with ``str``, or to a plain ``repr`` if even that fails, so any record can be
+        marshalled.
+
+        :returns: a tuple accepted by ``from_tuple``
+        """
+        portable = self.PORTABLE_TYPES
+        context = dict((key, _portable(value, portable)) for key, value in self.context.items())
+        return (_portable(self.name, portable), None if self.level is None else self.level.value,
+                _portable(self.message, portable), self.created, self.timezone, self.src, self.line, self.func,
+                self.proc, self.exc_text, context)
+
+    @classmethod
+    def from_tuple(cls, values):
+        """rebuilds a record flattened by ``to_tuple``
+
+        :param values: the flattened record
+        :type values: tuple
+
+        :returns: the record
+        """
+        name, level, message, created, timezone, src, line, func, proc, exc_text, context = values
+        record = cls(name, None if level is None else LogLevel(level), message, created=created, timezone=timezone,
+                     context=context)
+        record.set_call_site(src, line, func, proc)
+        record.exc_text = exc_text
+        return record
@@ -0,0 +1,320 @@
+import atexit
+import marshal
+import struct
+import sys
+import threading
+
+from . import forksafe
+from .dispatchers import _DispatcherInterface
+from .errors import ConfigurationError
+from .handlers import _HandlerInterface
+from .levels import LogLevel
+from .records import LogRecord
+
+try:
+    from multiprocessing import shared_memory
+    _shared_memory_available = True
+except ImportError:                   # pragma: no cover
+    _shared_memory_available = False  # pragma: no cover
+
+
+_COUNTER = struct.Struct('<Q')
+_LENGTH = struct.Struct('<I')
+_PADDING = 0xffffffff
+
+# the producer and the consumer each write their own cache line of the header
+_HEAD_OFFSET = 0
+_TAIL_OFFSET = 64
+_OVERFLOWS_OFFSET = 128
+_CAPACITY_OFFSET = 136
+_HEADER_SIZE = 192
+
+
+class RingBuffer(object):
+    """
+    ``RingBuffer`` is a single-producer, single-consumer byte queue in a ``multiprocessing.shared_memory`` block.
+    The producer only moves the head and the consumer only moves the tail, each stored in its own cache line of a
+    small header, so neither side takes a lock or makes a system call. Entries that don't fit are not written; they
+    are counted in ``overflows`` instead.
+
+    Create the ring in the consuming process and open it by ``name`` in the producing one.
+
+    >>> ring = RingBuffer(size=1 << 20)
+    >>> ring.put(b'ohaiii')
+    True
+    >>> ring.get()
+    [b'ohaiii']
+    """
+
+    def __init__(self, name=None, size=1 << 20):
+        """
+        :param name: the name of an existing ring to open; a new ring is created if not given
+        :type name: str
+
+        :param size: the number of bytes available to entries in a new ring
+        :type size: int
+        """
+        if not _shared_memory_available:
+            raise ConfigurationError('Shared memory rings require multiprocessing.shared_memory (Python 3.8+).')
+        self.owner = name is None
+        if self.owner:
+            if size < 2 * _LENGTH.size:
+                raise ConfigurationError('A ring needs room for at least one entry, not {} bytes.'.format(size))
+            self._memory = shared_memory.SharedMemory(create=True, size=_HEADER_SIZE + size)
+            self._memory.buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+            _COUNTER.pack_into(self._memory.buf, _CAPACITY_OFFSET, size)
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+        self.name = self._memory.name
+        self.capacity = _COUNTER.unpack_from(self._memory.buf, _CAPACITY_OFFSET)[0]
+        self._head = _COUNTER.unpack_from(self._memory.buf, _HEAD_OFFSET)[0]
+        self._tail = _COUNTER.unpack_from(self._memory.buf, _TAIL_OFFSET)[0]
+        self.closed = False
+
+    @property
+    def overflows(self):
+        """the number of entries that were dropped because the ring was full"""
+        if self.closed:
+            return self._overflows
+        return _COUNTER.unpack_from(self._memory.buf, _OVERFLOWS_OFFSET)[0]
+
+    def put(self, payload):
+        """adds an entry to the ring; only one process, and one thread at a time, may call this
+
+        :param payload: the entry
+        :type payload: bytes
+
+        :returns: whether there was room for the entry
+        """
+        buf, capacity = self._memory.buf, self.capacity
+        size = _LENGTH.size + len(payload)
+        head = self._head
+        position = head % capacity
+        skip = capacity - position if capacity - position < size else 0
+        tail = _COUNTER.unpack_from(buf, _TAIL_OFFSET)[0]
+        if size + skip > capacity - (head - tail):
+            _COUNTER.pack_into(buf, _OVERFLOWS_OFFSET, _COUNTER.unpack_from(buf, _OVERFLOWS_OFFSET)[0] + 1)
+            return False
+        if skip:
+            if skip >= _LENGTH.size:
+                _LENGTH.pack_into(buf, _HEADER_SIZE + position, _PADDING)
+            head += skip
+            position = 0
+        start = _HEADER_SIZE + position
+        _LENGTH.pack_into(buf, start, len(payload))
+        buf[start + _LENGTH.size:start + size] = payload
+        self._head = head + size
+        _COUNTER.pack_into(buf, _HEAD_OFFSET, self._head)
+        return True
+
+    def get(self):
+        """takes every entry that is in the ring; only one process, and one thread at a time, may call this
+
+        :returns: a list of entries, oldest first
+        """
+        buf, capacity = self._memory.buf, self.capacity
+        head = _COUNTER.unpack_from(buf, _HEAD_OFFSET)[0]
+        tail = self._tail
+        entries = []
+        while tail < head:
+            position = tail % capacity
+            if capacity - position < _LENGTH.size:
+                tail += capacity - position
+                continue
+            length = _LENGTH.unpack_from(buf, _HEADER_SIZE + position)[0]
+            if length == _PADDING:
+                tail += capacity - position
+                continue
+            start = _HEADER_SIZE + position + _LENGTH.size
+            entries.append(bytes(buf[start:start + length]))
+            tail += _LENGTH.size + length
+        if tail != self._tail:
+            self._tail = tail
+            _COUNTER.pack_into(buf, _TAIL_OFFSET, tail)
+        return entries
+
+    def close(self):
+        """detaches from the ring, and removes it if this process created it"""
+        if self.closed:
+            return
+        self._overflows = self.overflows
+        self.closed = True
+        self._memory.close()
+        if self.owner:
+            self._memory.unlink()
+
+
+class RingHandler(_HandlerInterface):
+    """
+    ``RingHandler`` puts records into a ``RingBuffer`` for a ``RingCollector`` in another process to write. A record
+    costs a ``marshal`` of ``LogRecord.to_tuple`` and a copy into shared memory; nothing is formatted and no system
+    call is made on the logging thread. Records that don't fit are counted in the ring's ``overflows``, and records
+    that can't be marshalled in ``dropped``.
+
+    Each ring has exactly one producing process, so give every worker a ring of its own; a handler inherited
+    through a fork ignores what the child logs.
+
+    >>> logger = Logger(handlers=[RingHandler(ring_name)])
+    """
+
+    accepts_records = True
+
+    def __init__(self, ring, name=None):
+        """
+        :param ring: the ring, or the name of the ring, to write to
+        :type ring: RingBuffer or str
+
+        :param name: the name of the handler
+        :type name: str
+        """
+        super(RingHandler, self).__init__(name)
+        self.ring = RingBuffer(ring) if isinstance(ring, str) else ring
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def write(self, message):
+        """puts a message that didn't come with a record into the ring
+
+        :param message: what you want logged
+        :type message: str
+        """
+        self.write_record(LogRecord(None, None, message.rstrip('\n')))
+
+    def write_record(self, record):
+        """puts the record into the ring
+
+        :param record: the record of the entry
+        :type record: LogRecord
+        """
+        try:
+            payload = marshal.dumps(record.to_tuple())
+        except ValueError as e:
+            self.dropped += 1
+            sys.stderr.write('{}: failed to write log entries: {!r}\n'.format(type(self).__name__, e))
+            return
+        with self._lock:
+            if not self.ring.closed:
+                self.ring.put(payload)
+
+    def close(self):
+        """detaches from the ring"""
+        self.ring.close()
+
+    def after_fork(self):
+        """detaches the child from the ring, which only has room for the parent as its producer"""
+        self.ring.owner = False
+        self.ring.close()
+
+
+class RingCollector(object):
+    """
+    ``RingCollector`` polls a set of ``RingBuffer`` objects from a background thread and writes what it finds
+    through the handlers of ``logger``, a batch per ring per poll. When entries were lost to full rings it says so
+    in the log stream with a WARNING. Entries that can't be decoded are skipped and counted in ``malformed``.
+    ``close`` drains every ring before removing them.
+
+    >>> collector = RingCollector(Logger(handlers=[FileHandler('/var/log/app.log')]))
+    >>> ring = collector.create_ring()
+    >>> multiprocessing.Process(target=work, args=(ring.name,)).start()
+    """
+
+    def __init__(self, logger, poll_interval=0.001):
+        """
+        :param logger: the logger whose formatter and handlers write the collected records
+        :type logger: Logger
+
+        :param poll_interval: the number of seconds to wait after finding every ring empty
+        :type poll_interval: float
+        """
+        self.logger = logger
+        self.poll_interval = poll_interval
+        self.rings = []
+        self.received = 0
+        self.malformed = 0
+        self._reported_overflows = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._work, name='log-ring-collector')
+        self._thread.daemon = True
+        self._thread.start()
+        forksafe.register(self, early=True)
+        atexit.register(self.close)
+
+    @property
+    def overflows(self):
+        """the number of entries dropped by producers across every ring"""
+        return sum(ring.overflows for ring in self.rings)
+
+    def create_ring(self, size=1 << 20):
+        """creates a ring for a producer and starts polling it
+
+        :param size: the number of bytes available to entries
+        :type size: int
+
+        :returns: the ring, whose ``name`` is what the producer opens
+        """
+        ring = RingBuffer(size=size)
+        with self._lock:
+            self.rings.append(ring)
+        return ring
+
+    def close(self):
+        """stops polling, writes out every entry left in the rings and removes them"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self._drain()
+        for ring in self.rings:
+            ring.close()
+
+    def before_fork(self):
+        pass
+
+    def after_fork(self):
+        """detaches the child from the rings, leaving them to the parent"""
+        self._stop.set()
+        for ring in self.rings:
+            ring.owner = False
+            ring.close()
+
+    def _work(self):
+        while not self._stop.is_set():
+            if not self._drain():
+                self._stop.wait(self.poll_interval)
+
+    def _drain(self):
+        with self._lock:
+            rings = list(self.rings)
+        count = 0
+        for ring in rings:
+            entries = ring.get()
+            if entries:
+                records = [record for record in map(self._decode, entries) if record is not None]
+                count += len(records)
+                self._write(records)
+        self.received += count
+        overflows = self.overflows
+        if overflows > self._reported_overflows:
+            message = 'dropped {} log entries because a shared memory ring was full'.format(
+                overflows - self._reported_overflows)
+            self._reported_overflows = overflows
+            self._write([LogRecord(self.logger.name, LogLevel.WARNING, message, timezone=self.logger.timezone)])
+        return count
+
+    def _decode(self, entry):
+        try:
+            return LogRecord.from_tuple(marshal.loads(entry))
+        except Exception as e:
+            self.malformed += 1
+            sys.stderr.write('{}: skipped a malformed entry of {} bytes: {!r}\n'.format(type(self).__name__,
+                                                                                        len(entry), e))
+            return None
+
+    def _write(self, records):
+        if not records:
+            return
+        try:
+            _DispatcherInterface.emit_batch(records, self.logger.default_formatter, self.logger.handlers)
+        except Exception as e:
+            sys.stderr.write('{}: failed to write log records: {!r}\n'.format(type(self).__name__, e))
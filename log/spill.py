@@ -0,0 +1,343 @@
+import atexit
+import collections
+import glob
+import os
+import socket
+import sys
+import threading
+import time
+
+from .handlers import _HandlerInterface, _socket_family
+
+
+EXTENSION = '.spill'
+READ_SIZE = 64 * 1024
+
+
+class _Segment(object):
+
+    __slots__ = ('path', 'created', 'size')
+
+    def __init__(self, path, created, size=0):
+        self.path = path
+        self.created = created
+        self.size = size
+
+
+class SpillingSocketHandler(_HandlerInterface):
+    """
+    ``SpillingSocketHandler`` sends entries to a stream socket from a background thread and never makes the
+    application wait on the network. Entries are batched in memory; when the connection is down or the backlog
+    outgrows ``max_memory_bytes``, batches are spilled to numbered segment files in ``directory``. Once the
+    connection is back the spilled data is replayed, oldest first, before anything newer is sent, so the order of
+    entries is kept. Delivery is at least once: a batch that failed part way through is sent again.
+
+    The spill is bounded by ``max_spill_bytes``; beyond it the oldest segments are dropped. Callers only wait when
+    ``max_backlog`` is set and the unsent backlog is above it, and then for at most ``block_timeout`` seconds.
+    ``metrics`` reports the spill size, replay lag and delivery counters. Segments left behind by an earlier process
+    are replayed too.
+
+    >>> handler = SpillingSocketHandler(('collector.example.com', 5170), '/var/spool/app-logs')
+    """
+
+    def __init__(self, address, directory, encoding='utf8', batch_size=64 * 1024, flush_interval=0.1,
+                 max_memory_bytes=1024 * 1024, max_spill_bytes=64 * 1024 * 1024, segment_size=4 * 1024 * 1024,
+                 max_backlog=None, block_timeout=1.0, timeout=5.0, retry_interval=1.0, name=None):
+        """
+        :param address: a UNIX socket path or a ``(host, port)`` tuple to send to
+        :type address: str or tuple
+
+        :param directory: the directory to spill to
+        :type directory: str
+
+        :param encoding: the encoding of the entries
+        :type encoding: str
+
+        :param batch_size: the number of bytes collected before they are sent
+        :type batch_size: int
+
+        :param flush_interval: the longest time in seconds an entry waits to be sent
+        :type flush_interval: float
+
+        :param max_memory_bytes: the unsent bytes kept in memory before they are spilled
+        :type max_memory_bytes: int
+
+        :param max_spill_bytes: the bytes kept on disk before the oldest segments are dropped
+        :type max_spill_bytes: int
+
+        :param segment_size: the size in bytes after which a new segment is started
+        :type segment_size: int
+
+        :param max_backlog: the unsent bytes, in memory and on disk, above which callers wait; callers never wait if
+            not given
+        :type max_backlog: int
+
+        :param block_timeout: the longest time in seconds a caller waits for the backlog to shrink
+        :type block_timeout: float
+
+        :param timeout: the number of seconds connecting or sending may take before the connection counts as down
+        :type timeout: float
+
+        :param retry_interval: the number of seconds between attempts to reconnect
+        :type retry_interval: float
+
+        :param name: the name of the handler
+        :type name: str
+        """
+        super(SpillingSocketHandler, self).__init__(name)
+        self.address = address
+        self.directory = directory
+        self.encoding = encoding
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_memory_bytes = max_memory_bytes
+        self.max_spill_bytes = max_spill_bytes
+        self.segment_size = segment_size
+        self.max_backlog = max_backlog
+        self.block_timeout = block_timeout
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.sent_bytes = 0
+        self.spilled_bytes = 0
+        self.dropped_bytes = 0
+        self.connects = 0
+        self._sequence = 0
+        self._start()
+        with self._condition:
+            for path in sorted(glob.glob(os.path.join(directory, '*' + EXTENSION))):
+                self._sequence = max(self._sequence, int(os.path.basename(path)[:-len(EXTENSION)]))
+                self._segments.append(_Segment(path, os.path.getmtime(path), os.path.getsize(path)))
+            self._condition.notify_all()
+        atexit.register(self.close)
+
+    @property
+    def backlog(self):
+        """the number of bytes not sent yet, in memory and on disk"""
+        return len(self._batch) + self._memory_bytes + self._spill_size()
+
+    def metrics(self):
+        """reports how far behind the handler is
+
+        :returns: a dict with whether the handler is ``connected``, the unsent ``memory_bytes``, the ``spill_bytes``
+            and ``spill_segments`` on disk, the ``replay_lag`` in seconds since the oldest unsent entry was written,
+            and the ``sent_bytes``, ``spilled_bytes``, ``dropped_bytes`` and ``connects`` so far
+        """
+        with self._condition:
+            if self._segments:
+                oldest = self._segments[0].created
+            elif self._queue:
+                oldest = self._queue[0][0]
+            elif self._batch:
+                oldest = self._batch_created
+            else:
+                oldest = None
+            return {
+                'connected': self._socket is not None,
+                'memory_bytes': len(self._batch) + self._memory_bytes,
+                'spill_bytes': self._spill_size(),
+                'spill_segments': len(self._segments),
+                'replay_lag': 0.0 if oldest is None else max(0.0, time.time() - oldest),
+                'sent_bytes': self.sent_bytes,
+                'spilled_bytes': self.spilled_bytes,
+                'dropped_bytes': self.dropped_bytes,
+                'connects': self.connects,
+            }
+
+    def write(self, message):
+        """adds the message to the current batch
+
+        :param message: what you want logged
+        :type message: str
+        """
+        data = message.encode(self.encoding)
+        with self._condition:
+            if self.max_backlog is not None and self.backlog > self.max_backlog:
+                deadline = time.time() + self.block_timeout
+                while self.backlog > self.max_backlog and not self._closed and time.time() < deadline:
+                    self._condition.wait(deadline - time.time())
+            if not self._batch:
+                self._batch_created = time.time()
+            self._batch += data
+            if len(self._batch) >= self.batch_size:
+                self._seal()
+                self._condition.notify_all()
+
+    def flush(self):
+        """sends the current batch and waits until the backlog is delivered, or the connection is found down"""
+        with self._condition:
+            self._seal()
+            self._condition.notify_all()
+            while (self._queue or self._segments) and time.time() >= self._retry_at and not self._closed:
+                self._condition.wait(self.timeout)
+
+    def close(self):
+        """delivers what it can and spills the rest, to be replayed by the next handler on ``directory``"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._seal()
+            self._condition.notify_all()
+        self._thread.join()
+        with self._condition:
+            self._spill()
+            self._close_segment()
+            self._disconnect()
+
+    def after_fork(self):
+        """starts over in the child with a connection and backlog of its own, leaving the spill to the parent"""
+        if self._closed:
+            return
+        self._close_segment()
+        self._disconnect()
+        self._start()
+
+    def _start(self):
+        self._batch = bytearray()
+        self._batch_created = None
+        self._queue = collections.deque()
+        self._memory_bytes = 0
+        self._segments = collections.deque()
+        self._replay_offset = 0
+        self._fh = None
+        self._socket = None
+        self._retry_at = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._send_periodically, name='log-spilling-socket-handler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _seal(self):
+        if not self._batch:
+            return
+        self._queue.append((self._batch_created, bytes(self._batch)))
+        self._memory_bytes += len(self._batch)
+        self._batch = bytearray()
+        if self._memory_bytes > self.max_memory_bytes:
+            self._spill()
+
+    def _spill(self):
+        while self._queue:
+            created, data = self._queue.popleft()
+            self._memory_bytes -= len(data)
+            if self._fh is None or self._segments[-1].size >= self.segment_size:
+                self._open_segment(created)
+            self._fh.write(data)
+            self._segments[-1].size += len(data)
+            self.spilled_bytes += len(data)
+        if self._fh is not None:
+            self._fh.flush()
+        while len(self._segments) > 1 and self._spill_size() > self.max_spill_bytes:
+            segment = self._segments.popleft()
+            self.dropped_bytes += segment.size - self._replay_offset
+            self._replay_offset = 0
+            os.remove(segment.path)
+
+    def _spill_size(self):
+        return sum(segment.size for segment in self._segments) - self._replay_offset
+
+    def _open_segment(self, created):
+        self._close_segment()
+        while True:
+            self._sequence += 1
+            path = os.path.join(self.directory, '{:06d}{}'.format(self._sequence, EXTENSION))
+            try:
+                self._fh = open(path, 'xb')
+                break
+            except FileExistsError:
+                continue
+        self._segments.append(_Segment(path, created))
+
+    def _close_segment(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _next_chunk(self):
+        if self._segments:
+            segment = self._segments[0]
+            if self._fh is not None and len(self._segments) == 1:
+                self._fh.flush()
+            with open(segment.path, 'rb') as fh:
+                fh.seek(self._replay_offset)
+                return segment, fh.read(READ_SIZE)
+        if self._queue:
+            return None, self._queue[0][1]
+        return None, None
+
+    def _sent(self, segment, data):
+        self.sent_bytes += len(data)
+        if segment is None:
+            if self._queue and self._queue[0][1] is data:
+                self._queue.popleft()
+                self._memory_bytes -= len(data)
+                return
+            # the batch was spilled while it was being sent, to the start of what was an empty spill
+            segment = self._segments[0] if self._segments else None
+        if segment is None or self._segments[0] is not segment:
+            return
+        self._replay_offset += len(data)
+        if self._replay_offset >= segment.size:
+            if self._fh is not None and len(self._segments) == 1:
+                self._close_segment()
+            self._segments.popleft()
+            self._replay_offset = 0
+            os.remove(segment.path)
+
+    def _send_periodically(self):
+        while True:
+            with self._condition:
+                while True:
+                    now = time.time()
+                    if self._batch and now - self._batch_created >= self.flush_interval:
+                        self._seal()
+                    pending = self._queue or self._segments
+                    if pending and now >= self._retry_at:
+                        break
+                    if self._closed:
+                        # close spills whatever is left while the connection is down
+                        return
+                    wait = self.flush_interval if not pending else min(self.flush_interval, self._retry_at - now)
+                    self._condition.wait(wait)
+                segment, data = self._next_chunk()
+            if data is None:
+                continue
+            delivered = self._send(data)
+            with self._condition:
+                if delivered:
+                    self._sent(segment, data)
+                else:
+                    self._retry_at = time.time() + self.retry_interval
+                    self._spill()
+                self._condition.notify_all()
+                if not delivered and self._closed:
+                    return
+
+    def _send(self, data):
+        try:
+            if self._socket is None:
+                sock = socket.socket(_socket_family(self.address), socket.SOCK_STREAM)
+                sock.settimeout(self.timeout)
+                try:
+                    sock.connect(self.address)
+                except (OSError, socket.error):
+                    sock.close()
+                    raise
+                self._socket = sock
+                self.connects += 1
+            self._socket.sendall(data)
+            return True
+        except (OSError, socket.error) as e:
+            if self._socket is not None:
+                sys.stderr.write('{}: lost the connection to {}: {!r}\n'.format(type(self).__name__, self.address, e))
+            self._disconnect()
+            return False
+
+    def _disconnect(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
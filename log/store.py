@@ -0,0 +1,311 @@
+from array import array
+from itertools import compress
+
+from .handlers import _HandlerInterface
+from .levels import LogLevel
+from .parsers import EntryParser, iter_entries, open_log, to_nanoseconds
+
+try:
+    import numpy
+    _numpy_available = True
+except ImportError:           # pragma: no cover
+    _numpy_available = False  # pragma: no cover
+
+
+class RecordStore(object):
+    """
+    ``RecordStore`` keeps log records in columns instead of formatted strings: timestamps as nanoseconds since the
+    epoch, level codes, ids into a table of logger names, and offsets into a UTF-8 arena holding the messages. The
+    columns are growable ``array`` objects, so a record costs a few dozen bytes plus its message.
+
+    Filters work on whole columns at once and return row numbers; with numpy installed they run as numpy
+    operations on zero-copy views of the columns.
+
+    >>> store = RecordStore()
+    >>> store.load('/var/log/app.log')
+    >>> rows = store.select(start='2016-05-21T14:00:00-05:00', levels=[LogLevel.ERROR, LogLevel.EXCEPTION])
+    >>> store.count_by('level', rows)
+    {<LogLevel.ERROR: 3>: 12, <LogLevel.EXCEPTION: 4>: 1}
+    """
+
+    def __init__(self, max_records=None):
+        """
+        :param max_records: the number of newest records to keep; the oldest are dropped in chunks once the store
+            grows a quarter past this size
+        :type max_records: int
+        """
+        self.max_records = max_records
+        self.names = []
+        self._name_ids = {}
+        self._setup_columns()
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append(self, timestamp, level, name, message):
+        """adds a record to the store
+
+        :param timestamp: nanoseconds since the epoch
+        :type timestamp: int
+
+        :param level: the level of the entry
+        :type level: LogLevel
+
+        :param name: the name of the logger
+        :type name: str
+
+        :param message: the message of the entry
+        :type message: str
+        """
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        encoded = message.encode('utf8')
+        self.timestamps.append(timestamp)
+        self.levels.append(level.value if level is not None else -1)
+        self.name_ids.append(name_id)
+        self.message_offsets.append(len(self._arena))
+        self.message_lengths.append(len(encoded))
+        self._arena += encoded
+        if self.max_records is not None and len(self.timestamps) > self.max_records + self.max_records // 4:
+            self._trim(len(self.timestamps) - self.max_records)
+
+    def clear(self):
+        """removes every record from the store"""
+        self._setup_columns()
+
+    def load(self, source, parser=None):
+        """fills the store from a log file
+
+        :param source: a file name, plain or compressed, or a file opened for binary reading
+        :type source: str or file
+
+        :param parser: the parser that recognizes the start of an entry
+        :type parser: EntryParser
+
+        :returns: the number of records loaded
+        """
+        parser = parser or EntryParser()
+        fh = open_log(source) if isinstance(source, str) else source
+        count = 0
+        try:
+            for prefix, entry in iter_entries(fh, parser):
+                message = entry[prefix.end:].rstrip(b'\n').decode('utf8', 'replace')
+                self.append(prefix.timestamp, prefix.level, prefix.name or '', message)
+                count += 1
+        finally:
+            if fh is not source:
+                fh.close()
+        return count
+
+    def message(self, row):
+        """returns the message of a record
+
+        :param row: the row number of the record
+        :type row: int
+
+        :returns: the message
+        """
+        offset = self.message_offsets[row]
+        return self._arena[offset:offset + self.message_lengths[row]].decode('utf8')
+
+    def record(self, row):
+        """returns a record as a tuple
+
+        :param row: the row number of the record
+        :type row: int
+
+        :returns: a ``(timestamp, level, name, message)`` tuple
+        """
+        level = self.levels[row]
+        return (self.timestamps[row], LogLevel(level) if level >= 0 else None, self.names[self.name_ids[row]],
+                self.message(row))
+
+    def records(self, rows=None):
+        """returns records as tuples
+
+        :param rows: the row numbers to return, e.g. from ``select``; all records if not given
+        :type rows: sequence of int
+
+        :returns: a list of ``(timestamp, level, name, message)`` tuples
+        """
+        if rows is None:
+            rows = range(len(self))
+        return [self.record(int(row)) for row in rows]
+
+    def select(self, start=None, end=None, levels=None, names=None):
+        """finds the records matching every given filter
+
+        :param start: the earliest timestamp to include
+        :type start: int or str or datetime
+
+        :param end: the latest timestamp to include
+        :type end: int or str or datetime
+
+        :param levels: the levels to include
+        :type levels: list of LogLevel
+
+        :param names: the logger names to include
+        :type names: list of str
+
+        :returns: the matching row numbers in ascending order, as a numpy array if numpy is available
+        """
+        start = to_nanoseconds(start)
+        end = to_nanoseconds(end)
+        level_codes = None if levels is None else [level.value for level in levels]
+        name_ids = None if names is None else [self._name_ids[name] for name in names if name in self._name_ids]
+        if _numpy_available:
+            return self._select_numpy(start, end, level_codes, name_ids)
+        return self._select_python(start, end, level_codes, name_ids)
+
+    def count_by(self, field, rows=None):
+        """counts records grouped by one or more fields
+
+        :param field: ``'level'``, ``'name'`` or a tuple of both
+        :type field: str or tuple
+
+        :param rows: the row numbers to count, e.g. from ``select``; all records if not given
+        :type rows: sequence of int
+
+        :returns: a dict of counts keyed by level, name or ``(name, level)`` tuples, following ``field``
+        """
+        fields = (field,) if isinstance(field, str) else tuple(field)
+        if not set(fields) <= {'level', 'name'} or not fields:
+            raise ValueError("Can only group by 'level' and/or 'name', not {}.".format(field))
+        width = 8
+        if _numpy_available:
+            codes = self._group_codes_numpy(fields, width, rows)
+            counts = dict((int(code), int(count)) for code, count in enumerate(numpy.bincount(codes)) if count)
+        else:
+            codes = self._group_codes_python(fields, width, rows)
+            counts = {}
+            for code in codes:
+                counts[code] = counts.get(code, 0) + 1
+        return dict((self._group_key(fields, width, code), count) for code, count in counts.items())
+
+    def _group_codes_numpy(self, fields, width, rows):
+        codes = numpy.zeros(len(self), dtype=numpy.int64)
+        for field in fields:
+            if field == 'level':
+                codes = codes * width + numpy.frombuffer(self.levels, dtype=numpy.int8) + 1
+            else:
+                codes = codes * len(self.names) + numpy.frombuffer(self.name_ids, dtype=numpy.int32)
+        return codes if rows is None else codes[numpy.asarray(rows, dtype=numpy.int64)]
+
+    def _group_codes_python(self, fields, width, rows):
+        rows = range(len(self)) if rows is None else rows
+        codes = [0] * len(rows)
+        for field in fields:
+            if field == 'level':
+                levels = self.levels
+                codes = [code * width + levels[row] + 1 for code, row in zip(codes, rows)]
+            else:
+                name_ids, num_names = self.name_ids, len(self.names)
+                codes = [code * num_names + name_ids[row] for code, row in zip(codes, rows)]
+        return codes
+
+    def _group_key(self, fields, width, code):
+        key = []
+        for field in reversed(fields):
+            if field == 'level':
+                code, level = divmod(code, width)
+                key.append(LogLevel(level - 1) if level else None)
+            else:
+                code, name_id = divmod(code, len(self.names))
+                key.append(self.names[name_id])
+        key.reverse()
+        return key[0] if len(key) == 1 else tuple(key)
+
+    def _select_numpy(self, start, end, level_codes, name_ids):
+        mask = numpy.ones(len(self), dtype=bool)
+        if start is not None or end is not None:
+            timestamps = numpy.frombuffer(self.timestamps, dtype=numpy.int64)
+            if start is not None:
+                mask &= timestamps >= start
+            if end is not None:
+                mask &= timestamps <= end
+        if level_codes is not None:
+            mask &= numpy.isin(numpy.frombuffer(self.levels, dtype=numpy.int8), level_codes)
+        if name_ids is not None:
+            mask &= numpy.isin(numpy.frombuffer(self.name_ids, dtype=numpy.int32), name_ids)
+        return numpy.flatnonzero(mask)
+
+    def _select_python(self, start, end, level_codes, name_ids):
+        mask = [True] * len(self)
+        if start is not None:
+            mask = [keep and timestamp >= start for keep, timestamp in zip(mask, self.timestamps)]
+        if end is not None:
+            mask = [keep and timestamp <= end for keep, timestamp in zip(mask, self.timestamps)]
+        if level_codes is not None:
+            level_codes = frozenset(level_codes)
+            mask = [keep and level in level_codes for keep, level in zip(mask, self.levels)]
+        if name_ids is not None:
+            name_ids = frozenset(name_ids)
+            mask = [keep and name_id in name_ids for keep, name_id in zip(mask, self.name_ids)]
+        return array('q', compress(range(len(mask)), mask))
+
+    def _setup_columns(self):
+        self.timestamps = array('q')
+        self.levels = array('b')
+        self.name_ids = array('i')
+        self.message_offsets = array('q')
+        self.message_lengths = array('i')
+        self._arena = bytearray()
+
+    def _trim(self, count):
+        shift = self.message_offsets[count] if count < len(self) else len(self._arena)
+        for column in (self.timestamps, self.levels, self.name_ids, self.message_offsets, self.message_lengths):
+            del column[:count]
+        del self._arena[:shift]
+        self.message_offsets = array('q', (offset - shift for offset in self.message_offsets))
+
+
+class StoreHandler(_HandlerInterface):
+    """
+    ``StoreHandler`` keeps what it is given in a ``RecordStore`` so it can be queried in process, e.g. in tests.
+    Records from a ``Logger`` are stored as they are; strings written directly are parsed back into their fields,
+    so for those ``parser`` has to match the template.
+
+    >>> handler = StoreHandler()
+    >>> logger = Logger(handlers=[handler])
+    >>> logger.info('ohaiii')
+    >>> handler.store.records()
+    [(1463859871408652000, <LogLevel.INFO: 1>, 'log.loggers', 'ohaiii')]
+    """
+
+    accepts_records = True
+
+    def __init__(self, store=None, parser=None, name=None):
+        """
+        :param store: the store to fill; a new, unbounded one if not given
+        :type store: RecordStore
+
+        :param parser: the parser that recognizes the fields of an entry
+        :type parser: EntryParser
+
+        :param name: the name of the handler
+        :type name: str
+        """
+        super(StoreHandler, self).__init__(name)
+        self.store = store if store is not None else RecordStore()
+        self.parser = parser or EntryParser()
+
+    def write(self, message):
+        """parses the message and adds it to the store
+
+        :param message: what you want logged
+        :type message: str
+        """
+        prefix = self.parser.parse(message)
+        if prefix is None:
+            return
+        self.store.append(prefix.timestamp, prefix.level, prefix.name or '', message[prefix.end:].rstrip('\n'))
+
+    def write_record(self, record):
+        """adds the record to the store
+
+        :param record: the record of the entry
+        :type record: LogRecord
+        """
+        self.store.append(record.created, record.level, record.name, record.text)
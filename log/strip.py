@@ -0,0 +1,250 @@
+import ast
+import hashlib
+import importlib.machinery
+import importlib.util
+import marshal
+import os
+import struct
+import sys
+
+from .levels import LogLevel
+
+
+_HEADER = struct.Struct('<4sIII')
+
+METHODS = {
+    'debug': LogLevel.DEBUG,
+    'info': LogLevel.INFO,
+    'warning': LogLevel.WARNING,
+}
+
+
+class _Stripper(ast.NodeTransformer):
+
+    def __init__(self, level, guard, names):
+        self.level = level
+        self.guard = guard
+        self.names = names
+
+    def visit_Expr(self, node):
+        call = node.value
+        if not isinstance(call, ast.Call) or not isinstance(call.func, ast.Attribute):
+            return node
+        level = METHODS.get(call.func.attr)
+        if level is None or not self._is_logger(call.func.value):
+            return node
+        if level < self.level:
+            return ast.copy_location(ast.Pass(), node)
+        if not self.guard:
+            return node
+        # loggers of other libraries, e.g. the standard logging module's, have no is_enabled_for and are called as is
+        receiver = call.func.value
+        foreign = ast.Compare(left=ast.Call(func=ast.Name(id='getattr', ctx=ast.Load()),
+                                            args=[receiver, ast.Constant('is_enabled_for'), ast.Constant(None)],
+                                            keywords=[]),
+                              ops=[ast.Is()], comparators=[ast.Constant(None)])
+        enabled = ast.Call(func=ast.Attribute(value=receiver, attr='is_enabled_for', ctx=ast.Load()),
+                           args=[ast.Constant(level.name)], keywords=[])
+        test = ast.BoolOp(op=ast.Or(), values=[foreign, enabled])
+        return ast.copy_location(ast.If(test=test, body=[node], orelse=[]), node)
+
+    def _is_logger(self, receiver):
+        # only plain names and attributes, which can be evaluated twice without side effects
+        if isinstance(receiver, ast.Name):
+            return receiver.id in self.names
+        if isinstance(receiver, ast.Attribute) and receiver.attr in self.names:
+            while isinstance(receiver, ast.Attribute):
+                receiver = receiver.value
+            return isinstance(receiver, ast.Name)
+        return False
+
+
+def rewrite(source, filename='<unknown>', level=LogLevel.INFO, guard=True, names=('log', 'logger')):
+    """compiles source with its disabled log calls stripped and the others guarded
+
+    A call is a log call when it is a statement of its own calling ``debug``, ``info`` or ``warning`` on a name, or
+    an attribute, in ``names``, e.g. ``logger.debug(...)`` or ``self.log.info(...)``. Calls below ``level`` are
+    replaced by ``pass``, so their arguments are never evaluated. With ``guard`` the other calls become
+    ``if logger.is_enabled_for('INFO'): logger.info(...)``, which skips the arguments when the logger's level is
+    higher at run time. Receivers without ``is_enabled_for``, such as ``logging.Logger``, are called unguarded.
+
+    :param source: the source code of a module
+    :type source: str or bytes
+
+    :param filename: the name of the file the source was read from
+    :type filename: str
+
+    :param level: the level below which log calls are stripped
+    :type level: LogLevel
+
+    :param guard: should the remaining log calls be guarded
+    :type guard: bool
+
+    :param names: the names of loggers
+    :type names: tuple
+
+    :returns: the code object of the module
+    """
+    tree = ast.parse(source, filename)
+    tree = ast.fix_missing_locations(_Stripper(level, guard, frozenset(names)).visit(tree))
+    return compile(tree, filename, 'exec', dont_inherit=True)
+
+
+class StrippingLoader(importlib.machinery.SourceFileLoader):
+    """
+    ``StrippingLoader`` loads a module from source rewritten by ``rewrite``. The bytecode is cached next to the
+    regular one, with an optimization tag telling it apart, e.g. ``app.cpython-311.opt-logstripinfoguard1a2b3c4d.pyc``
+    where the last characters are a hash of ``names``, and is compiled again when the source changes.
+    """
+
+    def __init__(self, fullname, path, level=LogLevel.INFO, guard=True, names=('log', 'logger')):
+        """
+        :param fullname: the name of the module
+        :type fullname: str
+
+        :param path: the path of the source file
+        :type path: str
+
+        :param level: the level below which log calls are stripped
+        :type level: LogLevel
+
+        :param guard: should the remaining log calls be guarded
+        :type guard: bool
+
+        :param names: the names of loggers
+        :type names: tuple
+        """
+        super(StrippingLoader, self).__init__(fullname, path)
+        self.level = level
+        self.guard = guard
+        self.names = names
+        names_hash = hashlib.sha1(','.join(sorted(names)).encode('utf8')).hexdigest()[:8]
+        self.tag = 'logstrip{}{}{}'.format(level.name.lower(), 'guard' if guard else '', names_hash)
+
+    def get_code(self, fullname):
+        """reads the module's code from the cache, or rewrites and caches it
+
+        :param fullname: the name of the module
+        :type fullname: str
+
+        :returns: the code object of the module
+        """
+        path = self.get_filename(fullname)
+        stat = os.stat(path)
+        mtime, size = int(stat.st_mtime) & 0xFFFFFFFF, stat.st_size & 0xFFFFFFFF
+        try:
+            cache = importlib.util.cache_from_source(path, optimization=self.tag)
+        except NotImplementedError:
+            cache = None
+        if cache is not None:
+            try:
+                with open(cache, 'rb') as fh:
+                    data = fh.read()
+                if _HEADER.unpack_from(data) == (importlib.util.MAGIC_NUMBER, 0, mtime, size):
+                    return marshal.loads(data[_HEADER.size:])
+            except (OSError, ValueError, EOFError, TypeError, struct.error):
+                pass
+        code = self.source_to_code(self.get_data(path), path)
+        if cache is not None and not sys.dont_write_bytecode:
+            self._write_cache(cache, _HEADER.pack(importlib.util.MAGIC_NUMBER, 0, mtime, size) + marshal.dumps(code))
+        return code
+
+    def source_to_code(self, data, path, *args, **kwargs):
+        """compiles the module's source with ``rewrite``"""
+        return rewrite(data, path, self.level, self.guard, self.names)
+
+    def _write_cache(self, cache, data):
+        temporary = '{}.{}'.format(cache, os.getpid())
+        try:
+            if not os.path.isdir(os.path.dirname(cache)):
+                os.makedirs(os.path.dirname(cache))
+            with open(temporary, 'wb') as fh:
+                fh.write(data)
+            os.replace(temporary, cache)
+        except OSError:
+            # a read-only tree still imports, just without the cache
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+
+class StrippingFinder(object):
+    """
+    ``StrippingFinder`` is an import hook that has the modules of ``packages`` loaded by a ``StrippingLoader``.
+    Modules imported before it is installed are left as they are. Entries stripped from the source can't be held
+    back by a tail buffer either.
+
+    >>> finder = StrippingFinder(['app'], level=LogLevel.INFO).install()
+    >>> import app.views  # logger.debug(...) calls are gone, logger.info(...) calls are guarded
+    """
+
+    def __init__(self, packages, level=LogLevel.INFO, guard=True, names=('log', 'logger')):
+        """
+        :param packages: the names of the packages, and modules, to rewrite, including their submodules
+        :type packages: list
+
+        :param level: the level below which log calls are stripped
+        :type level: LogLevel
+
+        :param guard: should the remaining log calls be guarded
+        :type guard: bool
+
+        :param names: the names of loggers
+        :type names: tuple
+        """
+        self.packages = tuple(packages)
+        self.level = level
+        self.guard = guard
+        self.names = tuple(names)
+
+    def install(self):
+        """puts the finder in front of ``sys.meta_path``
+
+        :returns: the finder
+        """
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        """takes the finder out of ``sys.meta_path``; modules it already loaded stay rewritten"""
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        """finds the module with the regular path finder and swaps in a ``StrippingLoader``
+
+        :param fullname: the name of the module
+        :type fullname: str
+
+        :param path: the search path of the parent package
+        :type path: list
+
+        :returns: the module's spec, or ``None`` to leave it to the other finders
+        """
+        if not any(fullname == package or fullname.startswith(package + '.') for package in self.packages):
+            return None
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path, target)
+        if spec is None or type(spec.loader) is not importlib.machinery.SourceFileLoader:
+            return None
+        spec.loader = StrippingLoader(fullname, spec.origin, self.level, self.guard, self.names)
+        return spec
+
+
+def install(packages, level=LogLevel.INFO, guard=True, names=('log', 'logger')):
+    """rewrites the log calls of ``packages`` when they are imported, see ``StrippingFinder``
+
+    :param packages: the names of the packages, and modules, to rewrite, including their submodules
+    :type packages: list
+
+    :param level: the level below which log calls are stripped
+    :type level: LogLevel
+
+    :param guard: should the remaining log calls be guarded
+    :type guard: bool
+
+    :param names: the names of loggers
+    :type names: tuple
+
+    :returns: the installed finder
+    """
+    return StrippingFinder(packages, level, guard, names).install()
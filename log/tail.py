@@ -0,0 +1,127 @@
+import collections
+import functools
+import inspect
+import threading
+
+from .context import _Variable
+from .levels import LogLevel
+
+
+_current = _Variable('log_tail')
+
+
+class TailScope(object):
+    """
+    ``TailScope`` holds back the entries logged on the current thread or asyncio task while it is entered, by any
+    logger, including those below the logger's level, without formatting them. When the scope ends normally only the
+    entries at or above their logger's level are written; when an ERROR or EXCEPTION entry is logged, or an exception
+    leaves the scope, every entry is written, and the rest of the scope is written as it is logged.
+
+    At most ``capacity`` entries are held; beyond it the oldest entry is written if it is at its logger's level and
+    discarded otherwise, so the scope keeps the last ``capacity`` entries of detail. Use it as a decorator to have a
+    scope of its own around every call; on an ``async def`` function the scope is entered around the awaited body.
+
+    >>> with TailScope():
+    ...     logger.debug('only written if the request fails')
+    ...     logger.info('always written')
+    """
+
+    def __init__(self, capacity=1000):
+        """
+        :param capacity: the number of entries held back
+        :type capacity: int
+        """
+        self.capacity = capacity
+        self.discarded = 0
+        self._entries = collections.deque()
+        self._failed = False
+        self._parent = None
+        self._token = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._parent = _current.get()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current.reset(self._token)
+        self._token = None
+        with self._lock:
+            if exc_type is not None:
+                self._failed = True
+            entries, self._entries = self._entries, collections.deque()
+            for entry in entries:
+                self._release(entry)
+
+    def __call__(self, function):
+        if getattr(inspect, 'iscoroutinefunction', None) is not None and inspect.iscoroutinefunction(function):
+            # coroutines need async syntax, which lives with the rest of the asyncio support
+            from .aio import _tail_coroutine
+            return _tail_coroutine(function, self.capacity)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with TailScope(self.capacity):
+                return function(*args, **kwargs)
+        return wrapper
+
+    @property
+    def failed(self):
+        """whether an error was logged in the scope"""
+        return self._failed
+
+    def add(self, record, enabled, dispatcher, formatter, handlers):
+        """holds back an entry, or writes it if the scope failed
+
+        :param record: the record of the entry
+        :type record: LogRecord
+
+        :param enabled: whether the entry is at or above its logger's level
+        :type enabled: bool
+
+        :param dispatcher: the dispatcher to write the entry with
+        :type dispatcher: _DispatcherInterface
+
+        :param formatter: the formatter of the entry
+        :type formatter: Formatter
+
+        :param handlers: the handlers to write to
+        :type handlers: set of _HandlerInterface
+        """
+        entry = (record, enabled, dispatcher, formatter, handlers)
+        with self._lock:
+            if not self._failed and record.level >= LogLevel.ERROR:
+                self._failed = True
+                entries, self._entries = self._entries, collections.deque()
+                for held in entries:
+                    self._release(held)
+            if self._failed:
+                self._release(entry)
+                return
+            self._entries.append(entry)
+            if len(self._entries) > self.capacity:
+                oldest = self._entries.popleft()
+                if oldest[1]:
+                    self._release(oldest)
+                else:
+                    self.discarded += 1
+
+    def _release(self, entry):
+        record, enabled, dispatcher, formatter, handlers = entry
+        if not enabled and not self._failed:
+            self.discarded += 1
+        elif self._parent is not None:
+            # what an inner scope lets through is up to the outer one, but the detail of a failure is kept
+            self._parent.add(record, True, dispatcher, formatter, handlers)
+        else:
+            dispatcher.dispatch(record, formatter, handlers)
+
+
+def active():
+    """returns the tail scope of the current thread or task, if any
+
+    :returns: the innermost scope entered
+    :rtype: TailScope
+    """
+    return _current.get()
@@ -26,7 +26,11 @@ timezone_requires = install_requires + [
     'arrow',
 ]
 
-dev_requires = timezone_requires + [
+analysis_requires = install_requires + [
+    'numpy',
+]
+
+dev_requires = timezone_requires + analysis_requires[len(install_requires):] + [
     'pytest',
     'pytest-cov',
     'capturer',
@@ -71,6 +75,7 @@ setup(
     install_requires=install_requires,
     extras_require={
         'timezone': timezone_requires,
+        'analysis': analysis_requires,
         'dev': dev_requires,
     },
 )
@@ -0,0 +1,123 @@
+import threading
+import time
+import unittest
+
+from log.adaptive import OverheadController
+from log.handlers import _HandlerInterface
+from log.levels import LogLevel
+from log.loggers import Logger
+
+
+class SlowHandler(_HandlerInterface):
+
+    def __init__(self, delay=0.002):
+        super(SlowHandler, self).__init__(None)
+        self.delay = delay
+        self.lines = []
+
+    def write(self, message):
+        time.sleep(self.delay)
+        self.lines.append(message.rstrip('\n'))
+
+
+class OverheadControllerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = SlowHandler()
+        self.controller = OverheadController(budget=0.05, interval=3600, max_level=LogLevel.INFO, min_sample_rate=0.25,
+                                             relax_after=2)
+        self.logger = Logger(level=LogLevel.DEBUG, template='{level} {message}', handlers=[self.handler],
+                             controller=self.controller)
+        self.addCleanup(self.controller.close)
+
+    def _busy(self, count=10):
+        for i in range(count):
+            self.logger.debug('detail')
+
+    def _idle(self):
+        self.handler.delay = 0
+        time.sleep(0.01)
+
+    def test_raises_level_then_samples(self):
+        self._busy()
+        self.controller._adjust()
+        self.assertGreater(self.controller.overhead, 0.05)
+        self.assertEqual(LogLevel.INFO, self.logger.level)
+        self.assertEqual(1.0, self.controller.sample_rate)
+        self.assertTrue(self.handler.lines[-1].startswith('WARNING logging took '))
+        self.assertIn('over its 5.0% budget; the level is now INFO and 100%', self.handler.lines[-1])
+
+        self.handler.lines = []
+        self._busy()
+        self.assertEqual([], self.handler.lines)
+        for i in range(10):
+            self.logger.info('summary')
+        self.controller._adjust()
+        self.assertEqual(0.5, self.controller.sample_rate)
+        for i in range(20):
+            self.logger.info('summary')
+        self.controller._adjust()
+        self.assertEqual(0.25, self.controller.sample_rate)
+
+        self.handler.lines = []
+        for i in range(400):
+            self.logger.info('sampled')
+        self.logger.error('kept')
+        self.assertLess(self.handler.lines.count('INFO sampled'), 200)
+        self.assertEqual('ERROR kept', self.handler.lines[-1])
+
+    def test_relaxes(self):
+        self._busy()
+        self.controller._adjust()
+        self.assertEqual(LogLevel.INFO, self.logger.level)
+        self._idle()
+        self.controller._adjust()
+        self.assertEqual(LogLevel.INFO, self.logger.level)
+        self.controller._adjust()
+        self.assertEqual(LogLevel.DEBUG, self.logger.level)
+        self.assertIn('within its 5.0% budget; the level is now DEBUG', self.handler.lines[-1])
+        self.assertEqual(2, self.controller.adjustments)
+
+    def test_clones_and_close(self):
+        self._busy()
+        self.controller._adjust()
+        clone = self.logger.clone()
+        self.assertEqual(LogLevel.INFO, clone.level)
+        self.assertIs(self.controller, clone.controller)
+        self._idle()
+        for _ in range(2):
+            self.controller._adjust()
+        self.assertEqual(LogLevel.DEBUG, clone.level)
+
+        self.handler.delay = 0.002
+        self._busy()
+        self.controller._adjust()
+        self.assertEqual(LogLevel.INFO, clone.level)
+        self.logger.close()
+        self.assertEqual(LogLevel.DEBUG, self.logger.level)
+        self.assertEqual(LogLevel.DEBUG, clone.level)
+
+    def test_notices_bypass_the_raised_level(self):
+        controller = OverheadController(budget=0.05, interval=3600, max_level=LogLevel.ERROR, min_sample_rate=0.25,
+                                        relax_after=1)
+        self.addCleanup(controller.close)
+        logger = Logger(level=LogLevel.DEBUG, template='{level} {message}', handlers=[self.handler],
+                        controller=controller)
+        for _ in range(5):
+            for i in range(10):
+                logger.error('detail')
+            controller._adjust()
+        self.assertEqual(LogLevel.ERROR, logger.level)
+        notices = [line for line in self.handler.lines if line.startswith('WARNING logging took')]
+        self.assertEqual(controller.adjustments, len(notices))
+        self.assertEqual(5, len(notices))
+
+    def test_adjusting_is_per_thread(self):
+        self.controller.sample_rate = 0.0
+        self.controller._adjusting.active = True
+        admitted = []
+        thread = threading.Thread(target=lambda: admitted.append(self.controller.admit(LogLevel.DEBUG)))
+        thread.start()
+        thread.join()
+        self.assertEqual([False], admitted)
+        self.assertTrue(self.controller.admit(LogLevel.DEBUG))
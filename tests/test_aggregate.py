@@ -0,0 +1,85 @@
+import time
+import unittest
+
+from six import StringIO as PortableStringIO
+
+from log.aggregate import AggregatingHandler
+from log.formatters import Formatter
+from log.handlers import _HandlerInterface, StreamHandler
+from log.levels import LogLevel
+from log.loggers import Logger
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class RecordingHandler(_HandlerInterface):
+
+    accepts_records = True
+
+    def __init__(self):
+        super(RecordingHandler, self).__init__(None)
+        self.records = []
+        self.closed = False
+
+    def write_record(self, record):
+        self.records.append(record)
+
+    def close(self):
+        self.closed = True
+
+
+class AggregatingHandlerTests(unittest.TestCase):
+
+    def test_groups(self):
+        stream = PortableStringIO()
+        handler = AggregatingHandler(StreamHandler(stream), interval=60,
+                                     formatter=Formatter(template='{name} {level} {message}: {count}'))
+        logger = Logger(name='app', handlers=[handler])
+        for _ in range(100):
+            logger.info('cache miss', key='a')
+        for _ in range(3):
+            logger.warning('cache miss')
+        logger.clone().info('cache miss')
+        logger.name = 'db'
+        logger.info('cache miss')
+        self.assertEqual('', stream.getvalue())
+        handler.flush()
+        self.assertEqual(['app INFO cache miss: 101', 'app WARNING cache miss: 3', 'db INFO cache miss: 1'],
+                         sorted(stream.getvalue().splitlines()))
+        handler.flush()
+        self.assertEqual(3, len(stream.getvalue().splitlines()))
+        handler.close()
+
+    def test_stats(self):
+        recorder = RecordingHandler()
+        handler = AggregatingHandler(recorder, interval=60, stats=['latency'])
+        logger = Logger(name='app', handlers=[handler])
+        for latency in (3, 1, 2, 'slow', True):
+            logger.info('served', latency=latency, size=10)
+        handler.flush()
+        record = recorder.records[0]
+        self.assertEqual(('app', LogLevel.INFO, 'served'), (record.name, record.level, record.message))
+        self.assertEqual(5, record.context['count'])
+        self.assertEqual((1, 3, 2.0), tuple(record.context['latency_' + stat] for stat in ('min', 'max', 'mean')))
+        self.assertNotIn('size_mean', record.context)
+        self.assertRegex(record.context['summary'], r'^count=5 rate=[\d.]+/s latency=1/3/2$')
+
+        handler.stats = True
+        logger.info('served', latency=4, size=10)
+        handler.close()
+        self.assertEqual(10.0, recorder.records[1].context['size_mean'])
+        self.assertTrue(recorder.closed)
+
+    def test_interval(self):
+        stream = PortableStringIO()
+        handler = AggregatingHandler(StreamHandler(stream), interval=0.01)
+        logger = Logger(handlers=[handler])
+        for _ in range(10):
+            logger.info('tick')
+        _wait_for(lambda: stream.getvalue())
+        self.assertRegex(stream.getvalue(), r'^\[.+\] \[INFO\] : tick \(count=10 rate=[\d.]+/s\)\n$')
+        handler.close()
@@ -0,0 +1,188 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from log.aio import AsyncFileHandler, AsyncLogger, AsyncSocketHandler, _AsyncHandlerInterface
+from log.handlers import _HandlerInterface
+from log.levels import LogLevel
+from log.store import StoreHandler
+
+
+class BlockingHandler(_HandlerInterface):
+
+    def __init__(self, delay):
+        super(BlockingHandler, self).__init__(None)
+        self.delay = delay
+        self.writes = []
+        self.threads = set()
+
+    def write(self, message):
+        time.sleep(self.delay)
+        self.threads.add(threading.current_thread())
+        self.writes.append(message)
+
+
+class ListAsyncHandler(_AsyncHandlerInterface):
+
+    def __init__(self):
+        super(ListAsyncHandler, self).__init__(None)
+        self.writes = []
+        self.closed = False
+
+    async def awrite(self, message):
+        await asyncio.sleep(0)
+        self.writes.append(message)
+
+    async def aclose(self):
+        self.closed = True
+
+
+class AsyncLoggerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_emitting_does_not_block_the_loop(self):
+        handler = BlockingHandler(delay=0.02)
+        logger = AsyncLogger(template='{message}', handlers=[handler])
+
+        async def main():
+            ticks = []
+
+            async def tick():
+                while True:
+                    ticks.append(time.time())
+                    await asyncio.sleep(0.005)
+            ticker = asyncio.get_running_loop().create_task(tick())
+            start = time.time()
+            for i in range(10):
+                logger.info(str(i))
+            logged = time.time() - start
+            await logger.aflush()
+            ticker.cancel()
+            await logger.aclose()
+            return logged, ticks
+        logged, ticks = asyncio.run(main())
+        self.assertLess(logged, 0.02)
+        self.assertGreater(len(ticks), 2)
+        self.assertEqual(['{}\n'.format(i) for i in range(10)], [line for write in handler.writes
+                                                                 for line in write.splitlines(True)])
+        self.assertNotIn(threading.current_thread(), handler.threads)
+
+    def test_async_handler_batches(self):
+        handler = ListAsyncHandler()
+        store_handler = StoreHandler()
+        logger = AsyncLogger(template='{level} {message}', handlers=[handler, store_handler])
+
+        async def main():
+            for i in range(100):
+                logger.info(str(i))
+            logger.error('last')
+            await logger.aclose()
+        asyncio.run(main())
+        self.assertEqual(1, len(handler.writes))
+        self.assertEqual(['INFO {}'.format(i) for i in range(100)] + ['ERROR last'], handler.writes[0].splitlines())
+        self.assertTrue(handler.closed)
+        self.assertEqual({LogLevel.INFO: 100, LogLevel.ERROR: 1}, store_handler.store.count_by('level'))
+
+    def test_file_handler(self):
+        filename = os.path.join(self.directory, 'app.log')
+        handler = AsyncFileHandler(filename)
+        logger = AsyncLogger(template='{message}', handlers=[handler])
+
+        async def main():
+            for i in range(50):
+                logger.info(str(i))
+                if i % 10 == 0:
+                    await asyncio.sleep(0)
+            await logger.aclose()
+        asyncio.run(main())
+        self.assertTrue(handler.fh.closed)
+        with open(filename) as fh:
+            self.assertEqual([str(i) for i in range(50)], fh.read().splitlines())
+
+    def test_socket_handler(self):
+        address = os.path.join(self.directory, 'log.sock')
+        received = bytearray()
+
+        async def main():
+            async def serve(reader, writer):
+                received.extend(await reader.read())
+                writer.close()
+            server = await asyncio.start_unix_server(serve, address)
+            handler = AsyncSocketHandler(address)
+            logger = AsyncLogger(template='{message}', handlers=[handler])
+            for i in range(20):
+                logger.info(str(i))
+            await logger.aclose()
+            for _ in range(100):
+                if len(received) == 50:
+                    break
+                await asyncio.sleep(0.01)
+            server.close()
+            await server.wait_closed()
+        asyncio.run(main())
+        self.assertEqual([str(i) for i in range(20)], received.decode().splitlines())
+
+    def test_socket_handler_down(self):
+        handler = AsyncSocketHandler(os.path.join(self.directory, 'missing.sock'))
+        logger = AsyncLogger(template='{message}', handlers=[handler])
+
+        async def main():
+            logger.info('one')
+            logger.info('two')
+            await logger.aclose()
+        asyncio.run(main())
+        self.assertEqual(2, handler.dropped)
+
+    def test_logged_before_the_loop(self):
+        handler = ListAsyncHandler()
+        logger = AsyncLogger(template='{message}', handlers=[handler])
+        logger.info('early')
+
+        async def main():
+            logger.info('late')
+            await logger.aclose()
+        asyncio.run(main())
+        self.assertEqual('early\nlate\n', ''.join(handler.writes))
+
+    def test_max_queue_size(self):
+        handler = ListAsyncHandler()
+        logger = AsyncLogger(template='{message}', handlers=[handler], max_queue_size=3)
+
+        async def main():
+            for i in range(5):
+                logger.info(str(i))
+            await logger.aclose()
+        asyncio.run(main())
+        self.assertEqual('0\n1\n2\n', ''.join(handler.writes))
+        self.assertEqual(2, logger.dispatcher.dropped)
+
+    def test_logger_arguments_and_clones(self):
+        handler = ListAsyncHandler()
+        handler.name = 'list'
+        logger = AsyncLogger(template='{message} {detail}', handlers=[handler], max_message_size=10,
+                             max_context_size=4)
+
+        async def main():
+            clone = logger.only('list')
+            self.assertIsInstance(clone, AsyncLogger)
+            self.assertIsInstance(logger.using('default'), AsyncLogger)
+            self.assertIs(logger.dispatcher, clone.dispatcher)
+            clone.info('x' * 50, detail='y' * 50)
+            await logger.aclose()
+        asyncio.run(main())
+        lines = ''.join(handler.writes).splitlines()
+        self.assertEqual(1, len(lines))
+        self.assertTrue(lines[0].startswith('... [truncated from 50 characters] ... [truncated'), lines[0])
+
+    def test_sync_write_unsupported(self):
+        with self.assertRaises(NotImplementedError):
+            ListAsyncHandler().write('nope')
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import six
+from capturer import CaptureOutput
+
+from log import binary
+from log.binary import BinaryHandler, decode, read_records, repair
+from log.formatters import Formatter
+from log.levels import LogLevel
+from log.loggers import Logger
+
+
+class BinaryHandlerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.handler = BinaryHandler(self.directory)
+        self.logger = Logger('app', level=LogLevel.DEBUG, handlers=[self.handler], timezone='America/Chicago')
+
+    def tearDown(self):
+        self.handler.close()
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        self.logger.debug('first', user='bond', count=-7, ratio=0.25, ok=True, nothing=None, raw=b'\x00\x01',
+                          other=LogLevel.INFO)
+        self.logger.info('first')
+        try:
+            1 / 0
+        except ZeroDivisionError as e:
+            self.logger.exception(e)
+        self.handler.flush()
+        records = list(read_records([self.directory]))
+        self.assertEqual(3, len(records))
+        first, second, third = records
+        self.assertEqual(('app', LogLevel.DEBUG, 'first', 'America/Chicago'),
+                         (first.name, first.level, first.message, first.timezone))
+        self.assertEqual({'user': 'bond', 'count': -7, 'ratio': 0.25, 'ok': True, 'nothing': None, 'raw': b'\x00\x01',
+                          'other': 'INFO'}, first.context)
+        self.assertTrue(first.created <= second.created <= third.created)
+        self.assertEqual(LogLevel.EXCEPTION, third.level)
+        self.assertTrue(third.text.splitlines()[-1].startswith('ZeroDivisionError'))
+
+    def test_call_site(self):
+        logger = Logger('app', handlers=[self.handler], template='{src}:{line} {message}')
+        logger.info('where am i')
+        self.handler.flush()
+        record = list(read_records([self.directory]))[0]
+        self.assertEqual((__file__.replace('.pyc', '.py'), os.getpid()), (record.src, record.proc))
+
+    def test_decode_with_any_template(self):
+        self.logger.warning('watch out')
+        self.handler.write('plain string')
+        self.handler.close()
+        lines = list(decode([self.directory], Formatter(template='{level}|{name}|{message}')))
+        self.assertEqual(['WARNING|app|watch out\n', 'None||plain string\n'], lines)
+        default = list(decode([self.directory]))[0]
+        six.assertRegex(self, default, r'^\[.*-0[56]:00\] \[WARNING\] : watch out\n$')
+
+    def test_interning_limit(self):
+        handler = BinaryHandler(self.directory, prefix='small', max_interned=2)
+        logger = Logger('app', handlers=[handler])
+        for i in range(5):
+            logger.info('message {}'.format(i), key=i)
+        handler.close()
+        records = list(read_records([handler.filename]))
+        self.assertEqual(['message {}'.format(i) for i in range(5)], [record.message for record in records])
+        self.assertEqual(list(range(5)), [record.context['key'] for record in records])
+
+    def test_segment_rotation(self):
+        handler = BinaryHandler(self.directory, prefix='rot', segment_size=256, buffer_size=1)
+        logger = Logger('app', handlers=[handler])
+        for i in range(50):
+            logger.info('rotating {}'.format(i))
+        handler.close()
+        segments = binary.list_segments([self.directory])
+        self.assertTrue(len([s for s in segments if 'rot.' in s]) > 2)
+        messages = [r.message for r in read_records([s for s in segments if 'rot.' in s])]
+        self.assertEqual(['rotating {}'.format(i) for i in range(50)], messages)
+
+    def test_truncated_tail_recovery(self):
+        for i in range(10):
+            self.logger.info('entry {}'.format(i))
+        self.handler.close()
+        filename = self.handler.filename
+        size = os.path.getsize(filename)
+        with open(filename, 'r+b') as fh:
+            fh.truncate(size - 3)
+        self.assertEqual(9, len(list(read_records([filename]))))
+        handler = BinaryHandler(self.directory)
+        self.assertTrue(os.path.getsize(filename) < size - 3)
+        self.assertNotEqual(filename, handler.filename)
+        handler.write_record(list(read_records([filename]))[0])
+        handler.close()
+        self.assertEqual(10, len(list(read_records([self.directory]))))
+        self.assertEqual(0, repair(filename))
+
+    def test_main(self):
+        self.logger.error('rendered offline')
+        self.handler.close()
+        with CaptureOutput() as co:
+            binary.main(['--template', '{level}: {message}', '--timezone', 'UTC', self.directory])
+        self.assertEqual('ERROR: rendered offline', co.get_text())
+        binary.main(['--repair', self.directory])
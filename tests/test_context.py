@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import unittest
+
+from six import StringIO as PortableStringIO
+
+from log import context
+from log.handlers import StreamHandler
+from log.loggers import Logger
+
+
+class ContextTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = PortableStringIO()
+        self.logger = Logger(template='{request_id} {message}', handlers=[StreamHandler(stream=self.stream)])
+
+    def _lines(self):
+        return self.stream.getvalue().splitlines()
+
+    def test_bound_values(self):
+        with self.logger.contextualize(request_id='a'):
+            self.logger.info('inside')
+            self.assertEqual({'request_id': 'a'}, context.current())
+        self.assertEqual({}, context.current())
+        self.assertEqual(['a inside'], self._lines())
+
+    def test_nesting(self):
+        with context.ContextScope(request_id='a', user='x'):
+            with context.ContextScope(request_id='b'):
+                self.assertEqual({'request_id': 'b', 'user': 'x'}, context.current())
+            self.assertEqual({'request_id': 'a', 'user': 'x'}, context.current())
+
+    def test_precedence(self):
+        logger = Logger(template='{request_id} {message}', handlers=[StreamHandler(stream=self.stream)],
+                        additional_context={'request_id': 'static'})
+        logger.info('static')
+        with logger.contextualize(request_id='bound'):
+            logger.info('bound')
+            logger.info('call', request_id='call')
+        self.assertEqual(['static static', 'bound bound', 'call call'], self._lines())
+
+    def test_clones_share_scope(self):
+        with self.logger.contextualize(request_id='a'):
+            self.logger.clone().info('clone')
+        self.assertEqual(['a clone'], self._lines())
+
+    def test_threads_isolated(self):
+        barrier = threading.Barrier(2)
+        seen = {}
+
+        def handle(request_id):
+            with context.ContextScope(request_id=request_id):
+                barrier.wait()
+                seen[request_id] = context.current()['request_id']
+        threads = [threading.Thread(target=handle, args=(request_id,)) for request_id in ('a', 'b')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual({'a': 'a', 'b': 'b'}, seen)
+
+    def test_wrap(self):
+        seen = []
+        with context.ContextScope(request_id='a'):
+            thread = threading.Thread(target=context.wrap(lambda: seen.append(context.current())))
+        thread.start()
+        thread.join()
+        self.assertEqual([{'request_id': 'a'}], seen)
+        self.assertEqual({}, context.current())
+
+    def test_tasks_isolated(self):
+        async def handle(request_id):
+            with self.logger.contextualize(request_id=request_id):
+                await asyncio.sleep(0)
+                self.logger.info('first')
+                await asyncio.sleep(0)
+                self.logger.info('second')
+
+        async def main():
+            await asyncio.gather(handle('a'), handle('b'))
+        asyncio.run(main())
+        self.assertEqual(['a first', 'b first', 'a second', 'b second'], self._lines())
+
+    def test_thread_local_fallback(self):
+        context._contextvars_available = False
+        self.addCleanup(setattr, context, '_contextvars_available', True)
+        with context.ContextScope(request_id='a'):
+            self.logger.info('inside')
+        self.assertEqual({}, context.current())
+        self.assertEqual(['a inside'], self._lines())
@@ -0,0 +1,361 @@
+import sys
+import threading
+import time
+import unittest
+
+import six
+from six import StringIO as PortableStringIO
+
+from log.dispatchers import ConcurrentDispatcher, DeferredDispatcher, PriorityDispatcher, SynchronousDispatcher
+from log.formatters import Formatter
+from log.handlers import _HandlerInterface, StreamHandler
+from log.levels import LogLevel
+from log.loggers import Logger
+from log.records import LogRecord
+from log.store import StoreHandler
+
+
+class ThreadRecordingHandler(_HandlerInterface):
+
+    def __init__(self, delay=0):
+        super(ThreadRecordingHandler, self).__init__(None)
+        self.delay = delay
+        self.lines = []
+        self.threads = set()
+
+    def write(self, message):
+        time.sleep(self.delay)
+        self.threads.add(threading.current_thread())
+        self.lines.append(message)
+
+
+class SynchronousDispatcherTests(unittest.TestCase):
+
+    def test_dispatch(self):
+        handler = ThreadRecordingHandler()
+        logger = Logger(template='{message}', handlers=[handler], dispatcher=SynchronousDispatcher())
+        logger.info('right away')
+        self.assertEqual(['right away\n'], handler.lines)
+        self.assertEqual({threading.current_thread()}, handler.threads)
+
+    def test_emit_batch(self):
+        handler = ThreadRecordingHandler()
+        store_handler = StoreHandler()
+        records = [LogRecord('app', LogLevel.INFO, 'one'), LogRecord('app', LogLevel.ERROR, 'two')]
+        SynchronousDispatcher.emit_batch(records, Formatter(template='{level} {message}'), [handler, store_handler])
+        self.assertEqual(['INFO one\nERROR two\n'], handler.lines)
+        self.assertEqual(['one', 'two'], [record[3] for record in store_handler.store.records()])
+
+
+class DeferredDispatcherTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dispatcher = DeferredDispatcher()
+
+    def tearDown(self):
+        self.dispatcher.close()
+
+    def test_formats_on_worker(self):
+        handler = ThreadRecordingHandler()
+        logger = Logger(template='{timestamp} {level} {message}', handlers=[handler], dispatcher=self.dispatcher)
+        logger.info('deferred')
+        logger.flush()
+        self.assertEqual(1, len(handler.lines))
+        self.assertTrue(handler.lines[0].endswith(' INFO deferred\n'))
+        self.assertNotIn(threading.current_thread(), handler.threads)
+
+    def test_caller_does_not_wait_for_handlers(self):
+        handler = ThreadRecordingHandler(delay=0.05)
+        logger = Logger(template='{message}', handlers=[handler], dispatcher=self.dispatcher)
+        start = time.time()
+        for i in range(5):
+            logger.info(str(i))
+        self.assertLess(time.time() - start, 0.2)
+        self.dispatcher.flush()
+        self.assertEqual(['{}\n'.format(i) for i in range(5)], handler.lines)
+
+    def test_exception_rendered_on_worker(self):
+        stream = PortableStringIO()
+        logger = Logger(handlers=[StreamHandler(stream)], dispatcher=self.dispatcher)
+        try:
+            1 / 0
+        except ZeroDivisionError as e:
+            logger.exception(e)
+        logger.flush()
+        lines = stream.getvalue().splitlines()
+        self.assertTrue(lines[0].endswith('[EXCEPTION] : division by zero'))
+        self.assertEqual('ZeroDivisionError: division by zero', lines[-1])
+
+    def test_context_snapshot(self):
+        handler = ThreadRecordingHandler()
+        counter = {'value': 0}
+
+        def _count():
+            counter['value'] += 1
+            return counter['value']
+
+        logger = Logger(template='{count} {src}:{func} {message}', handlers=[handler], dispatcher=self.dispatcher,
+                        additional_context={'count': _count}, level=LogLevel.DEBUG)
+        logger.debug('one')
+        logger.debug('two')
+        self.dispatcher.flush()
+        self.assertTrue(handler.lines[0].startswith('1 '))
+        self.assertTrue(handler.lines[1].startswith('2 '))
+        self.assertIn('test_dispatchers.py:test_context_snapshot one', handler.lines[0])
+
+    def test_drop_when_full(self):
+        dispatcher = DeferredDispatcher(max_queue_size=1, block=False)
+        handler = ThreadRecordingHandler(delay=0.05)
+        logger = Logger(template='{message}', handlers=[handler], dispatcher=dispatcher)
+        for i in range(10):
+            logger.info(str(i))
+        dispatcher.close()
+        self.assertTrue(dispatcher.dropped > 0)
+        self.assertEqual(10, dispatcher.dropped + len(handler.lines))
+
+    def test_close_drains(self):
+        handler = ThreadRecordingHandler(delay=0.01)
+        logger = Logger(template='{message}', handlers=[handler], dispatcher=self.dispatcher)
+        for i in range(10):
+            logger.info(str(i))
+        logger.close()
+        self.assertEqual(10, len(handler.lines))
+        self.dispatcher.close()
+
+    def test_handler_errors_reported(self):
+        class Broken(_HandlerInterface):
+            def write(self, message):
+                raise IOError('nope')
+
+        logger = Logger(template='{message}', handlers=[Broken(None)], dispatcher=self.dispatcher)
+        stderr, sys.stderr = sys.stderr, PortableStringIO()
+        try:
+            logger.info('lost')
+            self.dispatcher.flush()
+            output = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        self.assertIn('nope', output)
+
+
+class GatedHandler(ThreadRecordingHandler):
+
+    def __init__(self):
+        super(GatedHandler, self).__init__()
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+
+    def write(self, message):
+        self.entered.set()
+        self.gate.wait()
+        super(GatedHandler, self).write(message)
+
+
+class PriorityDispatcherTests(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = GatedHandler()
+
+    def _logger(self, dispatcher):
+        self.dispatcher = dispatcher
+        self.addCleanup(dispatcher.close)
+        self.addCleanup(self.handler.gate.set)
+        logger = Logger(template='{level} {message}', handlers=[self.handler], dispatcher=dispatcher,
+                        level=LogLevel.DEBUG)
+        logger.info('blocker')
+        self.handler.entered.wait(1)
+        return logger
+
+    def test_errors_first(self):
+        logger = self._logger(PriorityDispatcher())
+        logger.debug('d')
+        logger.info('i')
+        logger.error('e')
+        logger.warning('w')
+        self.handler.gate.set()
+        self.dispatcher.flush()
+        self.assertEqual(['INFO blocker\n', 'ERROR e\n', 'WARNING w\n', 'INFO i\n', 'DEBUG d\n'], self.handler.lines)
+
+    def test_shed_lowest_levels_first(self):
+        logger = self._logger(PriorityDispatcher(max_pending=3))
+        logger.debug('d1')
+        logger.debug('d2')
+        logger.info('i1')
+        logger.warning('w1')  # sheds d1
+        logger.info('i2')     # sheds d2
+        logger.debug('d3')    # nothing below DEBUG, shed itself
+        self.handler.gate.set()
+        self.dispatcher.flush()
+        self.assertEqual(['INFO blocker\n', 'WARNING w1\n', 'INFO i1\n', 'INFO i2\n',
+                          'WARNING shed 3 DEBUG log entries under load\n'], self.handler.lines)
+        self.assertEqual(3, self.dispatcher.shed_totals[LogLevel.DEBUG])
+        self.assertEqual(0, self.dispatcher.shed_totals[LogLevel.INFO])
+
+    def test_protected_levels_wait(self):
+        logger = self._logger(PriorityDispatcher(max_pending=1))
+        logger.error('e1')
+        done = threading.Event()
+
+        def _log_error():
+            logger.error('e2')
+            done.set()
+
+        thread = threading.Thread(target=_log_error)
+        thread.start()
+        self.assertFalse(done.wait(0.1))
+        self.handler.gate.set()
+        thread.join(1)
+        self.dispatcher.flush()
+        self.assertEqual(['INFO blocker\n', 'ERROR e1\n', 'ERROR e2\n'], self.handler.lines)
+        self.assertEqual(0, sum(self.dispatcher.shed_totals.values()))
+
+    def test_max_bytes(self):
+        logger = self._logger(PriorityDispatcher(max_bytes=PriorityDispatcher.RECORD_OVERHEAD * 2 + 10))
+        logger.debug('a')
+        logger.debug('b')
+        logger.info('c' * 20)
+        self.handler.gate.set()
+        self.dispatcher.flush()
+        self.assertEqual(2, self.dispatcher.shed_totals[LogLevel.DEBUG])
+        self.assertEqual('INFO ' + 'c' * 20 + '\n', self.handler.lines[1])
+
+    def test_max_bytes_message_objects(self):
+        class Unprintable(object):
+            def __str__(self):
+                raise RuntimeError('no text')
+
+        dispatcher = PriorityDispatcher(max_bytes=1000)
+        self.assertEqual(PriorityDispatcher.RECORD_OVERHEAD + 2, dispatcher._size(LogRecord('app', None, 42)))
+        self.assertEqual(PriorityDispatcher.RECORD_OVERHEAD, dispatcher._size(LogRecord('app', None, Unprintable())))
+        dispatcher.close()
+
+        logger = self._logger(PriorityDispatcher(max_bytes=1000))
+        logger.info(42)
+        self.handler.gate.set()
+        self.dispatcher.flush()
+        self.assertEqual('INFO 42\n', self.handler.lines[-1])
+
+    def test_close_drains(self):
+        logger = self._logger(PriorityDispatcher())
+        for i in range(5):
+            logger.debug(str(i))
+        self.handler.gate.set()
+        self.dispatcher.close()
+        self.assertEqual(6, len(self.handler.lines))
+
+
+class FlakyHandler(ThreadRecordingHandler):
+
+    def __init__(self):
+        super(FlakyHandler, self).__init__()
+        self.broken = True
+
+    def write(self, message):
+        if self.broken:
+            raise IOError('nope')
+        super(FlakyHandler, self).write(message)
+
+
+class ConcurrentDispatcherTests(unittest.TestCase):
+
+    def _logger(self, *handlers, **kwargs):
+        self.dispatcher = ConcurrentDispatcher(**kwargs)
+        self.addCleanup(self.dispatcher.close)
+        return Logger(template='{message}', handlers=list(handlers), dispatcher=self.dispatcher)
+
+    def _capture_stderr(self):
+        stderr, sys.stderr = sys.stderr, PortableStringIO()
+        self.addCleanup(setattr, sys, 'stderr', stderr)
+        return sys.stderr
+
+    def test_slow_handler_does_not_delay_others(self):
+        slow = GatedHandler()
+        fast = ThreadRecordingHandler()
+        logger = self._logger(slow, fast)
+        for i in range(5):
+            logger.info(str(i))
+        slow.entered.wait(5)
+        deadline = time.time() + 5
+        while len(fast.lines) < 5 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(['0\n', '1\n', '2\n', '3\n', '4\n'], fast.lines)
+        self.assertEqual([], slow.lines)
+        slow.gate.set()
+        logger.flush()
+        self.assertEqual(fast.lines, slow.lines)
+        self.assertNotIn(threading.current_thread(), fast.threads)
+
+    def test_handler_order_and_records(self):
+        handlers = [ThreadRecordingHandler() for _ in range(3)]
+        store_handler = StoreHandler()
+        logger = self._logger(store_handler, *handlers, max_workers=2)
+        for i in range(200):
+            logger.info(str(i))
+        logger.flush()
+        for handler in handlers:
+            self.assertEqual(['{}\n'.format(i) for i in range(200)], handler.lines)
+        self.assertEqual([str(i) for i in range(200)], [record[3] for record in store_handler.store.records()])
+
+    def test_failing_handler_isolated(self):
+        stderr = self._capture_stderr()
+        flaky = FlakyHandler()
+        healthy = ThreadRecordingHandler()
+        logger = self._logger(flaky, healthy, max_failures=3, reset_after=0.2)
+        for i in range(10):
+            logger.info(str(i))
+            logger.flush()
+        self.assertEqual(10, len(healthy.lines))
+        self.assertEqual([flaky], self.dispatcher.isolated)
+        self.assertEqual({flaky: 7}, self.dispatcher.dropped)
+        six.assertRegex(self, stderr.getvalue(),
+                        r'isolated FlakyHandler\d* for 0.2 seconds, it failed 3 times in a row')
+
+        time.sleep(0.25)
+        flaky.broken = False
+        logger.info('back')
+        logger.flush()
+        self.assertEqual(['back\n'], flaky.lines)
+        self.assertEqual([], self.dispatcher.isolated)
+
+    def test_stalled_handler_isolated(self):
+        stderr = self._capture_stderr()
+        stalled = GatedHandler()
+        healthy = ThreadRecordingHandler()
+        logger = self._logger(stalled, healthy, max_workers=1, timeout=0.05, reset_after=60)
+        logger.info('stuck')
+        stalled.entered.wait(5)
+        time.sleep(0.1)
+        logger.info('next')
+        logger.flush()
+        self.assertEqual(['stuck\n', 'next\n'], healthy.lines)
+        self.assertEqual([stalled], self.dispatcher.isolated)
+        self.assertEqual({stalled: 1}, self.dispatcher.dropped)
+        self.assertIn('stalled for more than 0.05 seconds', stderr.getvalue())
+        stalled.gate.set()
+
+    def test_watchdog_isolates_without_logging(self):
+        stderr = self._capture_stderr()
+        stalled = GatedHandler()
+        logger = self._logger(stalled, timeout=0.05, reset_after=60)
+        self.addCleanup(stalled.gate.set)
+        logger.info('stuck')
+        stalled.entered.wait(5)
+        deadline = time.time() + 5
+        while not self.dispatcher.isolated and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([stalled], self.dispatcher.isolated)
+        self.assertIn('stalled for more than 0.05 seconds', stderr.getvalue())
+
+    def test_timeout_per_handler(self):
+        stderr = self._capture_stderr()
+        patient, impatient = GatedHandler(), GatedHandler()
+        patient.name = 'patient'
+        logger = self._logger(patient, impatient, timeout=0.05, timeouts={'patient': 60}, reset_after=60)
+        self.addCleanup(patient.gate.set)
+        self.addCleanup(impatient.gate.set)
+        logger.info('slow')
+        patient.entered.wait(5)
+        impatient.entered.wait(5)
+        time.sleep(0.2)
+        self.assertEqual([impatient], self.dispatcher.isolated)
+        self.assertEqual(1, stderr.getvalue().count('stalled for more than 0.05 seconds'))
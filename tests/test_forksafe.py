@@ -0,0 +1,146 @@
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from capturer import CaptureOutput
+
+from log import forksafe
+from log.binary import BinaryHandler, list_segments, read_records
+from log.dispatchers import DeferredDispatcher, PriorityDispatcher
+from log.handlers import FileHandler, SocketHandler
+from log.loggers import Logger
+
+
+def _fork(child):
+    """runs ``child`` in a forked process and returns its exit code"""
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover
+        code = 1
+        try:
+            code = child() or 0
+        finally:
+            os._exit(code)
+    return os.waitpid(pid, 0)[1] >> 8
+
+
+@unittest.skipUnless(hasattr(os, 'register_at_fork'), 'needs os.register_at_fork')
+class ForkSafeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'app.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _lines(self):
+        with open(self.filename) as fh:
+            return fh.read().splitlines()
+
+    def test_getpid(self):
+        self.assertEqual(os.getpid(), forksafe.getpid())
+        parent = os.getpid()
+        self.assertEqual(0, _fork(lambda: 0 if forksafe.getpid() == os.getpid() != parent else 3))
+
+    def test_call_site_pid(self):
+        handler = FileHandler(self.filename)
+        logger = Logger(template='{proc} {message}', handlers=[handler])
+        self.assertEqual(0, _fork(lambda: logger.info('child')))
+        handler.close()
+        self.assertNotEqual(str(os.getpid()), self._lines()[0].split()[0])
+
+    def test_file_handler_reopens(self):
+        handler = FileHandler(self.filename)
+        logger = Logger(template='{message}', handlers=[handler])
+        logger.info('before')
+        inherited = handler.fh
+
+        def child():
+            if handler.fh is inherited or inherited.closed is False:
+                return 3
+            logger.info('child')
+        self.assertEqual(0, _fork(child))
+        self.assertIs(inherited, handler.fh)
+        logger.info('after')
+        handler.close()
+        self.assertEqual(['before', 'child', 'after'], self._lines())
+
+    def test_socket_handler_reconnects(self):
+        address = os.path.join(self.directory, 'log.sock')
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(address)
+        server.listen(2)
+        handler = SocketHandler(socket.socket(socket.AF_UNIX, socket.SOCK_STREAM), address)
+        logger = Logger(template='{message}', handlers=[handler])
+        parent_connection, _ = server.accept()
+
+        self.assertEqual(0, _fork(lambda: logger.info('child')))
+        child_connection, _ = server.accept()
+        logger.info('parent')
+        handler.close()
+        self.assertEqual(b'child\n', child_connection.recv(100))
+        self.assertEqual(b'parent\n', parent_connection.recv(100))
+        for sock in (parent_connection, child_connection, server):
+            sock.close()
+
+    def test_deferred_dispatcher(self):
+        handler = FileHandler(self.filename)
+        dispatcher = DeferredDispatcher()
+        logger = Logger(template='{message}', handlers=[handler], dispatcher=dispatcher)
+        for i in range(100):
+            logger.info('parent {}'.format(i))
+
+        def child():
+            logger.info('child')
+            dispatcher.close()
+        self.assertEqual(0, _fork(child))
+        dispatcher.close()
+        handler.close()
+        lines = self._lines()
+        self.assertEqual(['parent {}'.format(i) for i in range(100)] + ['child'], lines)
+
+    def test_priority_dispatcher(self):
+        handler = FileHandler(self.filename)
+        dispatcher = PriorityDispatcher()
+        logger = Logger(template='{message}', handlers=[handler], dispatcher=dispatcher)
+        logger.info('parent')
+
+        def child():
+            logger.info('child')
+            dispatcher.close()
+        self.assertEqual(0, _fork(child))
+        dispatcher.close()
+        handler.close()
+        self.assertEqual(['parent', 'child'], self._lines())
+
+    def test_binary_handler_new_segment(self):
+        handler = BinaryHandler(self.directory)
+        logger = Logger(name='app', handlers=[handler])
+        logger.info('parent')
+
+        def child():
+            logger.info('child')
+            handler.close()
+        self.assertEqual(0, _fork(child))
+        handler.close()
+        segments = list_segments([self.directory])
+        self.assertEqual(2, len(segments))
+        self.assertEqual(['parent'], [record.message for record in read_records([segments[0]])])
+        self.assertEqual(['child'], [record.message for record in read_records([segments[1]])])
+
+    def test_hook_errors_reported(self):
+        class Broken(object):
+            def before_fork(self):
+                raise RuntimeError('nope')
+
+            def after_fork(self):
+                pass
+        broken = Broken()
+        forksafe.register(broken)
+        with CaptureOutput(relay=False) as capturer:
+            self.assertEqual(0, _fork(lambda: 0))
+            output = capturer.get_text()
+        del broken
+        self.assertIn("Broken: before_fork failed: RuntimeError('nope')", output)
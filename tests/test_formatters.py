@@ -1,7 +1,10 @@
+import json
 import unittest
 
 from log.errors import BadTemplateError, ConfigurationError
-from log.formatters import TemplateStyle, Formatter
+from log.formatters import TemplateStyle, Formatter, JSONFormatter
+from log.levels import LogLevel
+from log.records import LogRecord
 
 
 class TemplateStyleTests(unittest.TestCase):
@@ -90,7 +93,91 @@ class FormatterTests(unittest.TestCase):
         keys = formatter.extract_template_keys()
         self.assertEqual(set(keys), {'level', 'message', 'person'})
 
+    def test_template_keys(self):
+        self.assertEqual(frozenset(['level', 'message']), self.formatter.template_keys)
+        self.formatter.template = '{timestamp} {message}'
+        self.assertEqual(frozenset(['timestamp', 'message']), self.formatter.template_keys)
+
+    def test_format_record(self):
+        record = LogRecord('app', LogLevel.INFO, 'ohaiii', context={'level': 'custom'})
+        self.assertEqual('custom ohaiii\n', self.formatter.format_record(record))
+        self.assertIsNone(record._timestamp)
+
     def test_extract_template_keys_no_template_fails(self):
         formatter = Formatter()
         with self.assertRaises(ConfigurationError):
             formatter.extract_template_keys()
+
+
+class JSONFormatterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.formatter = JSONFormatter()
+
+    def test_format(self):
+        output = self.formatter.format(timestamp='now', level=LogLevel.ERROR, name='app',
+                                       message='say "hi"\nand leave', user='bond', local_call_depth=1)
+        self.assertTrue(output.endswith('}\n'))
+        self.assertEqual(1, len(output.splitlines()))
+        self.assertEqual(
+            '{"timestamp":"now","level":"ERROR","name":"app","message":"say \\"hi\\"\\nand leave","user":"bond"}\n',
+            output)
+
+    def test_format_values(self):
+        class Thing(object):
+            def __str__(self):
+                return 'thing'
+
+        output = self.formatter.format(message='m', count=3, ratio=0.5, ok=True, missing=None, nan=float('nan'),
+                                       tags=['a', 1], thing=Thing(), nested={'thing': Thing()})
+        parsed = json.loads(output)
+        self.assertEqual(None, parsed['timestamp'])
+        self.assertEqual((3, 0.5, True, None, 'nan'),
+                         (parsed['count'], parsed['ratio'], parsed['ok'], parsed['missing'], parsed['nan']))
+        self.assertEqual(['a', 1], parsed['tags'])
+        self.assertEqual('thing', parsed['thing'])
+        self.assertEqual({'thing': 'thing'}, parsed['nested'])
+
+    def test_format_circular_and_deep_values(self):
+        circular = {'n': 1}
+        circular['self'] = circular
+        deep = []
+        for _ in range(100000):
+            deep = [deep]
+        output = self.formatter.format(message='m', circular=circular, deep=deep, both=[circular, float('nan')])
+        parsed = json.loads(output)
+        self.assertEqual("{'n': 1, 'self': {...}}", parsed['circular'])
+        self.assertTrue(parsed['deep'].startswith('<list object at '))
+        self.assertEqual("[{'n': 1, 'self': {...}}, nan]", parsed['both'])
+
+    def test_format_nested_non_finite_floats(self):
+        def reject(constant):
+            raise ValueError('invalid JSON constant {}'.format(constant))
+
+        output = self.formatter.format(message='m', stats={'mean': float('inf'), 'values': [1.5, float('nan')]},
+                                       bounds=(float('-inf'), 0))
+        parsed = json.loads(output, parse_constant=reject)
+        self.assertEqual({'mean': 'inf', 'values': [1.5, 'nan']}, parsed['stats'])
+        self.assertEqual(['-inf', 0], parsed['bounds'])
+
+    def test_fields_and_options(self):
+        formatter = JSONFormatter(fields=['message'], include_context=False, ensure_ascii=True,
+                                  append_new_line=False)
+        self.assertEqual(frozenset(['message']), formatter.template_keys)
+        self.assertEqual('{"message":"f\\u00fcnf"}', formatter.format(message=u'f\xfcnf', user='bond'))
+        formatter = JSONFormatter(fields=[])
+        self.assertEqual('{"user":"bond"}\n', formatter.format(user='bond'))
+        self.assertEqual('{}\n', formatter.format())
+
+    def test_format_record(self):
+        record = LogRecord('app', LogLevel.INFO, 'ohaiii', created=1463859871408652000, timezone='UTC',
+                           context={'user': 'bond'})
+        parsed = json.loads(self.formatter.format_record(record))
+        self.assertEqual({'timestamp': '2016-05-21T19:44:31.408652+00:00', 'level': 'INFO', 'name': 'app',
+                          'message': 'ohaiii', 'user': 'bond'}, parsed)
+
+    def test_ignores_template(self):
+        formatter = JSONFormatter(template='{message}')
+        formatter.template = '{level}'
+        self.assertEqual('{"message":"m"}\n', JSONFormatter(fields=['message']).format(message='m'))
+        self.assertEqual(frozenset(JSONFormatter.DEFAULT_FIELDS), formatter.template_keys)
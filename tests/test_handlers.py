@@ -1,12 +1,21 @@
 import codecs
+import gzip
+import http.server
 import six
 from six import StringIO as PortableStringIO
 import os
+import re
+import shutil
 import socket
 import sys
+import tempfile
+import threading
+import time
 import unittest
 
-from log import handlers
+from log import forksafe, handlers
+from log.loggers import Logger
+from log.store import StoreHandler
 
 
 class BaseHandlerTest(object):
@@ -81,6 +90,336 @@ class SocketHandlerTests(BaseHandlerTest, unittest.TestCase):
         self.assertEqual(messages, expected)
 
 
+class ExclusiveHandler(handlers._HandlerInterface):
+
+    def __init__(self):
+        super(ExclusiveHandler, self).__init__(None)
+        self.writes = []
+        self.threads = set()
+        self.overlapped = False
+        self._busy = False
+
+    def write(self, message):
+        if self._busy:
+            self.overlapped = True
+        self._busy = True
+        time.sleep(0.001)
+        self.writes.append(message)
+        self.threads.add(threading.current_thread())
+        self._busy = False
+
+
+class ThreadBufferedHandlerTests(unittest.TestCase):
+
+    def test_concurrent_writes(self):
+        inner = ExclusiveHandler()
+        handler = handlers.ThreadBufferedHandler(inner, flush_interval=0.01, batch_size=50)
+        logger = Logger(template='{thread} {message}', handlers=[handler])
+
+        def _work(thread):
+            for i in range(500):
+                logger.info(str(i), thread=thread)
+        threads = [threading.Thread(target=_work, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        handler.close()
+
+        self.assertFalse(inner.overlapped)
+        self.assertLess(len(inner.writes), 8 * 500)
+        lines = ''.join(inner.writes).splitlines()
+        self.assertEqual(8 * 500, len(lines))
+        for thread in range(8):
+            own = [line.split(' ')[1] for line in lines if line.split(' ')[0] == str(thread)]
+            self.assertEqual([str(i) for i in range(500)], own)
+
+    def test_merged_by_sequence(self):
+        inner = ExclusiveHandler()
+        handler = handlers.ThreadBufferedHandler(inner, flush_interval=60)
+        handler.write('first\n')
+        thread = threading.Thread(target=handler.write, args=('second\n',))
+        thread.start()
+        thread.join()
+        handler.write('third\n')
+        handler.flush()
+        self.assertEqual(['first\nsecond\nthird\n'], inner.writes)
+        handler.flush()
+        self.assertEqual(1, len(handler._buffers))
+        handler.close()
+
+    def test_records(self):
+        inner = StoreHandler()
+        handler = handlers.ThreadBufferedHandler(inner, flush_interval=60)
+        self.assertTrue(handler.accepts_records)
+        logger = Logger(handlers=[handler])
+        logger.info('one')
+        logger.error('two')
+        self.assertEqual(0, len(inner.store))
+        handler.close()
+        self.assertEqual(['one', 'two'], [record[3] for record in inner.store.records()])
+
+
+class SyslogHandlerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.address = os.path.join(self.directory, 'log')
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.server.bind(self.address)
+        self.server.settimeout(5)
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.directory)
+
+    def test_framing(self):
+        handler = handlers.SyslogHandler(self.address, facility=16, hostname='web 1', flush_interval=60)
+        logger = Logger(name='app', handlers=[handler])
+        logger.debug('hidden')
+        logger.info('started')
+        logger.error('failed ü')
+        handler.write('plain\n')
+        handler.close()
+        messages = [self.server.recv(1024) for _ in range(3)]
+        pattern = r'<(\d+)>1 \d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}Z web_1 (\S+) (\d+) - - (.*)$'
+        parsed = [re.match(pattern, message.decode('utf8')).groups() for message in messages]
+        pid = str(forksafe.getpid())
+        self.assertEqual([('134', 'app', pid, 'started'), ('131', 'app', pid, 'failed ü'), ('133', '-', pid, 'plain')],
+                         parsed)
+
+    def test_batches(self):
+        handler = handlers.SyslogHandler(self.address, app_name='svc', batch_size=3, flush_interval=60)
+        logger = Logger(handlers=[handler])
+        logger.info('one')
+        logger.info('two')
+        self.assertEqual(0, handler.sent)
+        logger.info('three')
+        self.assertEqual(3, handler.sent)
+        self.assertEqual(3, handler.packets)
+        self.assertTrue(self.server.recv(1024).endswith(b' svc ' + str(forksafe.getpid()).encode() + b' - - one'))
+        handler.close()
+
+    def test_flush_interval(self):
+        handler = handlers.SyslogHandler(self.address, flush_interval=0.01)
+        Logger(handlers=[handler]).info('soon')
+        self.assertTrue(self.server.recv(1024).endswith(b'soon'))
+        handler.close()
+
+    def test_errors_counted(self):
+        handler = handlers.SyslogHandler(os.path.join(self.directory, 'missing'), flush_interval=60)
+        Logger(handlers=[handler]).info('lost')
+        handler.close()
+        self.assertEqual(1, handler.dropped)
+
+
+class DatagramHandlerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.settimeout(5)
+        self.address = self.server.getsockname()
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_packs_lines(self):
+        handler = handlers.DatagramHandler(self.address, mtu=12, flush_interval=60)
+        for message in ('aaa', 'bbb', 'ccc', 'ddd'):
+            handler.write(message + '\n')
+        self.assertEqual(b'aaa\nbbb\nccc\n', self.server.recv(100))
+        handler.close()
+        self.assertEqual(b'ddd\n', self.server.recv(100))
+        self.assertEqual(4, handler.sent)
+        self.assertEqual(2, handler.packets)
+
+    def test_truncate(self):
+        handler = handlers.DatagramHandler(self.address, mtu=8, flush_interval=60)
+        handler.write('abcdeföö\n')
+        handler.close()
+        self.assertEqual(b'abcdef\n', self.server.recv(100))
+        self.assertEqual(1, handler.overflows)
+
+    def test_split(self):
+        handler = handlers.DatagramHandler(self.address, mtu=8, oversized='split', batch_size=10, flush_interval=60)
+        handler.write('abcdefghijkl\n')
+        handler.write('m\n')
+        handler.close()
+        self.assertEqual([b'abcdefg\n', b'hijkl\nm\n'], [self.server.recv(100) for _ in range(2)])
+        self.assertEqual(1, handler.overflows)
+        self.assertEqual((2, 2), (handler.sent, handler.packets))
+
+    def test_flush_interval(self):
+        handler = handlers.DatagramHandler(self.address, flush_interval=0.01)
+        Logger(template='{message}', handlers=[handler]).info('soon')
+        self.assertEqual(b'soon\n', self.server.recv(100))
+        handler.close()
+
+    def test_errors_counted(self):
+        handler = handlers.DatagramHandler(self.address, mtu=100000, flush_interval=60)
+        handler.write('x' * 70000)
+        handler.write('y')
+        handler.close()
+        self.assertEqual(2, handler.dropped)
+
+    def test_oversized_option(self):
+        with self.assertRaises(ValueError):
+            handlers.DatagramHandler(self.address, oversized='drop')
+
+
+class CollectorServer(http.server.ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, failures=0):
+        self.bodies = []
+        self.headers = []
+        self.connections = 0
+        self.failures = failures
+        http.server.ThreadingHTTPServer.__init__(self, ('127.0.0.1', 0), CollectorRequestHandler)
+        self.thread = threading.Thread(target=self.serve_forever, args=(0.01,))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/logs?source=test'.format(self.server_address[1])
+
+    def lines(self):
+        return [line for body in self.bodies for line in body.decode('utf8').splitlines()]
+
+
+class CollectorRequestHandler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        http.server.BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.server.failures:
+            self.server.failures -= 1
+            status = 503
+        else:
+            if self.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            self.server.bodies.append(body)
+            self.server.headers.append(self.headers)
+            status = 204 if self.path == '/logs?source=test' else 404
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTPHandlerTests(unittest.TestCase):
+
+    def setUp(self):
+        stderr, sys.stderr = sys.stderr, PortableStringIO()
+        self.addCleanup(setattr, sys, 'stderr', stderr)
+
+    def _server(self, failures=0):
+        server = CollectorServer(failures)
+        self.addCleanup(server.stop)
+        return server
+
+    def test_batches_on_one_connection(self):
+        server = self._server()
+        handler = handlers.HTTPHandler(server.url, batch_size=10, flush_interval=60)
+        logger = Logger(template='{message}', handlers=[handler])
+        for i in range(25):
+            logger.info(str(i))
+        handler.flush()
+        self.assertEqual(3, len(server.bodies))
+        handler.close()
+        self.assertEqual([str(i) for i in range(25)], server.lines())
+        self.assertEqual(1, server.connections)
+        self.assertEqual(25, handler.sent)
+
+    def test_batch_bytes_and_interval(self):
+        server = self._server()
+        handler = handlers.HTTPHandler(server.url, batch_bytes=10, flush_interval=0.01)
+        handler.write('0123456789\n')
+        handler.write('short\n')
+        _wait_for(lambda: len(server.bodies) == 2)
+        self.assertEqual([b'0123456789\n', b'short\n'], server.bodies)
+        handler.close()
+
+    def test_gzip(self):
+        server = self._server()
+        handler = handlers.HTTPHandler(server.url, gzip=True, headers={'X-Token': 'secret'})
+        handler.write('compressed\n')
+        handler.close()
+        self.assertEqual([b'compressed\n'], server.bodies)
+        self.assertEqual('secret', server.headers[0]['X-Token'])
+
+    def test_retries_5xx(self):
+        server = self._server(failures=2)
+        handler = handlers.HTTPHandler(server.url, backoff=0.01)
+        handler.write('eventually\n')
+        handler.close()
+        self.assertEqual([b'eventually\n'], server.bodies)
+        self.assertEqual(2, handler.retries)
+        self.assertEqual(0, handler.dropped)
+
+    def test_gives_up(self):
+        server = self._server(failures=3)
+        handler = handlers.HTTPHandler(server.url, max_retries=2, backoff=0.01)
+        handler.write('lost\n')
+        handler.close()
+        self.assertEqual([], server.bodies)
+        self.assertEqual(1, handler.dropped)
+
+    def test_rejected(self):
+        server = self._server()
+        handler = handlers.HTTPHandler(server.url.replace('/logs', '/elsewhere'))
+        handler.write('lost\n')
+        handler.close()
+        self.assertEqual(1, handler.dropped)
+        self.assertEqual(0, handler.retries)
+        self.assertIn('with status 404', sys.stderr.getvalue())
+
+    def test_unreachable(self):
+        server = self._server()
+        url = server.url
+        server.stop()
+        handler = handlers.HTTPHandler(url, max_retries=1, backoff=0.01)
+        handler.write('lost\n')
+        handler.close()
+        self.assertEqual(1, handler.dropped)
+
+    def test_fork_does_not_wait_for_the_collector(self):
+        server = self._server(failures=1)
+        handler = handlers.HTTPHandler(server.url, flush_interval=60, max_retries=1, backoff=0.5)
+        handler.write('one\n')
+        handler.write('two\n')
+        started = time.time()
+        handler.before_fork()
+        self.assertLess(time.time() - started, 0.25)
+        handler.close()
+        self.assertEqual([b'one\ntwo\n'], server.bodies)
+        self.assertEqual((2, 1, 0), (handler.sent, handler.retries, handler.dropped))
+
+    def test_url(self):
+        with self.assertRaises(ValueError):
+            handlers.HTTPHandler('ftp://example.com/logs')
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+
+
 class HandlerCompTests(unittest.TestCase):
 
     def test_order(self):
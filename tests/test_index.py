@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from log.index import LogIndex, main
+from log.levels import LogLevel
+
+from capturer import CaptureOutput
+
+
+def _line(second, level, message):
+    return '[2016-05-21T14:{:02d}:{:02d}.000000-05:00] [{}] : {}\n'.format(second // 60, second % 60, level, message)
+
+
+class LogIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'app.log')
+        with open(self.filename, 'w') as fh:
+            for second in range(600):
+                level = 'ERROR' if second % 100 == 0 else 'INFO'
+                fh.write(_line(second, level, 'entry {}'.format(second)))
+                if level == 'ERROR':
+                    fh.write('Traceback (most recent call last):\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_build(self):
+        index = LogIndex(self.filename, block_size=1024)
+        index.update()
+        self.assertTrue(len(index) > 10)
+        self.assertEqual(index.indexed_size, os.path.getsize(self.filename))
+        self.assertEqual(sorted(index.timestamps), index.timestamps)
+        self.assertTrue(os.path.exists(self.filename + '.idx'))
+
+    def test_query_time_range(self):
+        index = LogIndex(self.filename, block_size=1024)
+        index.update()
+        entries = list(index.query(start='2016-05-21T14:02:00-05:00', end='2016-05-21T19:02:09+00:00'))
+        self.assertEqual(10, len(entries))
+        self.assertTrue(entries[0].endswith(b'entry 120\n'))
+        self.assertTrue(entries[-1].endswith(b'entry 129\n'))
+
+    def test_query_levels(self):
+        index = LogIndex(self.filename, block_size=1024)
+        index.update()
+        entries = list(index.query(levels=[LogLevel.ERROR]))
+        self.assertEqual(6, len(entries))
+        for entry in entries:
+            self.assertEqual(2, len(entry.splitlines()))
+
+    def test_incremental_update(self):
+        index = LogIndex(self.filename, block_size=1024)
+        index.update()
+        blocks = len(index)
+        with open(self.filename, 'a') as fh:
+            for second in range(600, 700):
+                fh.write(_line(second, 'WARNING', 'late {}'.format(second)))
+            fh.write('[2016-05-21T14:11:40')  # partially written line
+        reloaded = LogIndex(self.filename, block_size=1024)
+        self.assertEqual(blocks, len(reloaded))
+        reloaded.update()
+        self.assertTrue(len(reloaded) > blocks)
+        self.assertEqual(100, len(list(reloaded.query(levels=[LogLevel.WARNING]))))
+        self.assertLess(reloaded.indexed_size, os.path.getsize(self.filename))
+
+    def test_rebuild_after_rotation(self):
+        index = LogIndex(self.filename, block_size=1024)
+        index.update()
+        with open(self.filename, 'w') as fh:
+            fh.write(_line(0, 'DEBUG', 'fresh'))
+        index.update()
+        self.assertEqual(1, len(index))
+        self.assertEqual([b'fresh\n'], [entry[-6:] for entry in index.query()])
+
+    def test_main(self):
+        with CaptureOutput() as co:
+            main([self.filename, '--level', 'ERROR', '--start', '2016-05-21T14:05:00-05:00'])
+        self.assertEqual(1, len([line for line in co.get_lines() if line.endswith('entry 500')]))
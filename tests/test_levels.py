@@ -18,3 +18,8 @@ class LogLevelTests(unittest.TestCase):
         self.assertEqual('WARNING', str(LogLevel.WARNING))
         self.assertEqual('ERROR', str(LogLevel.ERROR))
         self.assertEqual('EXCEPTION', str(LogLevel.EXCEPTION))
+
+    def test_hash(self):
+        counts = {LogLevel.DEBUG: 1, LogLevel.ERROR: 2}
+        self.assertEqual(2, counts[LogLevel.ERROR])
+        self.assertEqual(5, len(set(LogLevel)))
@@ -0,0 +1,214 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from six import StringIO as PortableStringIO
+
+from log import limits
+from log.dispatchers import ConcurrentDispatcher, DeferredDispatcher
+from log.handlers import StreamHandler
+from log.loggers import Logger
+from log.records import LogRecord
+from log.store import StoreHandler
+
+
+class LimitsTests(unittest.TestCase):
+
+    def test_truncate(self):
+        self.assertEqual('short', limits.truncate('short', 40))
+        truncated = limits.truncate('x' * 1000, 40)
+        self.assertEqual(40, len(truncated))
+        self.assertTrue(truncated.endswith('x... [truncated from 1000 characters]'))
+        self.assertEqual('ab\n', limits.fit('ab\n', 3))
+        fitted = limits.fit('y' * 100 + '\n', 50)
+        self.assertEqual(50, len(fitted))
+        self.assertTrue(fitted.endswith(']\n'))
+
+    def test_cap(self):
+        self.assertEqual(10, limits.cap(10, 20))
+        self.assertIsNone(limits.cap(None, 2))
+        obj = object()
+        self.assertIs(obj, limits.cap(obj, 64))
+        self.assertEqual('[1, 2]', limits.cap([1, 2], 20))
+        capped = limits.cap(list(range(100000)), 64)
+        self.assertLessEqual(len(capped), 64)
+        self.assertTrue(capped.startswith('[0, 1, 2, 3, 4, 5, 6, 7, ...]'))
+        self.assertLessEqual(len(limits.cap(b'z' * 100000, 64)), 64)
+        self.assertLessEqual(len(limits.cap({'k': 'v' * 100000}, 64)), 64)
+
+    def test_cap_other_objects(self):
+        class Large(object):
+            def __str__(self):
+                return 'L' * 100000
+
+        class Unprintable(object):
+            def __str__(self):
+                raise RuntimeError('no text')
+
+        capped = limits.cap(Large(), 64)
+        self.assertEqual(64, len(capped))
+        self.assertTrue(capped.endswith('[truncated from 100000 characters]'))
+        self.assertEqual('9' * 29 + '... [truncated from 100 characters]', limits.cap(int('9' * 100), 64))
+        self.assertTrue(limits.cap(Unprintable(), 64).startswith('<'))
+
+    def test_format_exception(self):
+        def recurse(depth):
+            if depth:
+                recurse(depth - 1)
+            raise ValueError('deep')
+        try:
+            recurse(300)
+        except ValueError:
+            exc_info = sys.exc_info()
+        text, complete = limits.format_exception(exc_info, 500)
+        self.assertFalse(complete)
+        self.assertTrue(text.startswith('Traceback (most recent call last):'))
+        self.assertLess(len(text), 1000)
+        text, complete = limits.format_exception(exc_info, 10 ** 6)
+        self.assertTrue(complete)
+        self.assertEqual(LogRecord('app', None, '', exc_info=exc_info).exc_text, text)
+
+
+class LoggerLimitsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.stream = PortableStringIO()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _logger(self, **kwargs):
+        return Logger(template='{message}', handlers=[StreamHandler(stream=self.stream)], **kwargs)
+
+    def test_message(self):
+        logger = self._logger(max_message_size=50)
+        logger.info('fine')
+        logger.info('m' * 10000)
+        lines = self.stream.getvalue().splitlines()
+        self.assertEqual('fine', lines[0])
+        self.assertEqual(50, len(lines[1]))
+        self.assertTrue(lines[1].endswith('[truncated from 10000 characters]'))
+
+    def test_message_objects(self):
+        logger = self._logger(max_message_size=100)
+        logger.info({'a': 'x' * 10 ** 6})
+        logger.info(b'y' * 10 ** 6)
+        logger.info(42)
+        lines = self.stream.getvalue().splitlines()
+        self.assertEqual([100, 100, 2], [len(line) for line in lines])
+        self.assertTrue(lines[0].startswith("{'a': 'xxx"))
+        self.assertEqual('42', lines[2])
+
+        spill_directory = os.path.join(self.directory, 'oversized')
+        logger = self._logger(max_message_size=100, spill_directory=spill_directory)
+        logger.info({'a': 'x' * 1000})
+        with open(os.path.join(spill_directory, os.listdir(spill_directory)[0])) as fh:
+            self.assertEqual(str({'a': 'x' * 1000}), fh.read())
+
+    def test_exception(self):
+        logger = self._logger(max_message_size=200)
+        try:
+            raise ValueError('v' * 10000)
+        except ValueError as e:
+            logger.exception(e)
+        output = self.stream.getvalue()
+        self.assertLess(len(output), 500)
+        self.assertIn('Traceback (most recent call last):', output)
+        self.assertIn('[truncated from 10', output)
+
+        logger.max_message_size = 60
+
+        def recurse(depth):
+            if depth:
+                recurse(depth - 1)
+            raise ValueError('deep')
+        try:
+            recurse(300)
+        except ValueError as e:
+            logger.exception(e)
+        self.assertTrue(self.stream.getvalue().rstrip('\n').endswith(' characters]'))
+        self.assertIn('[truncated from more than ', self.stream.getvalue())
+
+    def test_context(self):
+        logger = Logger(template='{message} {payload} {items} {count}', handlers=[StreamHandler(stream=self.stream)],
+                        max_context_size=30)
+        logger.info('sizes', payload='p' * 1000, items=list(range(1000)), count=7)
+        line = self.stream.getvalue().rstrip('\n')
+        self.assertLess(len(line), 100)
+        self.assertTrue(line.endswith(' 7'))
+
+    def test_spill(self):
+        spill_directory = os.path.join(self.directory, 'oversized')
+        logger = self._logger(max_message_size=100, spill_directory=spill_directory)
+        payload = ''.join(str(i % 10) for i in range(limits.CHUNK_SIZE * 3))
+        logger.info(payload)
+        line = self.stream.getvalue().rstrip('\n')
+        names = os.listdir(spill_directory)
+        self.assertEqual(1, len(names))
+        path = os.path.join(spill_directory, names[0])
+        self.assertTrue(line.endswith('[truncated from {} characters, see {}]'.format(len(payload), path)))
+        with open(path) as fh:
+            self.assertEqual(payload, fh.read())
+
+    def test_clone_keeps_limits(self):
+        logger = self._logger(max_message_size=60).clone()
+        logger.info('c' * 100)
+        self.assertEqual('c' * 25 + '... [truncated from 100 characters]\n', self.stream.getvalue())
+        logger.max_message_size = 10
+        logger.info('c' * 100)
+        self.assertEqual('... [truncated from 100 characters]', self.stream.getvalue().splitlines()[1])
+
+
+class HandlerMaxSizeTests(unittest.TestCase):
+
+    def test_dispatchers(self):
+        for dispatcher in (None, DeferredDispatcher(), ConcurrentDispatcher()):
+            stream, limited = PortableStringIO(), PortableStringIO()
+            handler = StreamHandler(stream=limited)
+            handler.max_size = 40
+            logger = Logger(template='{message}', handlers=[StreamHandler(stream=stream), handler],
+                            dispatcher=dispatcher)
+            logger.info('a' * 100)
+            logger.info('short')
+            logger.flush()
+            logger.close()
+            self.assertEqual(['a' * 100, 'short'], stream.getvalue().splitlines())
+            lines = limited.getvalue().splitlines(True)
+            self.assertEqual(40, len(lines[0]))
+            self.assertEqual('\n', lines[0][-1])
+            self.assertEqual('short\n', lines[1])
+
+    def test_record_handlers(self):
+        for dispatcher in (None, DeferredDispatcher(), ConcurrentDispatcher()):
+            handler = StoreHandler()
+            handler.max_size = 40
+            logger = Logger(handlers=[handler], dispatcher=dispatcher)
+            try:
+                raise ValueError('v' * 100)
+            except ValueError as e:
+                logger.exception(e)
+            logger.info('short')
+            logger.flush()
+            logger.close()
+            messages = [record[3] for record in handler.store.records()]
+            self.assertEqual(40, len(messages[0]))
+            self.assertTrue(messages[0].endswith(' characters]'))
+            self.assertEqual('short', messages[1])
+
+        record = LogRecord('app', None, 'z' * 100)
+        self.assertIs(record, limits.fit_record(record, 100))
+        fitted = limits.fit_record(record, 50)
+        self.assertEqual((50, 100), (len(fitted.text), len(record.text)))
+
+    def test_emit_batch(self):
+        stream = PortableStringIO()
+        handler = StreamHandler(stream=stream)
+        handler.max_size = 40
+        logger = Logger(template='{message}', handlers=[handler])
+        records = [LogRecord('app', None, 'b' * 100), LogRecord('app', None, 'ok')]
+        logger.dispatcher.emit_batch(records, logger.default_formatter, [handler])
+        lines = stream.getvalue().splitlines(True)
+        self.assertEqual([40, 'ok\n'], [len(lines[0]), lines[1]])
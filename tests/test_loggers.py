@@ -8,10 +8,11 @@ from capturer import CaptureOutput
 
 from log import loggers
 from log.errors import BadTemplateError, FormatterNotFoundError, ConfigurationError
-from log.formatters import Formatter
-from log.handlers import StreamHandler
+from log.formatters import Formatter, JSONFormatter
+from log.handlers import _HandlerInterface, StreamHandler
 from log.levels import LogLevel
 from log.loggers import Logger
+from log.records import LogRecord
 
 
 DEFAULT_LOG_LINE_REGEX = re.compile('\[\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}.\d{6}[\+|-]\d{2}:\d{2}\] \[[A-Z]+\] : .*')
@@ -243,6 +244,13 @@ class WithLoggerTests(unittest.TestCase):
         self.assertEqual(1, len(split_co))
         self.assertEqual(co, 'check this out: pretty neat')
 
+    def test_using_json_formatter(self):
+        self.logger.add_formatter(JSONFormatter(name='json', fields=['level', 'message']))
+        with CaptureOutput() as co:
+            with self.logger.using('json') as logger:
+                logger.info('structured', user='bond')
+        self.assertEqual('{"level":"INFO","message":"structured","user":"bond"}', co.get_text())
+
     def test_using_unknown_formatter_fails(self):
         with self.assertRaises(FormatterNotFoundError):
             with self.logger.using(Formatter(template='{barf}')) as logger:
@@ -282,6 +290,38 @@ class LoggerExtendedFeaturesTests(unittest.TestCase):
         self.assertEqual(co, ['uno message', 'dos messages'])
 
 
+class LoggerRecordHandlerTests(unittest.TestCase):
+
+    class RecordHandler(_HandlerInterface):
+        accepts_records = True
+
+        def __init__(self):
+            super(LoggerRecordHandlerTests.RecordHandler, self).__init__(None)
+            self.records = []
+
+        def write_record(self, record):
+            self.records.append(record)
+
+    def test_records_passed_to_record_handlers(self):
+        handler = self.RecordHandler()
+        logger = Logger('test-logger', handlers=[handler, StreamHandler(sys.stdout)], timezone='America/Chicago',
+                        additional_context={'metal': 'heavy'})
+        with CaptureOutput() as co:
+            logger.info('message', changeme='uno')
+        six.assertRegex(self, co.get_text(), DEFAULT_LOG_LINE_REGEX)
+        self.assertEqual(1, len(handler.records))
+        record = handler.records[0]
+        self.assertIsInstance(record, LogRecord)
+        self.assertEqual(('test-logger', LogLevel.INFO, 'message'), (record.name, record.level, record.message))
+        self.assertEqual({'metal': 'heavy', 'changeme': 'uno'}, record.context)
+
+    def test_no_formatting_without_string_handlers(self):
+        handler = self.RecordHandler()
+        logger = Logger(handlers=[handler])
+        logger.info('message')
+        self.assertIsNone(handler.records[0]._timestamp)
+
+
 class LoggerNoTimezoneSupportTests(unittest.TestCase):
 
     def test_no_timezone_support_with_timezone_init_fails(self):
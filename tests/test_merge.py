@@ -0,0 +1,48 @@
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from log.merge import main, merge_entries, merge_files
+
+
+class MergeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.chicago = os.path.join(self.tmpdir, 'chicago.log')
+        self.utc = os.path.join(self.tmpdir, 'utc.log.gz')
+        with open(self.chicago, 'wb') as fh:
+            fh.write(b'[2016-05-21T14:00:01.000000-05:00] [INFO] : chicago 1\n')
+            fh.write(b'[2016-05-21T14:00:03.000000-05:00] [EXCEPTION] : chicago 3\n')
+            fh.write(b'Traceback (most recent call last):\n')
+            fh.write(b'[2016-05-21T14:00:05.000000-05:00] [INFO] : chicago 5\n')
+        with gzip.open(self.utc, 'wb') as fh:
+            fh.write(b'[2016-05-21T19:00:00.000000+00:00] [INFO] : utc 0\n')
+            fh.write(b'[2016-05-21T19:00:03.000000+00:00] [INFO] : utc 3\n')
+            fh.write(b'[2016-05-21T19:00:04.000000+00:00] [INFO] : utc 4\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_merge_entries(self):
+        entries = list(merge_entries([self.chicago, self.utc]))
+        messages = [entry.splitlines()[0].split(b' : ')[1] for entry in entries]
+        self.assertEqual(messages, [b'utc 0', b'chicago 1', b'chicago 3', b'utc 3', b'utc 4', b'chicago 5'])
+        self.assertTrue(entries[2].endswith(b'Traceback (most recent call last):\n'))
+
+    def test_merge_file_objects(self):
+        first = io.BytesIO(b'[2016-05-21T14:00:02] [INFO] : b\n')
+        second = io.BytesIO(b'[2016-05-21T14:00:01] [INFO] : a\n[2016-05-21T14:00:03] [INFO] : c\n')
+        out = io.BytesIO()
+        self.assertEqual(3, merge_files([first, second], out))
+        self.assertEqual(out.getvalue().count(b'\n'), 3)
+        self.assertTrue(out.getvalue().startswith(b'[2016-05-21T14:00:01]'))
+
+    def test_main(self):
+        output = os.path.join(self.tmpdir, 'merged.log')
+        main([self.chicago, self.utc, '-o', output])
+        with open(output, 'rb') as fh:
+            self.assertEqual(7, len(fh.readlines()))
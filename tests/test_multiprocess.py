@@ -0,0 +1,192 @@
+import marshal
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import time
+import unittest
+
+import six
+
+from log.handlers import _HandlerInterface
+from log.levels import LogLevel
+from log.loggers import Logger
+from log.multiprocess import CollectorHandler, LogCollector
+from log.records import LogRecord
+from log.store import StoreHandler
+
+
+class ListHandler(_HandlerInterface):
+
+    def __init__(self):
+        super(ListHandler, self).__init__(None)
+        self.writes = []
+
+    def write(self, message):
+        self.writes.append(message)
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def _work(address, worker, count):
+    logger = Logger(name='worker{}'.format(worker), handlers=[CollectorHandler(address, batch_size=16)])
+    for i in range(count):
+        logger.info('entry {} from worker {}'.format(i, worker), worker=worker)
+    logger.error('done')
+
+
+class LogCollectorTests(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = ListHandler()
+        self.store_handler = StoreHandler()
+        self.logger = Logger(template='{name} {level} {message}', handlers=[self.handler, self.store_handler])
+        self.collector = LogCollector(self.logger)
+
+    def tearDown(self):
+        self.collector.close()
+
+    def test_collects_from_processes(self):
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=_work, args=(self.collector.address, worker, 100)) for worker in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(0, process.exitcode)
+        _wait_for(lambda: self.collector.received == 303)
+        self.assertEqual(303, self.collector.received)
+
+        lines = ''.join(self.handler.writes).splitlines()
+        self.assertEqual(303, len(lines))
+        for worker in range(3):
+            own = [line for line in lines if line.startswith('worker{} '.format(worker))]
+            expected = ['worker{} INFO entry {} from worker {}'.format(worker, i, worker) for i in range(100)]
+            self.assertEqual(expected + ['worker{} ERROR done'.format(worker)], own)
+        self.assertLess(len(self.handler.writes), 303)
+        self.assertEqual({LogLevel.INFO: 300, LogLevel.ERROR: 3}, self.store_handler.store.count_by('level'))
+
+    def test_flush_interval(self):
+        handler = CollectorHandler(self.collector.address, batch_size=1000, flush_interval=0.01)
+        logger = Logger(template='{message}', handlers=[handler])
+        logger.warning('soon')
+        _wait_for(lambda: self.collector.received == 1)
+        self.assertEqual(['log.loggers WARNING soon\n'], self.handler.writes)
+        logger.close()
+        _wait_for(lambda: self.collector.connections == 0)
+        self.assertEqual(0, self.collector.connections)
+
+    def test_exception_and_context(self):
+        handler = CollectorHandler(self.collector.address)
+        logger = Logger(name='app', handlers=[handler])
+        try:
+            1 / 0
+        except ZeroDivisionError as e:
+            logger.exception(e)
+        logger.info('{user}', user=object)
+        handler.flush()
+        _wait_for(lambda: self.collector.received == 2)
+        lines = ''.join(self.handler.writes)
+        self.assertTrue(lines.startswith('app EXCEPTION division by zero\n'))
+        self.assertIn('ZeroDivisionError', lines)
+        self.assertTrue(lines.endswith("app INFO {user}\n"))
+        handler.close()
+
+    def test_message_objects(self):
+        handler = CollectorHandler(self.collector.address, batch_size=1000, flush_interval=0.01)
+        logger = Logger(name='app', template='{message}', handlers=[handler])
+        logger.error(ValueError('boom'))
+        logger.info(['a', 1])
+        _wait_for(lambda: self.collector.received == 2)
+        self.assertEqual(['app ERROR boom\n', "app INFO ['a', 1]\n"],
+                         ''.join(self.handler.writes).splitlines(True))
+
+        stderr, sys.stderr = sys.stderr, six.StringIO()
+        try:
+            with handler._lock:
+                handler._batch.append((object(),))
+            _wait_for(lambda: handler.dropped == 1)
+        finally:
+            stderr, sys.stderr = sys.stderr, stderr
+        self.assertIn('CollectorHandler: failed to write log entries: ValueError', stderr.getvalue())
+        logger.info('after')
+        _wait_for(lambda: self.collector.received == 3)
+        self.assertEqual('app INFO after\n', self.handler.writes[-1])
+        handler.close()
+
+    def test_partial_frame_dropped(self):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(self.collector.address)
+        connection.sendall(b'\xff\x00\x00\x00partial')
+        _wait_for(lambda: self.collector.connections == 1)
+        connection.close()
+        _wait_for(lambda: self.collector.connections == 0)
+        self.assertEqual(0, self.collector.connections)
+        self.assertEqual(0, self.collector.received)
+
+    def test_malformed_frames_skipped(self):
+        def frame(payload):
+            return struct.pack('<I', len(payload)) + payload
+
+        record = LogRecord('worker', LogLevel.INFO, 'after the bad frames')
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(self.collector.address)
+        stderr, sys.stderr = sys.stderr, six.StringIO()
+        try:
+            frames = [frame(b'\x00garbage'), frame(marshal.dumps([('too', 'short')])),
+                      frame(marshal.dumps([record.to_tuple()]))]
+            connection.sendall(b''.join(frames))
+            _wait_for(lambda: self.collector.received == 1)
+        finally:
+            stderr, sys.stderr = sys.stderr, stderr
+        connection.close()
+        self.assertEqual(2, self.collector.malformed)
+        self.assertEqual(2, stderr.getvalue().count('LogCollector: skipped a malformed frame of '))
+        self.assertEqual(['worker INFO after the bad frames\n'], self.handler.writes)
+
+    def test_close(self):
+        address = self.collector.address
+        self.collector.close()
+        self.collector.close()
+        self.assertFalse(os.path.exists(address))
+
+    def test_tcp(self):
+        collector = LogCollector(self.logger, address=('127.0.0.1', 0))
+        handler = CollectorHandler(collector.address)
+        Logger(name='app', handlers=[handler]).info('over tcp')
+        handler.close()
+        _wait_for(lambda: collector.received == 1)
+        collector.close()
+        self.assertEqual(['app INFO over tcp\n'], self.handler.writes)
+
+
+class CollectorHandlerTests(unittest.TestCase):
+
+    def test_dropped_when_collector_missing(self):
+        handler = CollectorHandler('/nonexistent/collector.sock', batch_size=2)
+        logger = Logger(handlers=[handler])
+        logger.info('one')
+        logger.info('two')
+        self.assertEqual(2, handler.dropped)
+        handler.close()
+
+    def test_new_connection_after_fork(self):
+        handler = ListHandler()
+        collector = LogCollector(Logger(template='{name} {level} {message}', handlers=[handler]))
+        collector_handler = CollectorHandler(collector.address, batch_size=1000)
+        logger = Logger(name='app', handlers=[collector_handler])
+        logger.info('from parent, pending')
+
+        context = multiprocessing.get_context('fork')
+        process = context.Process(target=logger.info, args=('from child',))
+        process.start()
+        process.join()
+        _wait_for(lambda: collector.received == 2)
+        collector_handler.close()
+        collector.close()
+        self.assertEqual(['app INFO from parent, pending\n', 'app INFO from child\n'], handler.writes)
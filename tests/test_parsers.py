@@ -0,0 +1,43 @@
+import io
+import unittest
+
+from log.levels import LogLevel
+from log.parsers import EntryParser, iter_entries, parse_timestamp, to_nanoseconds
+
+
+class ParseTimestampTests(unittest.TestCase):
+
+    def test_offsets(self):
+        utc = parse_timestamp('2016-05-21T19:44:31.408652+00:00')
+        self.assertEqual(utc, 1463859871408652000)
+        self.assertEqual(parse_timestamp('2016-05-21T14:44:31.408652-05:00'), utc)
+        self.assertEqual(parse_timestamp(b'2016-05-21T19:44:31.408652Z'), utc)
+
+    def test_naive(self):
+        self.assertEqual(parse_timestamp('2016-05-21T19:44:31', naive_utcoffset=0), 1463859871000000000)
+        self.assertEqual(parse_timestamp('2016-05-21T21:44:31', naive_utcoffset=7200), 1463859871000000000)
+
+    def test_garbage(self):
+        self.assertIsNone(parse_timestamp('yesterday'))
+        with self.assertRaises(ValueError):
+            to_nanoseconds('yesterday')
+
+
+class IterEntriesTests(unittest.TestCase):
+
+    def test_continuation_lines(self):
+        contents = (
+            b'orphan\n'
+            b'[2016-05-21T14:44:31.408652-05:00] [INFO] : first\n'
+            b'[2016-05-21T14:44:32.408652-05:00] [EXCEPTION] : boom\n'
+            b'Traceback (most recent call last):\n'
+            b'ZeroDivisionError: division by zero\n'
+        )
+        entries = list(iter_entries(io.BytesIO(contents), EntryParser()))
+        self.assertEqual(2, len(entries))
+        prefix, raw = entries[0]
+        self.assertEqual(LogLevel.INFO, prefix.level)
+        self.assertEqual(b'first\n', raw[prefix.end:])
+        prefix, raw = entries[1]
+        self.assertEqual(LogLevel.EXCEPTION, prefix.level)
+        self.assertEqual(3, len(raw.splitlines()))
@@ -0,0 +1,117 @@
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from six import StringIO as PortableStringIO
+
+from log.handlers import FileHandler, ThreadBufferedHandler
+from log.loggers import Logger
+from log.pool import HandlerPool
+
+
+class HandlerPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'app.log')
+        self.pool = HandlerPool()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_shared_file(self):
+        first = self.pool.file(self.filename)
+        second = self.pool.file(os.path.join(self.directory, '.', 'app.log'))
+        self.assertIs(first, second)
+        self.assertIsInstance(first, FileHandler)
+        self.assertEqual(1, len(self.pool))
+        self.assertEqual(2, self.pool.references(first))
+
+        api = Logger(name='api', template='{name} {message}', handlers=[first])
+        db = Logger(name='db', template='{name} {message}', handlers=[second])
+        api.info('one')
+        db.info('two')
+        api.close()
+        self.assertFalse(first.fh.closed)
+        db.info('three')
+        db.close()
+        self.assertTrue(first.fh.closed)
+        self.assertEqual(0, len(self.pool))
+        with open(self.filename) as fh:
+            self.assertEqual(['api one', 'db two', 'db three'], fh.read().splitlines())
+
+        self.assertIsNot(first, self.pool.file(self.filename))
+
+    def test_close_releases_once(self):
+        handler = self.pool.file(self.filename)
+        api = Logger(name='api', template='{name} {message}', handlers=[handler])
+        db = Logger(name='db', template='{name} {message}', handlers=[self.pool.file(self.filename)])
+        api.close()
+        api.close()
+        self.assertEqual(1, self.pool.references(handler))
+        db.info('still open')
+
+        clone = db.clone()
+        clone.info('from the clone')
+        clone.close()
+        db.only(handler.name).close()
+        self.assertEqual(1, self.pool.references(handler))
+        db.info('still open')
+        db.close()
+        self.assertTrue(handler.fh.closed)
+        with open(self.filename) as fh:
+            self.assertEqual(['db still open', 'db from the clone', 'db still open'], fh.read().splitlines())
+
+    def test_same_handler_twice_and_removed(self):
+        handler = self.pool.file(self.filename)
+        logger = Logger(handlers=[handler, self.pool.file(self.filename)])
+        self.assertEqual(2, self.pool.references(handler))
+        logger.close()
+        self.assertEqual(0, self.pool.references(handler))
+        self.assertTrue(handler.fh.closed)
+
+        shared = self.pool.file(self.filename)
+        kept = Logger(template='{message}', handlers=[shared])
+        other = Logger(handlers=[self.pool.file(self.filename)])
+        other.add_handler(self.pool.stream(PortableStringIO()))
+        other.remove_handler(shared)
+        self.assertEqual(1, self.pool.references(shared))
+        kept.info('still open')
+        other.close()
+        self.assertEqual(1, self.pool.references(shared))
+        kept.close()
+        self.assertTrue(shared.fh.closed)
+        self.assertEqual(0, len(self.pool))
+
+    def test_stream_and_socket(self):
+        stream = PortableStringIO()
+        self.assertIs(self.pool.stream(stream), self.pool.stream(stream))
+        self.assertIsNot(self.pool.stream(stream), self.pool.stream(PortableStringIO()))
+
+        address = os.path.join(self.directory, 'log.sock')
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(address)
+        server.listen(1)
+        handler = self.pool.socket(address)
+        self.assertIs(handler, self.pool.socket(address))
+        Logger(template='{message}', handlers=[handler]).info('shared')
+        connection, _ = server.accept()
+        self.assertEqual(b'shared\n', connection.recv(100))
+        self.pool.release(handler)
+        self.pool.release(handler)
+        self.assertEqual(b'', connection.recv(100))
+        connection.close()
+        server.close()
+
+    def test_acquire(self):
+        def buffered():
+            return ThreadBufferedHandler(FileHandler(self.filename), flush_interval=60)
+        handler = self.pool.acquire(('buffered', self.filename), buffered)
+        self.assertIs(handler, self.pool.acquire(('buffered', self.filename), buffered))
+        self.pool.release(handler)
+        self.pool.release(handler)
+        self.pool.release(handler)
+        self.assertTrue(handler.handler.fh.closed)
+        self.assertIsNone(handler.pool)
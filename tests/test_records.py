@@ -0,0 +1,64 @@
+import marshal
+import sys
+import unittest
+
+from log.levels import LogLevel
+from log.records import LogRecord
+
+
+class LogRecordTests(unittest.TestCase):
+
+    def test_slots(self):
+        record = LogRecord('app', LogLevel.INFO, 'ohaiii')
+        self.assertFalse(hasattr(record, '__dict__'))
+        with self.assertRaises(AttributeError):
+            record.whatever = True
+
+    def test_timestamp(self):
+        record = LogRecord('app', LogLevel.INFO, 'ohaiii', created=1463859871408652999, timezone='America/Chicago')
+        self.assertEqual('2016-05-21T14:44:31.408652-05:00', record.timestamp)
+
+    def test_text_with_exception(self):
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            record = LogRecord('app', LogLevel.EXCEPTION, 'boom', exc_info=sys.exc_info())
+        lines = record.text.splitlines()
+        self.assertEqual('boom', lines[0])
+        self.assertEqual('ZeroDivisionError: division by zero', lines[-1])
+
+    def test_to_params(self):
+        record = LogRecord('app', LogLevel.WARNING, 'ohaiii', context={'user': 'bond'})
+        params = record.to_params(frozenset(['message']))
+        self.assertEqual({'message': 'ohaiii', 'level': LogLevel.WARNING, 'name': 'app', 'user': 'bond'}, params)
+        self.assertIsNone(record._timestamp)
+        record.set_call_site('app.py', 7, 'main', 42)
+        params = record.to_params()
+        self.assertEqual(('app.py', 7, 'main', 42), (params['src'], params['line'], params['func'], params['proc']))
+        self.assertIn('timestamp', params)
+
+    def test_to_tuple_round_trip(self):
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            record = LogRecord('app', LogLevel.EXCEPTION, 'boom', timezone='UTC', exc_info=sys.exc_info(),
+                               context={'user': 'bond', 'when': LogLevel.INFO, 'count': 3})
+        record.set_call_site('app.py', 7, 'main', 42)
+        values = record.to_tuple()
+        copy = LogRecord.from_tuple(values)
+        self.assertEqual((record.name, record.level, record.message, record.created, record.timezone),
+                         (copy.name, copy.level, copy.message, copy.created, copy.timezone))
+        self.assertEqual(('app.py', 7, 'main', 42), (copy.src, copy.line, copy.func, copy.proc))
+        self.assertEqual(record.text, copy.text)
+        self.assertEqual({'user': 'bond', 'when': 'INFO', 'count': 3}, copy.context)
+
+    def test_to_tuple_portable_message(self):
+        class Unprintable(object):
+            def __str__(self):
+                raise RuntimeError('no text')
+
+        values = LogRecord(LogLevel.INFO, LogLevel.ERROR, ValueError('boom'), context={'x': Unprintable()}).to_tuple()
+        marshal.dumps(values)
+        copy = LogRecord.from_tuple(values)
+        self.assertEqual(('INFO', 'boom'), (copy.name, copy.message))
+        self.assertTrue(copy.context['x'].startswith('<'))
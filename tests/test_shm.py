@@ -0,0 +1,161 @@
+import multiprocessing
+import sys
+import time
+import unittest
+
+import six
+
+from log.errors import ConfigurationError
+from log.handlers import _HandlerInterface
+from log.levels import LogLevel
+from log.loggers import Logger
+from log.shm import RingBuffer, RingCollector, RingHandler
+from log.store import StoreHandler
+
+
+class ListHandler(_HandlerInterface):
+
+    def __init__(self):
+        super(ListHandler, self).__init__(None)
+        self.writes = []
+
+    def write(self, message):
+        self.writes.append(message)
+
+
+def _work(ring_name, worker, count):
+    handler = RingHandler(ring_name)
+    logger = Logger(name='worker{}'.format(worker), handlers=[handler])
+    for i in range(count):
+        logger.info('entry {}'.format(i))
+    handler.close()
+
+
+class RingBufferTests(unittest.TestCase):
+
+    def setUp(self):
+        self.ring = RingBuffer(size=64)
+
+    def tearDown(self):
+        self.ring.close()
+
+    def test_put_get(self):
+        self.assertEqual([], self.ring.get())
+        self.assertTrue(self.ring.put(b'one'))
+        self.assertTrue(self.ring.put(b'two'))
+        self.assertEqual([b'one', b'two'], self.ring.get())
+        self.assertEqual([], self.ring.get())
+
+    def test_wraps(self):
+        entries = [str(i).encode() * (i % 5 + 1) for i in range(200)]
+        received = []
+        for i, entry in enumerate(entries):
+            self.assertTrue(self.ring.put(entry))
+            if i % 2:
+                received.extend(self.ring.get())
+        received.extend(self.ring.get())
+        self.assertEqual(entries, received)
+        self.assertEqual(0, self.ring.overflows)
+
+    def test_overflow(self):
+        self.assertTrue(self.ring.put(b'x' * 40))
+        self.assertFalse(self.ring.put(b'x' * 40))
+        self.assertFalse(self.ring.put(b'x' * 100))
+        self.assertEqual(2, self.ring.overflows)
+        self.assertEqual([b'x' * 40], self.ring.get())
+        self.assertTrue(self.ring.put(b'x' * 40))
+
+    def test_open_by_name(self):
+        other = RingBuffer(self.ring.name)
+        self.assertFalse(other.owner)
+        self.assertEqual(64, other.capacity)
+        other.put(b'from the other side')
+        other.close()
+        self.assertEqual([b'from the other side'], self.ring.get())
+
+    def test_too_small(self):
+        with self.assertRaises(ConfigurationError):
+            RingBuffer(size=4)
+
+
+class RingCollectorTests(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = ListHandler()
+        self.store_handler = StoreHandler()
+        self.logger = Logger(name='collector', template='{name} {level} {message}',
+                             handlers=[self.handler, self.store_handler])
+        self.collector = RingCollector(self.logger)
+
+    def tearDown(self):
+        self.collector.close()
+
+    def test_collects_from_processes(self):
+        context = multiprocessing.get_context('fork')
+        rings = [self.collector.create_ring(size=1 << 16) for _ in range(2)]
+        processes = [context.Process(target=_work, args=(ring.name, worker, 500)) for worker, ring in enumerate(rings)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(0, process.exitcode)
+        self.collector.close()
+
+        lines = ''.join(self.handler.writes).splitlines()
+        received = 1000 - self.collector.overflows
+        self.assertEqual(received, self.collector.received)
+        for worker in range(2):
+            own = [line for line in lines if line.startswith('worker{} '.format(worker))]
+            numbers = [int(line.rsplit(' ', 1)[1]) for line in own]
+            self.assertEqual(sorted(numbers), numbers)
+        self.assertEqual(received, self.store_handler.store.count_by('level')[LogLevel.INFO])
+
+    def test_reports_overflows(self):
+        ring = self.collector.create_ring(size=256)
+        logger = Logger(name='app', handlers=[RingHandler(ring)])
+        self.collector._stop.set()
+        self.collector._thread.join()
+        for i in range(50):
+            logger.info('entry {}'.format(i))
+        self.assertGreater(ring.overflows, 0)
+        self.collector._stop.clear()
+        self.collector.close()
+        self.assertEqual(50, self.collector.received + ring.overflows)
+        self.assertEqual('collector WARNING dropped {} log entries because a shared memory ring was full\n'.format(
+            ring.overflows), self.handler.writes[-1])
+
+    def test_close_drains(self):
+        ring = self.collector.create_ring()
+        handler = RingHandler(ring.name)
+        logger = Logger(name='app', handlers=[handler])
+        logger.error('last words')
+        handler.close()
+        self.collector.close()
+        self.assertEqual('app ERROR last words\n', ''.join(self.handler.writes))
+        logger.error('after close')
+
+    def test_polls(self):
+        ring = self.collector.create_ring()
+        Logger(name='app', handlers=[RingHandler(ring)]).info('polled')
+        deadline = time.time() + 5
+        while not self.handler.writes and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(['app INFO polled\n'], self.handler.writes)
+
+    def test_message_objects_and_malformed_entries(self):
+        ring = self.collector.create_ring()
+        logger = Logger(name='app', template='{message}', handlers=[RingHandler(ring)])
+        self.collector._stop.set()
+        self.collector._thread.join()
+        logger.error(ValueError('boom'))
+        ring.put(b'\x00garbage')
+        logger.info('after')
+        stderr, sys.stderr = sys.stderr, six.StringIO()
+        try:
+            self.collector._stop.clear()
+            self.collector.close()
+        finally:
+            stderr, sys.stderr = sys.stderr, stderr
+        self.assertEqual(['app ERROR boom\n', 'app INFO after\n'], self.handler.writes[0].splitlines(True))
+        self.assertEqual((2, 1), (self.collector.received, self.collector.malformed))
+        self.assertIn('RingCollector: skipped a malformed entry of 8 bytes', stderr.getvalue())
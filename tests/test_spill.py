@@ -0,0 +1,184 @@
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from six import StringIO as PortableStringIO
+
+from log.loggers import Logger
+from log.spill import SpillingSocketHandler
+
+
+class PausableServer(object):
+
+    def __init__(self, address):
+        self.address = address
+        self.data = bytearray()
+        self._listener = None
+
+    def start(self):
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.address)
+        self._listener.listen(5)
+        self._connections = []
+        self._thread = threading.Thread(target=self._accept, args=(self._listener,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        listener, self._listener = self._listener, None
+        listener.shutdown(socket.SHUT_RDWR)
+        listener.close()
+        self._thread.join()
+        for connection in self._connections:
+            connection.shutdown(socket.SHUT_RDWR)
+        for thread in self._readers:
+            thread.join()
+        os.unlink(self.address)
+
+    def lines(self):
+        return self.data.decode('utf8').splitlines()
+
+    def _accept(self, listener):
+        self._readers = []
+        while True:
+            try:
+                connection, _ = listener.accept()
+            except (OSError, socket.error):
+                return
+            self._connections.append(connection)
+            reader = threading.Thread(target=self._read, args=(connection,))
+            reader.daemon = True
+            reader.start()
+            self._readers.append(reader)
+
+    def _read(self, connection):
+        while True:
+            data = connection.recv(65536)
+            if not data:
+                break
+            self.data += data
+        connection.close()
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class SpillingSocketHandlerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.spill_directory = os.path.join(self.directory, 'spill')
+        self.server = PausableServer(os.path.join(self.directory, 'collector.sock'))
+        stderr, sys.stderr = sys.stderr, PortableStringIO()
+        self.addCleanup(setattr, sys, 'stderr', stderr)
+
+    def tearDown(self):
+        if self.server._listener is not None:
+            self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def _handler(self, **kwargs):
+        kwargs.setdefault('flush_interval', 0.01)
+        kwargs.setdefault('retry_interval', 0.05)
+        handler = SpillingSocketHandler(self.server.address, self.spill_directory, **kwargs)
+        self.addCleanup(handler.close)
+        return handler, Logger(template='{message}', handlers=[handler])
+
+    def _log(self, logger, numbers):
+        for i in numbers:
+            logger.info(str(i))
+
+    def test_delivers_in_order(self):
+        self.server.start()
+        handler, logger = self._handler(batch_size=64)
+        self._log(logger, range(100))
+        handler.flush()
+        _wait_for(lambda: len(self.server.lines()) == 100)
+        self.assertEqual([str(i) for i in range(100)], self.server.lines())
+        metrics = handler.metrics()
+        self.assertTrue(metrics['connected'])
+        self.assertEqual(0, metrics['spill_bytes'])
+        self.assertEqual(0, metrics['spilled_bytes'])
+        self.assertEqual(len(self.server.data), metrics['sent_bytes'])
+
+    def test_spills_while_down_and_replays(self):
+        handler, logger = self._handler(batch_size=30, segment_size=100)
+        self._log(logger, range(100))
+        handler.flush()
+        _wait_for(lambda: handler.metrics()['spill_bytes'] == 290)
+        metrics = handler.metrics()
+        self.assertFalse(metrics['connected'])
+        self.assertEqual(290, metrics['spill_bytes'])
+        self.assertGreater(metrics['spill_segments'], 1)
+        self.assertGreater(metrics['replay_lag'], 0)
+        self.assertEqual(0, metrics['memory_bytes'])
+
+        self.server.start()
+        self._log(logger, range(100, 110))
+        _wait_for(lambda: len(self.server.lines()) == 110)
+        self.assertEqual([str(i) for i in range(110)], self.server.lines())
+        metrics = handler.metrics()
+        self.assertEqual(0, metrics['spill_segments'])
+        self.assertEqual(0.0, metrics['replay_lag'])
+        self.assertEqual([], os.listdir(self.spill_directory))
+
+    def test_outage(self):
+        self.server.start()
+        handler, logger = self._handler()
+        self._log(logger, range(50))
+        handler.flush()
+        _wait_for(lambda: len(self.server.lines()) == 50)
+        self.server.stop()
+
+        self._log(logger, range(50, 100))
+        handler.flush()
+        _wait_for(lambda: not handler.metrics()['connected'])
+        self.server.start()
+        self._log(logger, range(100, 150))
+        _wait_for(lambda: len(self.server.lines()) >= 150)
+        self.assertEqual([str(i) for i in range(150)], self.server.lines())
+        self.assertEqual(2, handler.metrics()['connects'])
+
+    def test_bounded_spill(self):
+        handler, logger = self._handler(batch_size=50, segment_size=100, max_spill_bytes=300, max_memory_bytes=0)
+        self._log(logger, range(1000, 1200))
+        handler.flush()
+        metrics = handler.metrics()
+        self.assertLessEqual(metrics['spill_bytes'], 400)
+        self.assertEqual(1000, metrics['spill_bytes'] + metrics['dropped_bytes'])
+
+        self.server.start()
+        _wait_for(lambda: handler.metrics()['spill_segments'] == 0 and self.server.lines()[-1:] == ['1199'])
+        lines = self.server.lines()
+        self.assertEqual([str(i) for i in range(1200 - len(lines), 1200)], lines)
+
+    def test_replayed_by_next_handler(self):
+        handler, logger = self._handler()
+        self._log(logger, range(10))
+        handler.close()
+        self.assertEqual(20, sum(os.path.getsize(os.path.join(self.spill_directory, name))
+                                 for name in os.listdir(self.spill_directory)))
+
+        self.server.start()
+        handler, logger = self._handler()
+        self._log(logger, range(10, 20))
+        _wait_for(lambda: len(self.server.lines()) == 20)
+        self.assertEqual([str(i) for i in range(20)], self.server.lines())
+
+    def test_backpressure(self):
+        handler, logger = self._handler(max_backlog=10, block_timeout=0.1)
+        self._log(logger, range(6))
+        start = time.time()
+        logger.info('waits')
+        self.assertGreaterEqual(time.time() - start, 0.1)
+        self.server.start()
+        _wait_for(lambda: len(self.server.lines()) == 7)
+        self.assertEqual(['0', '1', '2', '3', '4', '5', 'waits'], self.server.lines())
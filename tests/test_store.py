@@ -0,0 +1,102 @@
+import io
+import unittest
+
+from log import store
+from log.levels import LogLevel
+from log.loggers import Logger
+from log.store import RecordStore, StoreHandler
+
+
+LOG_FILE = (
+    b'[2016-05-21T14:00:00.000000-05:00] [INFO] : zero\n'
+    b'[2016-05-21T14:00:01.000000-05:00] [DEBUG] : one\n'
+    b'[2016-05-21T14:00:02.000000-05:00] [ERROR] : two\n'
+    b'[2016-05-21T14:00:03.000000-05:00] [EXCEPTION] : three\n'
+    b'Traceback (most recent call last):\n'
+    b'[2016-05-21T14:00:04.000000-05:00] [INFO] : f\xc3\xbcnf\n'
+)
+
+
+class RecordStoreTests(object):
+
+    def setUp(self):
+        self.store = RecordStore()
+        self.store.load(io.BytesIO(LOG_FILE))
+
+    def test_load(self):
+        self.assertEqual(5, len(self.store))
+        self.assertEqual('three\nTraceback (most recent call last):', self.store.message(3))
+        self.assertEqual(u'f\xfcnf', self.store.message(4))
+        timestamp, level, name, message = self.store.record(0)
+        self.assertEqual((1463857200000000000, LogLevel.INFO, '', 'zero'), (timestamp, level, name, message))
+
+    def test_select(self):
+        rows = self.store.select(start='2016-05-21T14:00:01-05:00', end='2016-05-21T19:00:03+00:00')
+        self.assertEqual([1, 2, 3], list(rows))
+        rows = self.store.select(levels=[LogLevel.INFO, LogLevel.ERROR])
+        self.assertEqual([0, 2, 4], list(rows))
+        rows = self.store.select(start='2016-05-21T14:00:01-05:00', levels=[LogLevel.INFO])
+        self.assertEqual(['f\xfcnf'], [record[3] for record in self.store.records(rows)])
+
+    def test_select_names(self):
+        self.store.append(0, LogLevel.WARNING, 'db', 'slow query')
+        self.store.append(1, LogLevel.WARNING, 'web', 'slow request')
+        self.assertEqual([5], list(self.store.select(names=['db'])))
+        self.assertEqual([], list(self.store.select(names=['nope'])))
+
+    def test_count_by(self):
+        self.store.append(0, LogLevel.INFO, 'db', 'connected')
+        self.assertEqual({LogLevel.INFO: 3, LogLevel.DEBUG: 1, LogLevel.ERROR: 1, LogLevel.EXCEPTION: 1},
+                         self.store.count_by('level'))
+        self.assertEqual({'': 5, 'db': 1}, self.store.count_by('name'))
+        rows = self.store.select(levels=[LogLevel.INFO])
+        self.assertEqual({('', LogLevel.INFO): 2, ('db', LogLevel.INFO): 1},
+                         self.store.count_by(('name', 'level'), rows))
+        with self.assertRaises(ValueError):
+            self.store.count_by('message')
+
+    def test_max_records(self):
+        bounded = RecordStore(max_records=4)
+        for i in range(20):
+            bounded.append(i, LogLevel.INFO, 'name', 'message {}'.format(i))
+        self.assertTrue(4 <= len(bounded) <= 5)
+        self.assertEqual('message 19', bounded.message(len(bounded) - 1))
+        self.assertEqual(list(bounded.timestamps), list(range(20 - len(bounded), 20)))
+
+    def test_clear(self):
+        self.store.clear()
+        self.assertEqual(0, len(self.store))
+        self.assertEqual([], list(self.store.select(levels=[LogLevel.INFO])))
+
+
+class RecordStoreNumpyTests(RecordStoreTests, unittest.TestCase):
+    pass
+
+
+class RecordStorePythonTests(RecordStoreTests, unittest.TestCase):
+
+    def setUp(self):
+        self._numpy_available = store._numpy_available
+        store._numpy_available = False
+        super(RecordStorePythonTests, self).setUp()
+
+    def tearDown(self):
+        store._numpy_available = self._numpy_available
+
+
+class StoreHandlerTests(unittest.TestCase):
+
+    def test_write(self):
+        handler = StoreHandler()
+        handler.write('[2016-05-21T14:00:00.000000-05:00] [INFO] : parsed\n')
+        self.assertEqual((1463857200000000000, LogLevel.INFO, '', 'parsed'), handler.store.record(0))
+
+    def test_write_record(self):
+        handler = StoreHandler()
+        logger = Logger('app', handlers=[handler], level=LogLevel.DEBUG)
+        logger.debug('ohaiii')
+        logger.warning('watch out')
+        self.assertEqual(2, len(handler.store))
+        self.assertEqual([LogLevel.DEBUG, LogLevel.WARNING], [record[1] for record in handler.store.records()])
+        self.assertEqual(['app'], handler.store.names)
+        self.assertEqual('watch out', handler.store.message(1))
@@ -0,0 +1,147 @@
+import importlib
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from six import StringIO as PortableStringIO
+
+from log import strip
+from log.handlers import StreamHandler
+from log.levels import LogLevel
+from log.loggers import Logger
+
+
+MODULE = textwrap.dedent('''
+    calls = []
+
+
+    def expensive(name):
+        calls.append(name)
+        return name
+
+
+    class Service(object):
+
+        def __init__(self, logger):
+            self.logger = logger
+
+        def run(self):
+            self.logger.debug(expensive('debug'))
+            self.logger.info(expensive('info'))
+            self.logger.warning(expensive('warning'))
+            self.logger.error(expensive('error'))
+            if True:
+                self.logger.debug(expensive('nested'))
+            value = self.logger.debug(expensive('expression'))
+            return value
+
+
+    def run(logger):
+        logger.debug(expensive('debug'))
+        logger.info(expensive('info'))
+        other = Service(None)
+        other.info = expensive
+        other.info('unrelated')
+''')
+
+
+class StripTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        package = os.path.join(self.directory, 'stripdemo')
+        os.mkdir(package)
+        open(os.path.join(package, '__init__.py'), 'w').close()
+        with open(os.path.join(package, 'service.py'), 'w') as fh:
+            fh.write(MODULE)
+        sys.path.insert(0, self.directory)
+        self.addCleanup(sys.path.remove, self.directory)
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(self._forget)
+        self.stream = PortableStringIO()
+        self.logger = Logger(template='{message}', handlers=[StreamHandler(stream=self.stream)])
+
+    def _forget(self):
+        for name in ('stripdemo', 'stripdemo.service'):
+            sys.modules.pop(name, None)
+
+    def _import(self, **kwargs):
+        finder = strip.install(['stripdemo'], **kwargs)
+        self.addCleanup(finder.uninstall)
+        self._forget()
+        return importlib.import_module('stripdemo.service')
+
+    def test_strips_and_guards(self):
+        service = self._import(level=LogLevel.INFO)
+        self.assertIsInstance(service.__loader__, strip.StrippingLoader)
+        service.Service(self.logger).run()
+        self.assertEqual(['info', 'warning', 'error', 'expression'], service.calls)
+        self.assertEqual(['info', 'warning', 'error'], self.stream.getvalue().splitlines())
+
+        del service.calls[:]
+        self.logger.level = LogLevel.ERROR
+        service.run(self.logger)
+        self.assertEqual(['unrelated'], service.calls)
+
+    def test_without_guard(self):
+        service = self._import(level=LogLevel.WARNING, guard=False)
+        self.logger.level = LogLevel.ERROR
+        service.Service(self.logger).run()
+        self.assertEqual(['warning', 'error', 'expression'], service.calls)
+
+    def test_bytecode_cache(self):
+        self.addCleanup(setattr, sys, 'dont_write_bytecode', sys.dont_write_bytecode)
+        sys.dont_write_bytecode = False
+        self._import(level=LogLevel.INFO)
+        cached = [name for name in os.listdir(os.path.join(self.directory, 'stripdemo', '__pycache__'))
+                  if name.startswith('service.')]
+        self.assertEqual(1, len(cached))
+        self.assertRegex(cached[0], r'\.opt-logstripinfoguard[0-9a-f]{8}\.pyc$')
+
+        def fail(*args, **kwargs):
+            raise AssertionError('compiled again')
+        original, strip.StrippingLoader.source_to_code = strip.StrippingLoader.source_to_code, fail
+        try:
+            service = self._import(level=LogLevel.INFO)
+        finally:
+            strip.StrippingLoader.source_to_code = original
+        service.run(self.logger)
+        self.assertEqual(['info', 'unrelated'], service.calls)
+
+    def test_names_in_cache_tag(self):
+        default = strip.StrippingLoader('app', 'app.py')
+        self.assertEqual(default.tag, strip.StrippingLoader('app', 'app.py', names=('logger', 'log')).tag)
+        self.assertNotEqual(default.tag, strip.StrippingLoader('app', 'app.py', names=('log',)).tag)
+
+    def test_standard_library_loggers(self):
+        service = self._import(level=LogLevel.INFO)
+        records = []
+        stdlib = logging.getLogger('stripdemo.test')
+        stdlib.propagate = False
+        stdlib.setLevel(logging.INFO)
+        handler = logging.Handler()
+        handler.emit = records.append
+        stdlib.addHandler(handler)
+        self.addCleanup(stdlib.removeHandler, handler)
+        service.run(stdlib)
+        self.assertEqual(['info', 'unrelated'], service.calls)
+        self.assertEqual(['info'], [record.getMessage() for record in records])
+
+    def test_other_modules_untouched(self):
+        strip.install(['elsewhere']).uninstall()
+        finder = strip.install(['elsewhere'])
+        self.addCleanup(finder.uninstall)
+        service = importlib.import_module('stripdemo.service')
+        self.assertNotIsInstance(service.__loader__, strip.StrippingLoader)
+
+    def test_is_enabled_for(self):
+        self.logger.level = LogLevel.WARNING
+        self.assertFalse(self.logger.is_enabled_for(LogLevel.INFO))
+        self.assertTrue(self.logger.is_enabled_for('WARNING'))
+        self.assertTrue(self.logger.is_enabled_for(LogLevel.ERROR))
+        with self.logger.tail_buffer():
+            self.assertTrue(self.logger.is_enabled_for('DEBUG'))
@@ -0,0 +1,119 @@
+import asyncio
+import unittest
+
+from six import StringIO as PortableStringIO
+
+from log.handlers import StreamHandler
+from log.levels import LogLevel
+from log.loggers import Logger
+from log.tail import TailScope, active
+
+
+class TailScopeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = PortableStringIO()
+        self.logger = Logger(template='{message}', handlers=[StreamHandler(stream=self.stream)])
+
+    def _lines(self):
+        return self.stream.getvalue().splitlines()
+
+    def test_success_discards_detail(self):
+        with self.logger.tail_buffer() as scope:
+            self.logger.debug('detail')
+            self.logger.info('handled')
+            self.assertEqual([], self._lines())
+        self.assertEqual(['handled'], self._lines())
+        self.assertEqual(1, scope.discarded)
+        self.assertFalse(scope.failed)
+        self.assertIsNone(active())
+
+    def test_error_keeps_detail(self):
+        with self.logger.tail_buffer() as scope:
+            self.logger.debug('detail')
+            self.logger.info('handled')
+            self.logger.error('failed')
+            self.assertEqual(['detail', 'handled', 'failed'], self._lines())
+            self.logger.debug('after')
+        self.assertEqual(['detail', 'handled', 'failed', 'after'], self._lines())
+        self.assertTrue(scope.failed)
+
+    def test_exception_keeps_detail(self):
+        with self.assertRaises(ValueError):
+            with self.logger.tail_buffer():
+                self.logger.debug('detail')
+                raise ValueError('boom')
+        self.assertEqual(['detail'], self._lines())
+
+    def test_capacity(self):
+        with self.logger.tail_buffer(capacity=3) as scope:
+            for i in range(5):
+                self.logger.debug('debug {}'.format(i))
+                self.logger.info('info {}'.format(i))
+            self.assertEqual(['info 0', 'info 1', 'info 2'], self._lines())
+            self.assertEqual(4, scope.discarded)
+            self.logger.error('failed')
+        self.assertEqual(['info 0', 'info 1', 'info 2', 'info 3', 'debug 4', 'info 4', 'failed'], self._lines())
+
+    def test_respects_logger_level(self):
+        self.logger.level = LogLevel.WARNING
+        with self.logger.tail_buffer():
+            self.logger.info('detail')
+            self.logger.warning('warned')
+        self.assertEqual(['warned'], self._lines())
+
+    def test_decorator(self):
+        @self.logger.tail_buffer()
+        def handle(fail):
+            self.logger.debug('detail {}'.format(fail))
+            if fail:
+                self.logger.error('failed')
+        handle(False)
+        handle(True)
+        self.assertEqual(['detail True', 'failed'], self._lines())
+
+    def test_decorator_on_coroutine_function(self):
+        @self.logger.tail_buffer()
+        async def handle(fail):
+            self.logger.debug('detail {}'.format(fail))
+            await asyncio.sleep(0)
+            if fail:
+                self.logger.error('failed')
+            return fail
+
+        async def main():
+            return await asyncio.gather(handle(False), handle(True))
+        self.assertTrue(asyncio.iscoroutinefunction(handle))
+        self.assertEqual([False, True], asyncio.run(main()))
+        self.assertEqual(['detail True', 'failed'], self._lines())
+
+    def test_nested(self):
+        with TailScope():
+            with TailScope():
+                self.logger.debug('inner')
+            self.logger.debug('outer')
+            self.logger.error('failed')
+        self.assertEqual(['outer', 'failed'], self._lines())
+
+        self.stream.truncate(0)
+        self.stream.seek(0)
+        with TailScope():
+            with self.assertRaises(ValueError):
+                with TailScope():
+                    self.logger.debug('inner')
+                    raise ValueError('boom')
+            self.logger.debug('outer')
+        self.assertEqual(['inner'], self._lines())
+
+    def test_tasks_isolated(self):
+        async def handle(fail):
+            with self.logger.tail_buffer():
+                self.logger.debug('detail {}'.format(fail))
+                await asyncio.sleep(0)
+                if fail:
+                    self.logger.error('failed {}'.format(fail))
+
+        async def main():
+            await asyncio.gather(handle(False), handle(True))
+        asyncio.run(main())
+        self.assertEqual(['detail True', 'failed True'], self._lines())